@@ -4,23 +4,29 @@ Maximum Fairness Matching Algorithm
 ASSIGNMENT: Person 2
 Implements fairness-optimized matching (e.g., minimax or variance minimization).
 """
-from typing import List, Dict
-from models.preferences import UserPreference
-from models.responses import RulesetStats, UserStats
-from utils.utility_calculator import calculate_utility
+from typing import Dict
+import numpy as np
+from models.responses import RulesetStats
+from utils.group_context import GroupContext
+from utils.assignment import solve_assignment, bottleneck_threshold, givers_for_receivers
+from utils.matching_stats import matching_statistics
 
+FAIRNESS_OBJECTIVES = ("minimax", "variance")
 
-def calculate_statistics(preferences: List[UserPreference]) -> RulesetStats:
+
+def calculate_statistics(context: GroupContext, objective: str = "minimax") -> RulesetStats:
     """
     Calculate statistics for the fairness-optimized matching.
 
-    Finds a matching that optimizes for fairness. Possible approaches:
-    - Minimax: Maximize the minimum utility (ensure no one gets a bad match)
-    - Variance minimization: Minimize variance in utility scores
-    - Egalitarian: Ensure everyone gets above a threshold
+    Finds a matching that optimizes for fairness. Supported objectives:
+    - minimax: Maximize the minimum utility (ensure no one gets a bad match),
+      then maximize total utility among matchings with that minimum
+    - variance: Keep the minimax floor, then minimize the squared deviation
+      of utilities from the minimax matching's mean
 
     Args:
-        preferences: List of user preference objects
+        context: Shared group context (utility matrix and allowed-pair mask)
+        objective: Fairness objective to optimize, one of FAIRNESS_OBJECTIVES
 
     Returns:
         RulesetStats object with:
@@ -31,74 +37,53 @@ def calculate_statistics(preferences: List[UserPreference]) -> RulesetStats:
         - std_dev: Standard deviation (should be low for fair matching)
         - user_stats: Per-user utility in the fair matching
 
-    TODO: Person 2 to implement
-    Design decisions:
-    1. Choose your fairness metric (minimax recommended)
-    2. Implement algorithm to optimize that metric
-    3. Handle exclusions
-    4. Calculate resulting statistics
-
-    Hint for minimax: Try different matchings and pick the one with highest min utility.
-          You can use random search, or implement a more sophisticated algorithm.
+    Raises:
+        ValueError: If the objective is unknown or no matching satisfies the exclusions
     """
-    # PLACEHOLDER IMPLEMENTATION
-    user_stats = {}
-    for pref in preferences:
-        user_stats[pref.user_id] = UserStats(
-            expected_utility=6.5,
-            variance=0.0
-        )
-
-    return RulesetStats(
-        group_satisfaction_score=6.5,
-        group_fairness_score=9.5,  # High fairness!
-        min_utility=6.0,
-        max_utility=7.5,
-        std_dev=0.5,  # Low variance!
-        user_stats=user_stats
-    )
-
-
-def generate_matching(preferences: List[UserPreference], seed: int = None) -> Dict[str, str]:
+    _, stats = solve(context, objective)
+    return stats
+
+
+def generate_matching(context: GroupContext, objective: str = "minimax") -> Dict[str, str]:
     """
     Generate a fairness-optimized matching.
 
     Uses the same algorithm as calculate_statistics to find the best matching.
 
     Args:
-        preferences: List of user preference objects
-        seed: Random seed if algorithm uses randomness
+        context: Shared group context
+        objective: Fairness objective to optimize, one of FAIRNESS_OBJECTIVES
 
     Returns:
         Dict mapping giver_id -> receiver_id
-
-    TODO: Person 2 to implement
-    Should use the same logic as calculate_statistics to ensure consistency.
     """
-    # PLACEHOLDER IMPLEMENTATION
-    matching, _ = _find_fair_matching(preferences, seed)
+    matching, _ = solve(context, objective)
     return matching
 
 
-def _find_fair_matching(preferences: List[UserPreference], seed: int = None) -> tuple[Dict[str, str], RulesetStats]:
+def solve(context: GroupContext, objective: str = "minimax") -> tuple[Dict[str, str], RulesetStats]:
     """
-    Internal helper to find fair matching and stats.
+    Find the fair matching and its statistics in a single solve.
 
-    This can be shared between calculate_statistics and generate_matching
-    to avoid code duplication.
+    Shared between calculate_statistics and generate_matching so both
+    always agree on the same matching. The matching service calls this
+    directly so the matching can be cached alongside its statistics.
 
-    TODO: Person 2 to implement
+    Returns:
+        Tuple of (giver_id -> receiver_id matching, RulesetStats)
     """
-    # PLACEHOLDER
-    user_ids = [pref.user_id for pref in preferences]
-    n = len(user_ids)
-
-    # Simple placeholder matching
-    matching = {}
-    for i in range(n):
-        giver = user_ids[i]
-        receiver = user_ids[(i + 1) % n]
-        matching[giver] = receiver
-
-    stats = calculate_statistics(preferences)
-    return matching, stats
+    if objective not in FAIRNESS_OBJECTIVES:
+        raise ValueError(f"Unknown fairness objective: {objective}. Must be one of: {', '.join(FAIRNESS_OBJECTIVES)}")
+
+    # The floor is applied while building the solver's cost matrix, so no
+    # n x n floor mask (or squared-deviation matrix) is materialized
+    floor = bottleneck_threshold(context.utility, context.allowed)
+    receivers = solve_assignment(context.utility, context.allowed, floor=floor)
+
+    if objective == "variance":
+        givers = givers_for_receivers(receivers)
+        target = float(np.mean(context.utility[givers, np.arange(context.size)]))
+        receivers = solve_assignment(context.utility, context.allowed, maximize=False, floor=floor, center=target)
+
+    return context.matching_to_ids(receivers), matching_statistics(context, receivers)
+
@@ -3,14 +3,30 @@ Maximum Utility Matching Algorithm
 
 ASSIGNMENT: Person 1
 Implements maximum total utility matching using the Hungarian algorithm.
+
+Very large groups use an approximate "top_k" mode instead (see
+utils.sparse_assignment): the problem is pruned to each user's best
+candidates and solved sparsely, and the statistics report an upper bound
+on the exact optimum and the resulting optimality gap.
+
+Controlled by environment variables:
+- PRESENTS_TOP_K_MIN_USERS (default 20000): group size from which "auto"
+  mode uses top_k
 """
-from typing import List, Dict
-from models.preferences import UserPreference
-from models.responses import RulesetStats, UserStats
-from utils.utility_calculator import calculate_utility
+from typing import Dict
+import os
+from models.responses import RulesetStats
+from utils.group_context import GroupContext
+from utils.assignment import solve_assignment
+from utils.matching_stats import matching_statistics
+from utils.sparse_assignment import solve_top_k
+
+MAX_UTILITY_MODES = ("auto", "exact", "top_k")
+TOP_K_MIN_USERS = int(os.environ.get("PRESENTS_TOP_K_MIN_USERS", "20000"))
+DEFAULT_TOP_K = 16
 
 
-def calculate_statistics(preferences: List[UserPreference]) -> RulesetStats:
+def calculate_statistics(context: GroupContext, mode: str = "auto", top_k: int = DEFAULT_TOP_K) -> RulesetStats:
     """
     Calculate statistics for the maximum utility matching.
 
@@ -18,7 +34,9 @@ def calculate_statistics(preferences: List[UserPreference]) -> RulesetStats:
     Hungarian algorithm (linear_sum_assignment from scipy).
 
     Args:
-        preferences: List of user preference objects
+        context: Shared group context (utility matrix and allowed-pair mask)
+        mode: "exact", "top_k" (approximate) or "auto" (top_k from TOP_K_MIN_USERS users)
+        top_k: Initial candidates per user in top_k mode
 
     Returns:
         RulesetStats object with:
@@ -28,71 +46,59 @@ def calculate_statistics(preferences: List[UserPreference]) -> RulesetStats:
         - max_utility: Maximum utility in the optimal matching
         - std_dev: Standard deviation of utilities in the matching
         - user_stats: Per-user utility in the optimal matching
+        - utility_upper_bound, optimality_gap, candidates_per_user: top_k mode only
 
-    TODO: Person 1 to implement
-    Steps:
-    1. Create cost matrix using utility_calculator.calculate_utility()
-    2. Use scipy.optimize.linear_sum_assignment(cost_matrix, maximize=True)
-    3. Calculate statistics from the optimal matching
-    4. Handle exclusions (set utility to -inf or very negative for excluded pairs)
+    Raises:
+        ValueError: If the mode is unknown or no matching satisfies the exclusions
     """
-    # PLACEHOLDER IMPLEMENTATION
-    user_stats = {}
-    for pref in preferences:
-        user_stats[pref.user_id] = UserStats(
-            expected_utility=7.5,
-            variance=0.0  # Single matching has no variance per person
-        )
-
-    return RulesetStats(
-        group_satisfaction_score=7.5,
-        group_fairness_score=6.5,
-        min_utility=5.0,
-        max_utility=10.0,
-        std_dev=1.8,
-        user_stats=user_stats
-    )
-
-
-def generate_matching(preferences: List[UserPreference]) -> Dict[str, str]:
+    _, stats = solve(context, mode, top_k)
+    return stats
+
+
+def generate_matching(context: GroupContext, mode: str = "auto", top_k: int = DEFAULT_TOP_K) -> Dict[str, str]:
     """
     Generate the optimal maximum utility matching.
 
     Uses the same algorithm as calculate_statistics to find the best matching.
 
     Args:
-        preferences: List of user preference objects
+        context: Shared group context
+        mode: "exact", "top_k" or "auto" (see calculate_statistics)
+        top_k: Initial candidates per user in top_k mode
 
     Returns:
         Dict mapping giver_id -> receiver_id
 
-    TODO: Person 1 to implement
-    Should use the same logic as calculate_statistics to ensure consistency.
+    Raises:
+        ValueError: If the mode is unknown or no matching satisfies the exclusions
     """
-    # PLACEHOLDER IMPLEMENTATION
-    matching, _ = _find_optimal_matching(preferences)
+    matching, _ = solve(context, mode, top_k)
     return matching
 
 
-def _find_optimal_matching(preferences: List[UserPreference]) -> tuple[Dict[str, str], RulesetStats]:
+def solve(context: GroupContext, mode: str = "auto", top_k: int = DEFAULT_TOP_K) -> tuple[Dict[str, str], RulesetStats]:
     """
-    Internal helper to find optimal matching and stats.
+    Find the optimal matching and its statistics in a single solve.
 
-    This can be shared between calculate_statistics and generate_matching
-    to avoid code duplication.
+    Shared between calculate_statistics and generate_matching so both
+    always agree on the same matching. The matching service calls this
+    directly so the matching can be cached alongside its statistics.
 
-    TODO: Person 1 to implement
+    Returns:
+        Tuple of (giver_id -> receiver_id matching, RulesetStats)
     """
-    # PLACEHOLDER
-    user_ids = [pref.user_id for pref in preferences]
-    n = len(user_ids)
-
-    # Simple placeholder matching
-    matching = {}
-    for i in range(n):
-        giver = user_ids[i]
-        receiver = user_ids[(i + 1) % n]
-        matching[giver] = receiver
-
-    stats = calculate_statistics(preferences)
-    return matching, stats
+    if mode not in MAX_UTILITY_MODES:
+        raise ValueError(f"Unknown Max Utility mode: {mode}. Must be one of: {', '.join(MAX_UTILITY_MODES)}")
+
+    if mode == "exact" or (mode == "auto" and context.size < TOP_K_MIN_USERS):
+        receivers = solve_assignment(context.utility, context.allowed)
+        return context.matching_to_ids(receivers), matching_statistics(context, receivers)
+
+    solution = solve_top_k(context.utility, context.allowed, top_k)
+    bound = solution.upper_bound
+    stats = matching_statistics(context, solution.receivers).model_copy(update={
+        "utility_upper_bound": bound / context.size,
+        "optimality_gap": max(0.0, bound - solution.total) / abs(bound) if bound else 0.0,
+        "candidates_per_user": solution.k
+    })
+    return context.matching_to_ids(solution.receivers), stats
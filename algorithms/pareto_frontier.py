@@ -0,0 +1,168 @@
+"""
+Utility-versus-Fairness Pareto Frontier
+
+Computes the trade-off between Max Utility (highest total utility) and Max
+Fairness (highest minimum utility) as a short list of options in between.
+
+The sweep raises a utility floor from the Max Utility matching's minimum
+(fairness weight 0) to the highest feasible floor (weight 1, the minimax
+matching) and, at each floor, maximizes total utility among the matchings
+that give everyone at least that floor. Every such matching is Pareto-optimal
+for (total utility, minimum utility) among matchings at its floor; identical
+and dominated matchings are dropped from the result.
+
+Each floor's solve starts from the previous one: when the previous matching
+already meets the new floor it is still optimal (the feasible set only
+shrank), so the solve is skipped. The whole frontier therefore costs one
+bottleneck search plus at most `points` assignment solves.
+"""
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from models.responses import ParetoOption, RulesetStats
+from algorithms.registry import RulesetOptionError
+from utils.group_context import GroupContext
+from utils.assignment import solve_assignment, bottleneck_threshold, givers_for_receivers
+from utils.matching_stats import fairness_score, matching_statistics
+
+DEFAULT_POINTS = 7
+
+
+def calculate_statistics(context: GroupContext, points: int = DEFAULT_POINTS, option: Optional[int] = None) -> RulesetStats:
+    """
+    Calculate the frontier and the statistics of one of its options.
+
+    Args:
+        context: Shared group context (utility matrix and allowed-pair mask)
+        points: Number of fairness weights swept from 0 to 1
+        option: Index of the option whose statistics are returned (None = the
+            most balanced option, see balanced_option)
+
+    Returns:
+        RulesetStats of the chosen option, with pareto_options listing every
+        option from most utility to most fairness
+
+    Raises:
+        ValueError: If no matching satisfies the exclusions or the option does not exist
+    """
+    _, stats = solve(context, points, option)
+    return stats
+
+
+def generate_matching(context: GroupContext, points: int = DEFAULT_POINTS, option: Optional[int] = None) -> Dict[str, str]:
+    """
+    Generate the matching of one frontier option.
+
+    Args:
+        context: Shared group context
+        points: Number of fairness weights swept from 0 to 1
+        option: Index of the option to use (None = the most balanced option)
+
+    Returns:
+        Dict mapping giver_id -> receiver_id
+    """
+    matching, _ = solve(context, points, option)
+    return matching
+
+
+def solve(context: GroupContext, points: int = DEFAULT_POINTS, option: Optional[int] = None) -> tuple[Dict[str, str], RulesetStats]:
+    """
+    Compute the frontier once and return the chosen option's matching and statistics.
+
+    Returns:
+        Tuple of (giver_id -> receiver_id matching, RulesetStats)
+
+    Raises:
+        RulesetOptionError: If the option does not exist
+        ValueError: If no matching satisfies the exclusions
+    """
+    options, matchings = frontier(context, points)
+    index = balanced_option(options) if option is None else option
+    if not 0 <= index < len(options):
+        raise RulesetOptionError(f"Unknown pareto_option {index}: the frontier has {len(options)} options (0-{len(options) - 1})")
+
+    stats = matching_statistics(context, matchings[index])
+    return context.matching_to_ids(matchings[index]), stats.model_copy(update={"pareto_options": options})
+
+
+def frontier(context: GroupContext, points: int = DEFAULT_POINTS) -> Tuple[List[ParetoOption], List[np.ndarray]]:
+    """
+    Sweep the utility floor and collect the Pareto-optimal matchings.
+
+    Args:
+        context: Shared group context
+        points: Number of fairness weights swept from 0 to 1 (at least 2)
+
+    Returns:
+        Tuple of (options, matchings), from most utility to most fairness;
+        matchings[i] is the receivers array of options[i]
+
+    Raises:
+        ValueError: If no matching satisfies the exclusions
+    """
+    utility, allowed = context.utility, context.allowed
+    receivers = solve_assignment(utility, allowed)
+    low = float(_receiver_utilities(utility, receivers).min())
+    high = bottleneck_threshold(utility, allowed)
+
+    # Floors must be utility values (any floor in between selects the same matchings)
+    values = np.unique(utility[allowed])
+    values = values[(values >= low) & (values <= high)]
+    weights = np.linspace(0.0, 1.0, max(2, points))
+    floors = values[np.searchsorted(values, low + weights * (high - low) - 1e-9 * max(1.0, abs(high)))]
+
+    candidates = []
+    seen = set()
+    for weight, floor in zip(weights, floors):
+        utilities = _receiver_utilities(utility, receivers)
+        if utilities.min() < floor:
+            receivers = solve_assignment(utility, allowed, floor=floor)
+            utilities = _receiver_utilities(utility, receivers)
+        key = receivers.tobytes()
+        if key not in seen:
+            seen.add(key)
+            candidates.append((float(weight), float(floor), receivers, utilities))
+
+    options, matchings = [], []
+    for weight, floor, receivers, utilities in candidates:
+        total, minimum = utilities.sum(), utilities.min()
+        dominated = any(
+            other.sum() >= total and other.min() >= minimum and (other.sum() > total or other.min() > minimum)
+            for *_, other in candidates
+        )
+        if dominated:
+            continue
+        std_dev = float(np.std(utilities))
+        options.append(ParetoOption(
+            option=len(options),
+            fairness_weight=round(weight, 6),
+            utility_floor=floor,
+            group_satisfaction_score=float(np.mean(utilities)),
+            group_fairness_score=fairness_score(std_dev),
+            min_utility=float(minimum),
+            std_dev=std_dev
+        ))
+        matchings.append(receivers)
+    return options, matchings
+
+
+def balanced_option(options: List[ParetoOption]) -> int:
+    """
+    Pick the option closest to the ideal of both ends.
+
+    Average utility and minimum utility are each rescaled to 0-1 across the
+    options; the option with the highest sum wins (ties go to more utility).
+    """
+    satisfaction = np.array([option.group_satisfaction_score for option in options])
+    minimum = np.array([option.min_utility for option in options])
+
+    def rescale(values: np.ndarray) -> np.ndarray:
+        spread = values.max() - values.min()
+        return (values - values.min()) / spread if spread > 0 else np.zeros_like(values)
+
+    return int(np.argmax(rescale(satisfaction) + rescale(minimum)))
+
+
+def _receiver_utilities(utility: np.ndarray, receivers: np.ndarray) -> np.ndarray:
+    """Utility each receiver gets from their giver, as float64."""
+    givers = givers_for_receivers(receivers)
+    return np.asarray(utility[givers, np.arange(len(receivers))], dtype=np.float64)
@@ -4,23 +4,30 @@ Random Matching Algorithm
 ASSIGNMENT: Person 1
 Implements random gift exchange matching with expected statistics calculation.
 """
-from typing import List, Dict
-from models.preferences import UserPreference
-from models.responses import RulesetStats, UserStats
-import random
+from typing import Dict
+import numpy as np
+from models.responses import RulesetStats
+from utils.group_context import GroupContext
+from utils.assignment import solve_assignment
+from utils.matching_stats import build_ruleset_stats, fairness_score
+from utils.utility_storage import row_blocks
 
+# Shuffles to try before falling back to a randomly weighted assignment
+MAX_SHUFFLE_ATTEMPTS = 100
 
-def calculate_statistics(preferences: List[UserPreference]) -> RulesetStats:
+
+def calculate_statistics(context: GroupContext) -> RulesetStats:
     """
     Calculate expected statistics for random matching.
 
     For a random perfect matching, each person has equal probability of being
     matched to any other person (excluding themselves and exclusions).
 
-    Calculate expected mean and variance for EACH person, then compute overall stats.
+    Calculates the expected mean and variance for EACH person, then combines
+    them into overall stats (law of total variance for the group std_dev).
 
     Args:
-        preferences: List of user preference objects
+        context: Shared group context (utility matrix and allowed-pair mask)
 
     Returns:
         RulesetStats object with:
@@ -28,32 +35,49 @@ def calculate_statistics(preferences: List[UserPreference]) -> RulesetStats:
         - group_fairness_score: Fairness metric (10 - std_dev, normalized)
         - min_utility: Theoretical minimum utility
         - max_utility: Theoretical maximum utility
-        - std_dev: Standard deviation of expected utilities
+        - std_dev: Standard deviation of utilities across the group
         - user_stats: Per-user expected statistics
 
-    TODO: Person 1 to implement
-    Hint: For each receiver, calculate the average utility they would get
-          from all possible givers (excluding themselves and exclusions)
+    Raises:
+        ValueError: If someone has no allowed giver
     """
-    # PLACEHOLDER IMPLEMENTATION
-    user_stats = {}
-    for pref in preferences:
-        user_stats[pref.user_id] = UserStats(
-            expected_utility=5.0,
-            variance=2.0
-        )
-
-    return RulesetStats(
-        group_satisfaction_score=5.0,
-        group_fairness_score=7.0,
-        min_utility=1.0,
-        max_utility=10.0,
-        std_dev=2.3,
-        user_stats=user_stats
+    allowed = context.allowed
+    counts = allowed.sum(axis=0)
+    if np.any(counts == 0):
+        raise ValueError("No valid matching exists that satisfies all exclusions")
+
+    # Two passes over row blocks (mean, then variance) so a memory-mapped
+    # utility matrix is never copied in full to float64
+    sums = np.zeros(context.size)
+    min_utility, max_utility = np.inf, -np.inf
+    for rows in row_blocks(context.utility):
+        block = np.asarray(context.utility[rows], dtype=np.float64)
+        sums += np.where(allowed[rows], block, 0.0).sum(axis=0)
+        min_utility = min(min_utility, float(np.min(block, where=allowed[rows], initial=np.inf)))
+        max_utility = max(max_utility, float(np.max(block, where=allowed[rows], initial=-np.inf)))
+    means = sums / counts
+
+    squares = np.zeros(context.size)
+    for rows in row_blocks(context.utility):
+        block = np.asarray(context.utility[rows], dtype=np.float64)
+        squares += np.where(allowed[rows], (block - means) ** 2, 0.0).sum(axis=0)
+    variances = squares / counts
+
+    overall_mean = float(np.mean(means))
+    std_dev = float(np.sqrt(np.mean(variances + (means - overall_mean) ** 2)))
+
+    return build_ruleset_stats(
+        context.user_ids,
+        {"expected_utility": means, "variance": variances},
+        group_satisfaction_score=overall_mean,
+        group_fairness_score=fairness_score(std_dev),
+        min_utility=min_utility,
+        max_utility=max_utility,
+        std_dev=std_dev
     )
 
 
-def generate_matching(preferences: List[UserPreference], seed: int = None) -> Dict[str, str]:
+def generate_matching(context: GroupContext) -> Dict[str, str]:
     """
     Generate a random valid matching.
 
@@ -63,23 +87,39 @@ def generate_matching(preferences: List[UserPreference], seed: int = None) -> Di
     - Everyone gives to exactly one person
     - Everyone receives from exactly one person
 
+    Random permutations are drawn from the context's generator until a valid
+    one is found. Heavily constrained groups fall back to an assignment with
+    random weights, which is always valid but not exactly uniform. Groups
+    that split into independent components (partitions, or exclusions that
+    cut the group apart) are drawn per component, which keeps the draw
+    uniform and makes a valid shuffle far more likely.
+
     Args:
-        preferences: List of user preference objects
-        seed: Random seed for reproducibility (optional)
+        context: Shared group context (its rng provides reproducibility)
 
     Returns:
         Dict mapping giver_id -> receiver_id
 
-    TODO: Person 1 to implement
-    Hint: Generate random permutations until you find a valid derangement
+    Raises:
+        ValueError: If no matching satisfies the exclusions
     """
-    # PLACEHOLDER IMPLEMENTATION
-    if seed is not None:
-        random.seed(seed)
-
-    user_ids = [pref.user_id for pref in preferences]
-    receivers = user_ids.copy()
-    random.shuffle(receivers)
-
-    # Simple placeholder - may produce invalid matching
-    return dict(zip(user_ids, receivers))
+    components = context.components
+    if len(components) == 1:
+        return context.matching_to_ids(_random_receivers(context.rng, context.allowed))
+
+    receivers = np.empty(context.size, dtype=np.intp)
+    for component in components:
+        receivers[component] = component[_random_receivers(context.rng, context.allowed[np.ix_(component, component)])]
+    return context.matching_to_ids(receivers)
+
+
+def _random_receivers(rng: np.random.Generator, allowed: np.ndarray) -> np.ndarray:
+    """Draw a random matching within `allowed` as a receivers-by-giver array."""
+    n = allowed.shape[0]
+    givers = np.arange(n)
+    for _ in range(MAX_SHUFFLE_ATTEMPTS):
+        receivers = rng.permutation(n)
+        if allowed[givers, receivers].all():
+            return receivers
+
+    return solve_assignment(rng.random((n, n)), allowed)
@@ -0,0 +1,127 @@
+"""
+Ruleset Registry
+
+Declares every ruleset the service offers: its name, what it can produce,
+which request options it takes, a rough cost hint and the module that
+implements it. Implementations are imported lazily on first use, so
+numpy/scipy-heavy solvers are not loaded until a request needs them.
+
+Adding a ruleset means adding a module with the standard interface and one
+RulesetSpec below; controllers and the matching service need no changes.
+
+Standard module interface (all take a utils.group_context.GroupContext):
+- calculate_statistics(context, **options) -> RulesetStats            ("stats")
+- solve(context, **options) -> (matching, RulesetStats)                 (deterministic)
+- generate_matching(context, **options) -> Dict[giver_id, receiver_id]  ("pairings")
+- generate_play_order(context) -> List[user_id]                         ("play_order")
+Rulesets with the "progress" capability also accept an on_progress callback
+in calculate_statistics. Implementations raise RulesetOptionError for an
+option that does not fit the group; callers report it as a bad request.
+"""
+from dataclasses import dataclass, field
+from types import ModuleType
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+import importlib
+
+
+class RulesetOptionError(ValueError):
+    """A ruleset option is invalid for the group (e.g. a Pareto option the frontier does not have)."""
+
+
+@dataclass(frozen=True)
+class RulesetSpec:
+    """
+    Declaration of one ruleset.
+
+    Attributes:
+        name: Public ruleset name used in requests and responses
+        module: Import path of the implementing module (loaded lazily)
+        capabilities: Subset of {"stats", "pairings", "play_order", "progress"}
+        cost_hint: Human-readable complexity, e.g. "O(n^3)"
+        relative_cost: Rough cost relative to Random Matching, for scheduling
+        deterministic: Same input always yields the same matching, so the
+            solution computed for /recalculate can be reused by /finalize_group
+        default: Computed by /recalculate when no rulesets are requested
+        options: RulesetOptions field -> (keyword argument name, default value)
+    """
+    name: str
+    module: str
+    capabilities: FrozenSet[str]
+    cost_hint: str
+    relative_cost: float
+    deterministic: bool = False
+    default: bool = True
+    options: Dict[str, Tuple[str, Any]] = field(default_factory=dict)
+
+    def load(self) -> ModuleType:
+        """Import (on first use) and return the implementing module."""
+        return importlib.import_module(self.module)
+
+    def has(self, capability: str) -> bool:
+        """Check whether the ruleset declares a capability."""
+        return capability in self.capabilities
+
+
+RULESETS: Dict[str, RulesetSpec] = {
+    spec.name: spec
+    for spec in (
+        RulesetSpec(
+            name="Random Matching",
+            module="algorithms.random_matching",
+            capabilities=frozenset({"stats", "pairings"}),
+            cost_hint="O(n^2)",
+            relative_cost=1.0
+        ),
+        RulesetSpec(
+            name="Max Utility",
+            module="algorithms.max_utility_matching",
+            capabilities=frozenset({"stats", "pairings"}),
+            cost_hint="O(n^3); top_k mode: O(n^2) scan + sparse solve",
+            relative_cost=5.0,
+            deterministic=True,
+            options={"max_utility_mode": ("mode", "auto"), "top_k": ("top_k", 16)}
+        ),
+        RulesetSpec(
+            name="Max Fairness",
+            module="algorithms.max_fairness_matching",
+            capabilities=frozenset({"stats", "pairings"}),
+            cost_hint="O(n^3 log n)",
+            relative_cost=20.0,
+            deterministic=True,
+            options={"fairness_objective": ("objective", "minimax")}
+        ),
+        RulesetSpec(
+            name="Pareto Frontier",
+            module="algorithms.pareto_frontier",
+            capabilities=frozenset({"stats", "pairings"}),
+            cost_hint="O(points * n^3)",
+            relative_cost=40.0,
+            deterministic=True,
+            default=False,
+            options={"pareto_points": ("points", 7), "pareto_option": ("option", None)}
+        ),
+        RulesetSpec(
+            name="White Elephant",
+            module="algorithms.white_elephant_simulation",
+            capabilities=frozenset({"stats", "play_order", "progress"}),
+            cost_hint="O(simulations * n^2)",
+            relative_cost=100.0,
+            options={"num_simulations": ("num_simulations", 1000)}
+        ),
+    )
+}
+
+
+def get_ruleset(name: str) -> Optional[RulesetSpec]:
+    """Look up a ruleset by name; returns None if unknown."""
+    return RULESETS.get(name)
+
+
+def ruleset_names() -> List[str]:
+    """Names of all registered rulesets, in registration order."""
+    return list(RULESETS)
+
+
+def default_ruleset_names() -> List[str]:
+    """Names of the rulesets /recalculate computes when none are requested."""
+    return [name for name, spec in RULESETS.items() if spec.default]
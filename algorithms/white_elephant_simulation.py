@@ -4,13 +4,28 @@ White Elephant Game Simulation
 ASSIGNMENT: Person 3
 Simulates 1000+ White Elephant games with stealing mechanics.
 """
-from typing import List, Dict
-from models.preferences import UserPreference
-from models.responses import RulesetStats, UserStats
-import random
+from typing import Callable, List, Dict, Optional
+import numpy as np
+from models.responses import RulesetStats
+from utils.group_context import GroupContext
+from utils.matching_stats import build_ruleset_stats, fairness_score
 
+# A gift is frozen after this many steals
+MAX_STEALS_PER_GIFT = 3
 
-def calculate_statistics(preferences: List[UserPreference], num_simulations: int = 1000) -> RulesetStats:
+# Happiness modifiers per point of the 1-5 preference scales
+STOLEN_FROM_PENALTY = 0.2
+STEALING_BONUS = 0.2
+
+# Number of progressive estimates reported during a run (when requested)
+PROGRESS_UPDATES = 10
+
+
+def calculate_statistics(
+    context: GroupContext,
+    num_simulations: int = 1000,
+    on_progress: Optional[Callable[[RulesetStats], None]] = None
+) -> RulesetStats:
     """
     Run multiple White Elephant game simulations and return aggregate statistics.
 
@@ -18,65 +33,81 @@ def calculate_statistics(preferences: List[UserPreference], num_simulations: int
     1. Each turn, player can either:
        - Open a new gift
        - Steal an already-opened gift from someone else
-    2. Players choose gifts based on best utility fit
-       - Suggested: Use practicality + novelty for gift selection
-       - Implementer has flexibility to adjust this
+    2. Players choose gifts based on best utility fit: they steal the best
+       stealable gift if it beats the average unopened gift, otherwise open one
     3. Happiness is calculated separately from decision-making:
        - Base utility from the gift they end up with
        - MINUS penalty from we_hate_being_stolen_from (if stolen from)
        - PLUS bonus from we_enjoy_stealing (if they stole)
 
     Args:
-        preferences: List of user preference objects
+        context: Shared group context (utility matrix, stealing preferences and rng)
         num_simulations: Number of game simulations to run (default 1000)
+        on_progress: Optional callback receiving interim statistics over the games
+            simulated so far, called every 1/PROGRESS_UPDATES of the run
 
     Returns:
         RulesetStats object with:
         - group_satisfaction_score: Average satisfaction across all simulations
-        - group_fairness_score: Fairness based on variance
+        - group_fairness_score: Fairness based on variance of per-user averages
         - std_dev: Standard deviation of utilities across simulations
         - avg_steals_per_game: Average number of steals per game
         - max_steals_observed: Maximum steals in any single game
         - simulations_run: Number of simulations actually run
         - user_stats: Per-user aggregate statistics
-
-    TODO: Person 3 to implement
-    Steps:
-    1. Run num_simulations games with randomized play orders
-    2. In each game:
-       - Simulate player decisions (steal or open based on utility)
-       - Track who stole and who was stolen from
-       - Calculate final happiness including stealing modifiers
-    3. Aggregate results across all simulations
-    4. Return statistics
-
-    Design decisions for implementer:
-    - How to calculate gift utility (practicality + novelty suggested)
-    - How much weight to give stealing modifiers
-    - Stealing rules (max steals per item, etc.)
     """
-    # PLACEHOLDER IMPLEMENTATION
-    user_stats = {}
-    for pref in preferences:
-        user_stats[pref.user_id] = UserStats(
-            avg_utility=6.0,
-            utility_standard_deviation=1.5,
-            times_stolen_from_pct=0.25,
-            times_stole_pct=0.20
-        )
-
-    return RulesetStats(
-        group_satisfaction_score=6.0,
-        group_fairness_score=7.0,
-        std_dev=1.8,
-        avg_steals_per_game=8.5,
-        max_steals_observed=15,
-        simulations_run=num_simulations,
-        user_stats=user_stats
+    n = context.size
+    happiness = np.empty((num_simulations, n))
+    stolen_from = np.empty((num_simulations, n), dtype=bool)
+    stole = np.empty((num_simulations, n), dtype=bool)
+    steals = np.empty(num_simulations, dtype=np.int64)
+
+    progress_every = max(1, num_simulations // PROGRESS_UPDATES)
+
+    for i in range(num_simulations):
+        game = _simulate_single_game(context, context.rng.permutation(n))
+        happiness[i] = game["happiness"]
+        stolen_from[i] = game["stolen_from"]
+        stole[i] = game["stole"]
+        steals[i] = game["steals"]
+
+        games = i + 1
+        if on_progress is not None and games < num_simulations and games % progress_every == 0:
+            on_progress(_aggregate(context, happiness[:games], stolen_from[:games], stole[:games], steals[:games]))
+
+    return _aggregate(context, happiness, stolen_from, stole, steals)
+
+
+def _aggregate(
+    context: GroupContext,
+    happiness: np.ndarray,
+    stolen_from: np.ndarray,
+    stole: np.ndarray,
+    steals: np.ndarray
+) -> RulesetStats:
+    """Aggregate per-game results (one row per game) into RulesetStats."""
+    avg_utility = happiness.mean(axis=0)
+
+    return build_ruleset_stats(
+        context.user_ids,
+        {
+            "avg_utility": avg_utility,
+            "utility_standard_deviation": happiness.std(axis=0),
+            "times_stolen_from_pct": stolen_from.mean(axis=0),
+            "times_stole_pct": stole.mean(axis=0)
+        },
+        group_satisfaction_score=float(happiness.mean()),
+        group_fairness_score=fairness_score(np.std(avg_utility)),
+        min_utility=float(happiness.min()),
+        max_utility=float(happiness.max()),
+        std_dev=float(happiness.std()),
+        avg_steals_per_game=float(steals.mean()),
+        max_steals_observed=int(steals.max()),
+        simulations_run=len(steals)
     )
 
 
-def generate_play_order(preferences: List[UserPreference], seed: int = None) -> List[str]:
+def generate_play_order(context: GroupContext) -> List[str]:
     """
     Generate a randomized play order for the actual White Elephant game.
 
@@ -84,40 +115,80 @@ def generate_play_order(preferences: List[UserPreference], seed: int = None) ->
     for the actual game play.
 
     Args:
-        preferences: List of user preference objects
-        seed: Random seed for reproducibility (optional)
+        context: Shared group context (its rng provides reproducibility)
 
     Returns:
         List of user_ids in randomized play order
-
-    TODO: Person 3 to implement
-    Hint: Simply shuffle the user IDs randomly
     """
-    # PLACEHOLDER IMPLEMENTATION
-    if seed is not None:
-        random.seed(seed)
+    return [context.user_ids[p] for p in context.rng.permutation(context.size)]
 
-    user_ids = [pref.user_id for pref in preferences]
-    random.shuffle(user_ids)
-    return user_ids
 
-
-def _simulate_single_game(preferences: List[UserPreference]) -> Dict:
+def _simulate_single_game(context: GroupContext, order: np.ndarray) -> Dict:
     """
     Internal helper to simulate a single White Elephant game.
 
-    Returns game results including:
-    - Final gift assignments
-    - Who stole from whom
-    - Number of steals
-    - Individual happiness scores
+    Gift g is the gift brought by player g, so its value to player p is
+    utility[g, p]. A player who is stolen from immediately takes another
+    turn, but may not steal back the gift they just lost.
 
-    TODO: Person 3 to implement
-    This is the core game simulation logic.
+    Returns game results including:
+    - assignments: Final gift index held by each player
+    - steals: Number of steals
+    - stolen_from / stole: Per-player flags
+    - happiness: Individual happiness scores
     """
-    # PLACEHOLDER
+    n = context.size
+    utility = context.utility
+    holder = np.full(n, -1)
+    gift_of = np.full(n, -1)
+    times_stolen = np.zeros(n, dtype=np.int64)
+    unopened = np.ones(n, dtype=bool)
+    opening_order = list(context.rng.permutation(n))
+    stolen_from = np.zeros(n, dtype=bool)
+    stole = np.zeros(n, dtype=bool)
+    steals = 0
+
+    for player in order:
+        current = player
+        blocked = -1
+        while True:
+            stealable = (holder >= 0) & (times_stolen < MAX_STEALS_PER_GIFT)
+            if blocked >= 0:
+                stealable[blocked] = False
+
+            values = utility[:, current]
+            best_gift = int(np.argmax(np.where(stealable, values, -np.inf))) if stealable.any() else -1
+            unopened_value = values[unopened].mean()
+
+            if best_gift >= 0 and values[best_gift] > unopened_value:
+                victim = holder[best_gift]
+                holder[best_gift] = current
+                gift_of[current] = best_gift
+                gift_of[victim] = -1
+                times_stolen[best_gift] += 1
+                steals += 1
+                stole[current] = True
+                stolen_from[victim] = True
+                current = victim
+                blocked = best_gift
+                continue
+
+            gift = opening_order.pop()
+            unopened[gift] = False
+            holder[gift] = current
+            gift_of[current] = gift
+            break
+
+    happiness = (
+        utility[gift_of, np.arange(n)].astype(np.float64)
+        - STOLEN_FROM_PENALTY * context.hate_being_stolen_from * stolen_from
+        + STEALING_BONUS * context.enjoy_stealing * stole
+    )
+
     return {
-        "assignments": {},
-        "steals": 0,
-        "happiness": {}
+        "assignments": gift_of,
+        "steals": steals,
+        "stolen_from": stolen_from,
+        "stole": stole,
+        "happiness": happiness
     }
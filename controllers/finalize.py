@@ -3,21 +3,23 @@ Finalize Controller
 
 Handles POST /finalize_group endpoint for generating final pairings/play order.
 """
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+import asyncio
+from fastapi import APIRouter, Header, HTTPException
 from models.requests import FinalizeGroupRequest
 from models.responses import FinalizeResponse, ErrorResponse
-from services import matching_service
+from services import matching_service, finalize_store
+from controllers.groups import prepare_group_preferences
 
 router = APIRouter()
 
-VALID_RULESETS = ["Random Matching", "Max Utility", "Max Fairness", "White Elephant"]
-
 
 @router.post(
     "/finalize_group",
     response_model=FinalizeResponse,
     responses={
         400: {"model": ErrorResponse, "description": "Invalid input"},
+        409: {"model": ErrorResponse, "description": "Idempotency key already used for a different request"},
         422: {"model": ErrorResponse, "description": "Validation error"},
         500: {"model": ErrorResponse, "description": "Internal server error"}
     },
@@ -33,14 +35,24 @@ VALID_RULESETS = ["Random Matching", "Max Utility", "Max Fairness", "White Eleph
 
     This is called once after the admin has reviewed statistics from /recalculate
     and chosen their preferred ruleset.
+
+    Finalizing is idempotent: the response is stored under an idempotency key
+    (`idempotency_key` or the `Idempotency-Key` header; by default a hash of
+    group, preferences, ruleset, options and seed) and repeating the request
+    returns it unchanged, with `metadata.replayed` set. Concurrent identical
+    requests share one computation.
     """
 )
-async def finalize_group(request: FinalizeGroupRequest) -> FinalizeResponse:
+async def finalize_group(
+    request: FinalizeGroupRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+) -> FinalizeResponse:
     """
-    Generate final pairings or play order.
+    Generate final pairings or play order, at most once per idempotency key.
 
     Args:
         request: FinalizeGroupRequest with group_id, ruleset, preferences, and optional seed
+        idempotency_key: Idempotency-Key header (used if the body has no idempotency_key)
 
     Returns:
         FinalizeResponse with pairings or play_order
@@ -49,44 +61,55 @@ async def finalize_group(request: FinalizeGroupRequest) -> FinalizeResponse:
         HTTPException: If validation fails or algorithms error
     """
     try:
-        # Validate minimum number of users
-        if len(request.preferences) < 2:
-            raise HTTPException(
-                status_code=400,
-                detail={
-                    "error": "InvalidInput",
-                    "message": "At least 2 users are required for matching",
-                    "details": {"num_users": len(request.preferences)}
-                }
-            )
-
         # Validate ruleset
-        if request.ruleset not in VALID_RULESETS:
+        if request.ruleset not in matching_service.VALID_RULESETS:
             raise HTTPException(
                 status_code=400,
                 detail={
                     "error": "InvalidRuleset",
-                    "message": f"Invalid ruleset. Must be one of: {', '.join(VALID_RULESETS)}",
-                    "details": {"provided_ruleset": request.ruleset, "valid_rulesets": VALID_RULESETS}
+                    "message": f"Invalid ruleset. Must be one of: {', '.join(matching_service.VALID_RULESETS)}",
+                    "details": {"provided_ruleset": request.ruleset, "valid_rulesets": matching_service.VALID_RULESETS}
                 }
             )
 
-        # Generate final matching/play order
-        result = matching_service.finalize_matching(
+        # Load (if stored) and check the group
+        prepare_group_preferences(request)
+
+        arguments = dict(
             ruleset=request.ruleset,
-            preferences=request.preferences,
-            seed=request.seed
+            preferences=request.preference_payload,
+            seed=request.seed,
+            group_id=request.group_id,
+            options=request.options,
+            exclusion_mode=request.exclusion_mode
         )
+        request_hash = matching_service.finalize_request_hash(**arguments)
+        key = request.idempotency_key or idempotency_key or request_hash
 
-        # Update group_id from request
-        result.group_id = request.group_id
+        def compute() -> FinalizeResponse:
+            result = matching_service.finalize_matching(**arguments)
+            result.metadata["idempotency_key"] = key
+            return result
 
-        return result
+        # Generate final matching/play order once; replays get the stored result
+        future, replayed = finalize_store.finalize_once(key, request_hash, compute)
+        result = await asyncio.wrap_future(future)
+        return result.model_copy(update={"metadata": {**result.metadata, "replayed": replayed}})
 
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
 
+    except finalize_store.IdempotencyKeyConflictError as e:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "error": "IdempotencyKeyConflict",
+                "message": str(e),
+                "details": {"idempotency_key": e.key}
+            }
+        )
+
     except ValueError as e:
         # Handle validation errors from service layer
         raise HTTPException(
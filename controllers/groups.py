@@ -0,0 +1,168 @@
+"""
+Groups Controller
+
+Handles PUT/PATCH /groups/{group_id}/preferences for storing a group's
+preferences server-side, so the compute endpoints can be called with just
+group_id + preferences_version. Also provides prepare_group_preferences,
+which the compute controllers use to load and check a request's group.
+"""
+from collections import Counter
+from fastapi import APIRouter, HTTPException
+from models.requests import PreferencePayload, GroupPreferencesRequest, GroupPreferencesPatch
+from models.responses import GroupVersionResponse, ErrorResponse
+from services import matching_service
+from services import group_store
+from utils import metrics
+
+router = APIRouter()
+
+
+@router.put(
+    "/groups/{group_id}/preferences",
+    response_model=GroupVersionResponse,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid group"},
+        422: {"model": ErrorResponse, "description": "Validation error"}
+    },
+    summary="Store a group's preferences",
+    description="""
+    Stores (or replaces) the group's full preferences, in either request
+    format, and returns the new version. Compute endpoints then accept
+    `preferences_version` instead of the preferences themselves.
+    """
+)
+async def put_group_preferences(group_id: str, request: PreferencePayload) -> GroupVersionResponse:
+    """
+    Store a group's preferences.
+
+    Raises:
+        HTTPException: If the group has duplicate user IDs
+    """
+    arrays = matching_service.to_preference_arrays(request.preference_payload)
+    duplicates = sorted(user_id for user_id, count in Counter(arrays.user_ids).items() if count > 1)
+    if duplicates:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "InvalidGroup",
+                "message": "User IDs must be unique within a group",
+                "details": {"duplicate_user_ids": duplicates}
+            }
+        )
+    return _version_response(group_store.store.put(group_id, arrays))
+
+
+@router.patch(
+    "/groups/{group_id}/preferences",
+    response_model=GroupVersionResponse,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid change"},
+        404: {"model": ErrorResponse, "description": "Group not stored"},
+        409: {"model": ErrorResponse, "description": "Version conflict"},
+        422: {"model": ErrorResponse, "description": "Validation error"}
+    },
+    summary="Update members of a stored group",
+    description="""
+    Adds, replaces (by user_id) or removes individual members of a stored
+    group without resending it. Pass `expected_version` to reject the update
+    if someone else changed the group in the meantime.
+    """
+)
+async def patch_group_preferences(group_id: str, request: GroupPreferencesPatch) -> GroupVersionResponse:
+    """
+    Apply member changes to a stored group.
+
+    Raises:
+        HTTPException: If the group is not stored, the version is stale or a removed user is unknown
+    """
+    try:
+        stored = group_store.store.patch(
+            group_id,
+            upsert=request.upsert,
+            remove=request.remove,
+            expected_version=request.expected_version
+        )
+    except group_store.GroupNotFoundError as e:
+        raise HTTPException(status_code=404, detail=_not_found_detail(group_id, e))
+    except group_store.VersionConflictError as e:
+        raise HTTPException(status_code=409, detail=_conflict_detail(group_id, e))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail={"error": "InvalidInput", "message": str(e), "details": {"remove": request.remove}}
+        )
+    return _version_response(stored)
+
+
+def prepare_group_preferences(request: GroupPreferencesRequest) -> None:
+    """
+    Resolve and check the group a compute request refers to.
+
+    Loads stored preferences when the request names a preferences_version,
+    checks the group size, and runs the integrity checks; the validated
+    arrays are attached to the request for the algorithms to reuse.
+
+    Raises:
+        HTTPException: 404/409 for a missing or stale stored group, 400 for
+            too few users or integrity problems
+    """
+    with metrics.timed("validate", metrics.VALIDATION_SECONDS, "Load and validate group"):
+        _prepare_group_preferences(request)
+
+
+def _prepare_group_preferences(request: GroupPreferencesRequest) -> None:
+    if request.preferences_version is not None:
+        try:
+            _, arrays = group_store.store.load(request.group_id, request.preferences_version)
+        except group_store.GroupNotFoundError as e:
+            raise HTTPException(status_code=404, detail=_not_found_detail(request.group_id, e))
+        except group_store.VersionConflictError as e:
+            raise HTTPException(status_code=409, detail=_conflict_detail(request.group_id, e))
+        request.attach_preferences(arrays)
+
+    # Validate minimum number of users
+    if request.group_size < 2:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "InvalidInput",
+                "message": "At least 2 users are required for matching",
+                "details": {"num_users": request.group_size}
+            }
+        )
+
+    # Validate group integrity in one vectorized pass; the validated arrays are reused by the algorithms
+    try:
+        request.attach_preferences(
+            matching_service.validate_preferences(request.preference_payload, request.exclusion_mode)
+        )
+    except matching_service.GroupValidationError as e:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "InvalidGroup",
+                "message": str(e),
+                "details": {"problem_counts": e.problem_counts, "problems": e.problems}
+            }
+        )
+
+
+def _version_response(stored: group_store.StoredGroup) -> GroupVersionResponse:
+    return GroupVersionResponse(
+        group_id=stored.group_id,
+        version=stored.version,
+        num_users=stored.num_users,
+        updated_at=stored.updated_at
+    )
+
+
+def _not_found_detail(group_id: str, error: Exception) -> dict:
+    return {"error": "GroupNotFound", "message": str(error), "details": {"group_id": group_id}}
+
+
+def _conflict_detail(group_id: str, error: group_store.VersionConflictError) -> dict:
+    return {
+        "error": "VersionConflict",
+        "message": str(error),
+        "details": {"group_id": group_id, "expected_version": error.expected_version, "current_version": error.current_version}
+    }
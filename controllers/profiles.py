@@ -0,0 +1,69 @@
+"""
+Profiles Controller
+
+Handles GET /profiles/{profile_id} for downloading request profiles taken
+with ?profile=1. Only registered when profiling is enabled (see
+services/profiling.py).
+"""
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import Response
+from models.responses import RequestProfile, ErrorResponse
+from services import profiling
+
+router = APIRouter()
+
+
+@router.get(
+    "/profiles/{profile_id}",
+    response_model=RequestProfile,
+    responses={
+        200: {"content": {"application/octet-stream": {}}, "description": "Summary, or raw pstats with format=pstats"},
+        403: {"model": ErrorResponse, "description": "Missing or wrong X-Profile-Token"},
+        404: {"model": ErrorResponse, "description": "Unknown or expired profile"}
+    },
+    summary="Download a request profile",
+    description="""
+    Returns the profile of a request made with `?profile=1` (its id is in the
+    response's `X-Profile-Id` header): the top functions by cumulative time,
+    with algorithm and matching service code listed separately as hot spots.
+    Pass `format=pstats` for the raw profile, e.g. for
+    `python -m pstats profile.pstats` or snakeviz.
+    """
+)
+async def get_profile(
+    profile_id: str,
+    output_format: str = Query("summary", alias="format", pattern="^(summary|pstats)$", description="summary (JSON) or pstats (binary)"),
+    x_profile_token: Optional[str] = Header(None)
+):
+    """
+    Return a stored request profile.
+
+    Raises:
+        HTTPException: If the token is wrong or the profile does not exist
+    """
+    if not profiling.is_authorized(x_profile_token):
+        raise HTTPException(
+            status_code=403,
+            detail={"error": "Forbidden", "message": "A valid X-Profile-Token header is required", "details": {}}
+        )
+
+    stored = profiling.get_profile(profile_id)
+    if stored is None:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "ProfileNotFound",
+                "message": "Profile not found or expired",
+                "details": {"profile_id": profile_id}
+            }
+        )
+
+    profile, raw = stored
+    if output_format == "pstats":
+        return Response(
+            content=raw,
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.pstats"'}
+        )
+    return profile
@@ -1,12 +1,24 @@
 """
 Recalculate Controller
 
-Handles POST /recalculate endpoint for running all algorithms and returning statistics.
+Handles POST /recalculate endpoint for running all algorithms and returning statistics,
+plus the streaming (POST /recalculate/stream), batch (POST /recalculate/batch) and
+background job (POST /recalculate/jobs, GET /recalculate/jobs/{job_id}) variants,
+and paging of cached per-user statistics (GET /recalculate/user_stats/{group_id}).
 """
-from fastapi import APIRouter, HTTPException
-from models.requests import RecalculateRequest
-from models.responses import RecalculateResponse, ErrorResponse
-from services import matching_service
+from typing import AsyncIterator, Optional
+import asyncio
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from algorithms.registry import RulesetOptionError
+from models.requests import RecalculateRequest, BatchRecalculateRequest
+from models.responses import RecalculateResponse, RecalculateJobResponse, UserStatsPage, ErrorResponse
+from services import matching_service, recalculate_jobs, worker_pool
+from controllers.groups import prepare_group_preferences
+from services.recalculate_stream import stream_recalculation
+from services.batch_recalculate import stream_batch
+from utils import fast_json
+from utils.fast_json import FastJSONResponse
 
 router = APIRouter()
 
@@ -14,6 +26,7 @@ router = APIRouter()
 @router.post(
     "/recalculate",
     response_model=RecalculateResponse,
+    response_class=FastJSONResponse,
     responses={
         400: {"model": ErrorResponse, "description": "Invalid input"},
         422: {"model": ErrorResponse, "description": "Validation error"},
@@ -24,48 +37,66 @@ router = APIRouter()
     Runs all matching algorithms (Random, Max Utility, Max Fairness, White Elephant)
     and returns statistics for comparison. This helps admins choose which ruleset to use.
 
+    Pass `rulesets` to compute only a subset (e.g. just "Max Fairness" after an
+    exclusion change), and `ruleset_options` to tune individual rulesets such as
+    the White Elephant simulation count or the Max Fairness objective.
+
     The endpoint does NOT return actual pairings - only statistics for comparison.
     Use /finalize_group to get actual pairings after choosing a ruleset.
     """
 )
-async def recalculate(request: RecalculateRequest) -> RecalculateResponse:
+async def recalculate(request: RecalculateRequest) -> FastJSONResponse:
     """
     Calculate statistics for all rulesets.
 
     Args:
-        request: RecalculateRequest with group_id and preferences
+        request: RecalculateRequest with group_id, preferences and optional ruleset selection/options
 
     Returns:
-        RecalculateResponse with statistics for all rulesets
+        RecalculateResponse with statistics for the requested rulesets, wrapped
+        in a FastJSONResponse. The route's response_model only documents the
+        OpenAPI schema: because a Response is returned, FastAPI does not
+        validate or serialize it again, and the body is that same model
+        serialized by pydantic-core (the models were validated when built).
 
     Raises:
-        HTTPException: If validation fails or algorithms error
+        HTTPException: If validation fails, a ruleset option does not fit the
+            group (400) or algorithms error
     """
     try:
-        # Validate minimum number of users
-        if len(request.preferences) < 2:
-            raise HTTPException(
-                status_code=400,
-                detail={
-                    "error": "InvalidInput",
-                    "message": "At least 2 users are required for matching",
-                    "details": {"num_users": len(request.preferences)}
-                }
-            )
-
-        # Run all algorithms
-        rulesets = matching_service.run_all_algorithms(request.preferences)
+        _validate_recalculate_request(request)
+
+        # Run the requested algorithms
+        rulesets = matching_service.run_all_algorithms(
+            request.preference_payload,
+            rulesets=request.rulesets,
+            options=request.ruleset_options,
+            group_id=request.group_id,
+            include_user_stats=request.include_user_stats,
+            exclusion_mode=request.exclusion_mode
+        )
 
         # Return response
-        return RecalculateResponse(
+        return FastJSONResponse(RecalculateResponse(
             group_id=request.group_id,
             rulesets=rulesets
-        )
+        ))
 
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
 
+    except RulesetOptionError as e:
+        # An option that does not fit this group, e.g. an out-of-range pareto_option
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "ValidationError",
+                "message": str(e),
+                "details": {}
+            }
+        )
+
     except Exception as e:
         # Catch any other errors
         raise HTTPException(
@@ -76,3 +107,272 @@ async def recalculate(request: RecalculateRequest) -> RecalculateResponse:
                 "details": {}
             }
         )
+
+
+@router.post(
+    "/recalculate/stream",
+    responses={
+        200: {
+            "description": "NDJSON (default) or server-sent events, one event per line/message",
+            "content": {"application/x-ndjson": {}, "text/event-stream": {}}
+        },
+        400: {"model": ErrorResponse, "description": "Invalid input"},
+        422: {"model": ErrorResponse, "description": "Validation error"}
+    },
+    summary="Stream statistics as each ruleset finishes",
+    description="""
+    Accepts the same body as /recalculate but streams each ruleset's statistics
+    as soon as it is ready instead of waiting for all of them. Simulation-based
+    rulesets (White Elephant) also send periodic progressive estimates.
+
+    Events are sent as NDJSON lines by default, or as server-sent events when
+    the request has `Accept: text/event-stream`. Event types: `progress`,
+    `ruleset`, `done` and `error`.
+    """
+)
+async def recalculate_stream(request: RecalculateRequest, http_request: Request) -> StreamingResponse:
+    """
+    Stream per-ruleset statistics.
+
+    Args:
+        request: RecalculateRequest with group_id, preferences and optional ruleset selection/options
+        http_request: Raw request, used for Accept header negotiation
+
+    Returns:
+        StreamingResponse of NDJSON lines or server-sent events
+
+    Raises:
+        HTTPException: If validation fails
+    """
+    _validate_recalculate_request(request)
+
+    if "text/event-stream" in http_request.headers.get("accept", ""):
+        return StreamingResponse(_format_sse(stream_recalculation(request)), media_type="text/event-stream")
+    return StreamingResponse(_format_ndjson(stream_recalculation(request)), media_type="application/x-ndjson")
+
+
+@router.post(
+    "/recalculate/batch",
+    responses={
+        200: {"description": "NDJSON, one line per group as it completes", "content": {"application/x-ndjson": {}}},
+        422: {"model": ErrorResponse, "description": "Validation error"}
+    },
+    summary="Recalculate many groups in one request",
+    description="""
+    Accepts a list of /recalculate bodies and schedules them across worker
+    processes, packing small groups together into shared tasks. Results are
+    streamed back as NDJSON in completion order, one `result` (or `error`) line
+    per group carrying its `index` in the request, followed by a final `done` line.
+    """
+)
+async def recalculate_batch(request: BatchRecalculateRequest) -> StreamingResponse:
+    """
+    Recalculate many groups, streaming results as they complete.
+
+    Args:
+        request: BatchRecalculateRequest with one RecalculateRequest per group
+
+    Returns:
+        StreamingResponse of NDJSON lines
+    """
+    return StreamingResponse(_format_ndjson(_batch_events(request)), media_type="application/x-ndjson")
+
+
+@router.post(
+    "/recalculate/jobs",
+    status_code=202,
+    response_model=RecalculateJobResponse,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid input"},
+        422: {"model": ErrorResponse, "description": "Validation error"},
+        503: {"model": ErrorResponse, "description": "Too many unfinished jobs"}
+    },
+    summary="Start a background recalculation",
+    description="""
+    Accepts the same body as /recalculate but returns a job id immediately and
+    runs the algorithms in the background worker pool. Poll
+    GET /recalculate/jobs/{job_id} for status, progress and per-ruleset partial
+    results. Use this for groups large enough to exceed proxy timeouts.
+    """
+)
+async def create_recalculate_job(request: RecalculateRequest) -> RecalculateJobResponse:
+    """
+    Queue a recalculation job.
+
+    Args:
+        request: RecalculateRequest with group_id, preferences and optional ruleset selection/options
+
+    Returns:
+        RecalculateJobResponse for the queued job
+
+    Raises:
+        HTTPException: If validation fails, or 503 if too many jobs are unfinished
+    """
+    _validate_recalculate_request(request)
+    try:
+        job = recalculate_jobs.submit_recalculate_job(request)
+    except recalculate_jobs.JobStoreFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": "TooManyJobs",
+                "message": "Too many recalculation jobs are queued or running; retry later",
+                "details": {"max_jobs": e.max_jobs}
+            },
+            headers={"Retry-After": "30"}
+        )
+    return _job_response(job)
+
+
+@router.get(
+    "/recalculate/jobs/{job_id}",
+    response_model=RecalculateJobResponse,
+    responses={
+        404: {"model": ErrorResponse, "description": "Unknown or expired job"}
+    },
+    summary="Get background recalculation status"
+)
+async def get_recalculate_job(job_id: str) -> RecalculateJobResponse:
+    """
+    Return a job's status, progress and the rulesets finished so far.
+
+    Raises:
+        HTTPException: If the job does not exist or has expired
+    """
+    job = recalculate_jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "JobNotFound",
+                "message": "Job not found or expired",
+                "details": {"job_id": job_id}
+            }
+        )
+    return _job_response(job)
+
+
+@router.get(
+    "/recalculate/user_stats/{group_id}",
+    response_model=UserStatsPage,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid ruleset"},
+        404: {"model": ErrorResponse, "description": "No cached recalculation for this group and ruleset"}
+    },
+    summary="Page through per-user statistics",
+    description="""
+    Returns per-user statistics from the group's most recent /recalculate for
+    one ruleset, a page at a time, straight from the result cache. Pair with
+    `include_user_stats: false` on /recalculate to fetch group-level scores
+    first and per-user rows only when needed.
+    """
+)
+async def get_user_stats(
+    group_id: str,
+    ruleset: str = Query(..., description="Ruleset whose per-user statistics to return"),
+    offset: int = Query(0, ge=0, description="Index of the first user to return"),
+    limit: int = Query(100, ge=1, le=10000, description="Maximum number of users to return")
+) -> UserStatsPage:
+    """
+    Return one page of cached per-user statistics.
+
+    Raises:
+        HTTPException: If the ruleset is unknown or nothing is cached for the group
+    """
+    if ruleset not in matching_service.VALID_RULESETS:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "InvalidRuleset",
+                "message": f"Invalid ruleset. Must be one of: {', '.join(matching_service.VALID_RULESETS)}",
+                "details": {"provided_ruleset": ruleset, "valid_rulesets": matching_service.VALID_RULESETS}
+            }
+        )
+
+    page = matching_service.get_user_stats_page(group_id, ruleset, offset=offset, limit=limit)
+    if page is None:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "ResultNotFound",
+                "message": "No cached recalculation for this group and ruleset; call /recalculate first",
+                "details": {"group_id": group_id, "ruleset": ruleset}
+            }
+        )
+    return page
+
+
+def _validate_recalculate_request(request: RecalculateRequest) -> None:
+    """Validate ruleset names, then load and check the group, raising an HTTPException on failure."""
+    # Validate requested rulesets and option keys
+    requested = set(request.rulesets or []) | set(request.ruleset_options)
+    invalid = sorted(name for name in requested if name not in matching_service.VALID_RULESETS)
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "InvalidRuleset",
+                "message": f"Invalid ruleset. Must be one of: {', '.join(matching_service.VALID_RULESETS)}",
+                "details": {"provided_rulesets": invalid, "valid_rulesets": matching_service.VALID_RULESETS}
+            }
+        )
+
+    prepare_group_preferences(request)
+
+
+async def _batch_events(request: BatchRecalculateRequest) -> AsyncIterator[dict]:
+    """Report invalid groups up front, then stream results for the valid ones."""
+    # Loading and checking groups is CPU-bound, so it runs on the worker pool, not the event loop
+    loop = asyncio.get_running_loop()
+    checks = [loop.run_in_executor(worker_pool.executor, _batch_item_error, item) for item in request.requests]
+
+    valid = []
+    for i, item in enumerate(request.requests):
+        error = await checks[i]
+        if error is None:
+            valid.append(i)
+        else:
+            yield {"event": "error", "index": i, "group_id": item.group_id, **error}
+
+    if valid:
+        async for event in stream_batch(request.requests, valid):
+            yield event
+
+    yield {"event": "done", "count": len(request.requests)}
+
+
+def _batch_item_error(request: RecalculateRequest) -> Optional[dict]:
+    """Validate one batch item, returning its error detail or None if it is valid."""
+    try:
+        _validate_recalculate_request(request)
+    except HTTPException as e:
+        return e.detail
+    return None
+
+
+async def _format_ndjson(events: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    """Format stream events as newline-delimited JSON."""
+    async for event in events:
+        yield fast_json.dumps(event) + b"\n"
+
+
+async def _format_sse(events: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    """Format stream events as server-sent events."""
+    async for event in events:
+        yield b"event: " + event["event"].encode() + b"\ndata: " + fast_json.dumps(event) + b"\n\n"
+
+
+def _job_response(job: recalculate_jobs.RecalculateJob) -> RecalculateJobResponse:
+    """Snapshot a job's current state into its response model."""
+    results = dict(job.results)
+    return RecalculateJobResponse(
+        job_id=job.job_id,
+        group_id=job.group_id,
+        status=job.status,
+        progress=len(results) / len(job.rulesets),
+        pending_rulesets=[name for name in job.rulesets if name not in results],
+        rulesets=results,
+        error=job.error,
+        created_at=job.created_at,
+        finished_at=job.finished_at
+    )
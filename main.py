@@ -4,9 +4,25 @@ P-resents API
 FastAPI service for gift exchange matching algorithms.
 Supports multiple rulesets: Secret Santa (Random, Max Utility, Max Fairness) and White Elephant.
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from controllers import recalculate, finalize
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES
+from controllers import recalculate, finalize, groups, profiles
+from services import warmup, profiling, watchdog
+from utils.metrics import ServerTimingMiddleware, render_metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start warm-up (background in fast-start mode) and the event-loop watchdog before serving."""
+    warmup.start()
+    watchdog.start()
+    yield
+    watchdog.stop()
+
 
 # Create FastAPI app
 app = FastAPI(
@@ -14,7 +30,8 @@ app = FastAPI(
     description="Gift exchange matching algorithms service",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -26,9 +43,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large JSON bodies for clients that accept gzip. Streaming NDJSON is
+# left uncompressed so each line still reaches the client as soon as it is ready.
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=1024,
+    compresslevel=5,
+    exclude_content_types=DEFAULT_EXCLUDED_CONTENT_TYPES + ("application/x-ndjson",)
+)
+
+# Break each response's time down (validation, utility build, rulesets,
+# serialization) in a Server-Timing header, and log slow requests
+app.add_middleware(ServerTimingMiddleware, on_complete=watchdog.log_slow_request)
+
+# Opt-in per-request profiling (?profile=1); not installed at all unless enabled
+if profiling.ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+
 # Register routers
 app.include_router(recalculate.router, tags=["Matching"])
 app.include_router(finalize.router, tags=["Matching"])
+app.include_router(groups.router, tags=["Groups"])
+if profiling.ENABLED:
+    app.include_router(profiles.router, tags=["Profiling"])
 
 
 @app.get("/", tags=["Health"])
@@ -41,7 +78,13 @@ async def root():
         "endpoints": {
             "docs": "/docs",
             "recalculate": "POST /recalculate",
-            "finalize": "POST /finalize_group"
+            "recalculate_stream": "POST /recalculate/stream",
+            "recalculate_batch": "POST /recalculate/batch",
+            "recalculate_jobs": "POST /recalculate/jobs, GET /recalculate/jobs/{job_id}",
+            "recalculate_user_stats": "GET /recalculate/user_stats/{group_id}",
+            "finalize": "POST /finalize_group",
+            "group_preferences": "PUT/PATCH /groups/{group_id}/preferences",
+            "metrics": "GET /metrics"
         }
     }
 
@@ -52,4 +95,17 @@ async def health_check():
     return {
         "status": "healthy",
         "service": "p-resents-api"
-    }
\ No newline at end of file
+    }
+
+
+@app.get("/ready", tags=["Health"])
+async def readiness_check():
+    """Readiness endpoint - 200 once solvers are loaded and warmed up, 503 before."""
+    state = warmup.status()
+    return JSONResponse(status_code=200 if warmup.is_ready() else 503, content=state)
+
+
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus metrics: ruleset compute times, group sizes, cache hits, queue wait and serialization times."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
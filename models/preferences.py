@@ -1,8 +1,8 @@
 """
 Pydantic models for user preferences.
 """
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List
+from pydantic import BaseModel, Field, ConfigDict, model_validator
+from typing import List, Optional
 
 
 class UserPreference(BaseModel):
@@ -31,6 +31,9 @@ class UserPreference(BaseModel):
     # Exclusions
     exclusions: List[str] = Field(default_factory=list, description="List of user IDs to exclude from matching")
 
+    # Sub-groups
+    partition: Optional[str] = Field(None, description="Sub-group (e.g. office or team) the user is matched within; if anyone has one, users without one form their own sub-group")
+
     model_config = ConfigDict(
         json_schema_extra={
             "example": {
@@ -48,3 +51,110 @@ class UserPreference(BaseModel):
             }
         }
     )
+
+
+# Per-user score columns of ColumnarPreferences, all on the 1-5 scale
+SCORE_COLUMNS = (
+    "preference_practicality_giving",
+    "preference_practicality_receiving",
+    "preference_novelty_giving",
+    "preference_novelty_receiving",
+    "preference_thoughtfulness_giving",
+    "preference_thoughtfulness_receiving",
+    "we_hate_being_stolen_from",
+    "we_enjoy_stealing",
+)
+
+
+class ColumnarPreferences(BaseModel):
+    """
+    A whole group's preferences as parallel arrays (struct-of-arrays).
+
+    Equivalent to a list of UserPreference objects, but validated in bulk
+    and converted straight into arrays for the utility engine, which keeps
+    large groups cheap to parse. Entry i of every per-user array belongs to
+    user_ids[i].
+
+    - Interests are flattened: user i's interests are
+      interest_values[interest_offsets[i]:interest_offsets[i + 1]], so
+      interest_offsets has one more entry than user_ids.
+    - Exclusions are an edge list of indexes into user_ids: user
+      exclusion_sources[k] excludes user exclusion_targets[k].
+    - partitions (optional) gives each user's sub-group; users only match
+      within their sub-group.
+    """
+    user_ids: List[str] = Field(..., min_length=2, description="UUIDs of the users (minimum 2 users)")
+
+    preference_practicality_giving: List[int] = Field(..., description="How practical gifts each user likes to give (1-5)")
+    preference_practicality_receiving: List[int] = Field(..., description="How practical gifts each user likes to receive (1-5)")
+    preference_novelty_giving: List[int] = Field(..., description="How novel/unique gifts each user likes to give (1-5)")
+    preference_novelty_receiving: List[int] = Field(..., description="How novel/unique gifts each user likes to receive (1-5)")
+    preference_thoughtfulness_giving: List[int] = Field(..., description="How thoughtful gifts each user likes to give (1-5)")
+    preference_thoughtfulness_receiving: List[int] = Field(..., description="How thoughtful gifts each user likes to receive (1-5)")
+
+    interest_offsets: List[int] = Field(default_factory=list, description="Start of each user's interests in interest_values, plus a final end offset (optional)")
+    interest_values: List[str] = Field(default_factory=list, description="All users' interests, concatenated")
+
+    we_hate_being_stolen_from: List[int] = Field(..., description="How much each user dislikes being stolen from (1-5)")
+    we_enjoy_stealing: List[int] = Field(..., description="How much each user enjoys stealing (1-5)")
+
+    exclusion_sources: List[int] = Field(default_factory=list, description="Index of the excluding user, one per exclusion")
+    exclusion_targets: List[int] = Field(default_factory=list, description="Index of the excluded user, one per exclusion")
+
+    partitions: Optional[List[Optional[str]]] = Field(None, description="Sub-group each user is matched within, one per user (null entries form their own sub-group; optional)")
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "user_ids": ["Samuel", "Liam", "Sam"],
+                "preference_practicality_giving": [5, 3, 4],
+                "preference_practicality_receiving": [4, 3, 4],
+                "preference_novelty_giving": [3, 5, 2],
+                "preference_novelty_receiving": [3, 5, 2],
+                "preference_thoughtfulness_giving": [5, 4, 4],
+                "preference_thoughtfulness_receiving": [4, 2, 4],
+                "interest_offsets": [0, 2, 3, 3],
+                "interest_values": ["Coding", "Coffee", "Music"],
+                "we_hate_being_stolen_from": [3, 1, 4],
+                "we_enjoy_stealing": [3, 5, 2],
+                "exclusion_sources": [0],
+                "exclusion_targets": [2]
+            }
+        }
+    )
+
+    @model_validator(mode="after")
+    def _validate_columns(self) -> "ColumnarPreferences":
+        """Check array lengths and value ranges for the whole group at once."""
+        n = len(self.user_ids)
+
+        for column in SCORE_COLUMNS:
+            values = getattr(self, column)
+            if len(values) != n:
+                raise ValueError(f"{column} has {len(values)} entries, expected {n} (one per user)")
+            if min(values) < 1 or max(values) > 5:
+                raise ValueError(f"{column} values must be between 1 and 5")
+
+        if not self.interest_offsets:
+            if self.interest_values:
+                raise ValueError("interest_offsets is required when interest_values is given")
+            self.interest_offsets = [0] * (n + 1)
+        offsets = self.interest_offsets
+        if len(offsets) != n + 1:
+            raise ValueError(f"interest_offsets has {len(offsets)} entries, expected {n + 1} (one per user plus the end offset)")
+        if offsets[0] != 0 or offsets[-1] != len(self.interest_values):
+            raise ValueError("interest_offsets must start at 0 and end at len(interest_values)")
+        if any(start > end for start, end in zip(offsets, offsets[1:])):
+            raise ValueError("interest_offsets must be non-decreasing")
+
+        if len(self.exclusion_sources) != len(self.exclusion_targets):
+            raise ValueError("exclusion_sources and exclusion_targets must have the same length")
+        if self.exclusion_sources:
+            endpoints = (self.exclusion_sources, self.exclusion_targets)
+            if min(map(min, endpoints)) < 0 or max(map(max, endpoints)) >= n:
+                raise ValueError(f"exclusion indexes must be between 0 and {n - 1}")
+
+        if self.partitions is not None and len(self.partitions) != n:
+            raise ValueError(f"partitions has {len(self.partitions)} entries, expected {n} (one per user)")
+
+        return self
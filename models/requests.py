@@ -1,19 +1,102 @@
 """
 Pydantic models for API requests.
 """
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
-from models.preferences import UserPreference
+from pydantic import BaseModel, Field, ConfigDict, PrivateAttr, model_validator
+from typing import Any, ClassVar, Dict, List, Literal, Optional, Tuple, Union
+from models.preferences import UserPreference, ColumnarPreferences
 
 
-class RecalculateRequest(BaseModel):
+class RulesetOptions(BaseModel):
     """
-    Request body for /recalculate endpoint.
+    Per-ruleset tuning options for /recalculate and /finalize_group.
+
+    /finalize_group takes the options used in /recalculate, so it reuses the
+    reviewed matching; they are also part of its default idempotency key.
+    Options that do not apply to a ruleset are ignored by it.
+    """
+    num_simulations: Optional[int] = Field(None, ge=1, le=100000, description="Number of games to simulate (White Elephant, default 1000)")
+    fairness_objective: Optional[Literal["minimax", "variance"]] = Field(None, description="Fairness objective to optimize (Max Fairness, default 'minimax')")
+    max_utility_mode: Optional[Literal["auto", "exact", "top_k"]] = Field(None, description="'exact' dense solve, 'top_k' approximate solve on each user's best candidates, or 'auto' (top_k for very large groups) (Max Utility, default 'auto')")
+    top_k: Optional[int] = Field(None, ge=1, le=1024, description="Candidates kept per user in top_k mode, doubled until a matching exists (Max Utility, default 16)")
+    pareto_points: Optional[int] = Field(None, ge=2, le=50, description="Fairness weights swept between Max Utility and Max Fairness (Pareto Frontier, default 7)")
+    pareto_option: Optional[int] = Field(None, ge=0, description="Frontier option whose matching is used (Pareto Frontier, default the most balanced one)")
+
+
+class PreferencePayload(BaseModel):
+    """
+    A group's preferences in either request format.
 
-    Runs all matching algorithms and returns statistics for comparison.
+    Preferences arrive either as a list of per-user objects (`preferences`)
+    or as parallel arrays (`columnar_preferences`); exactly one of
+    PAYLOAD_FIELDS must be given. Once the controller has loaded and checked
+    the group, the resulting PreferenceArrays are attached to the request and
+    used in place of the raw payload.
     """
+    PAYLOAD_FIELDS: ClassVar[Tuple[str, ...]] = ("preferences", "columnar_preferences")
+
+    preferences: Optional[List[UserPreference]] = Field(None, min_length=2, description="List of user preferences (minimum 2 users)")
+    columnar_preferences: Optional[ColumnarPreferences] = Field(None, description="The same preferences as parallel arrays, for large groups (use instead of preferences)")
+
+    _resolved_preferences: Any = PrivateAttr(default=None)
+
+    @model_validator(mode="after")
+    def _require_one_preferences_source(self):
+        """Exactly one of PAYLOAD_FIELDS must be provided."""
+        given = [name for name in self.PAYLOAD_FIELDS if getattr(self, name) is not None]
+        if len(given) != 1:
+            raise ValueError(f"Provide exactly one of {', '.join(self.PAYLOAD_FIELDS)}")
+        return self
+
+    @property
+    def preference_payload(self) -> Union[List[UserPreference], ColumnarPreferences, Any]:
+        """The attached preference arrays if any, else whichever format the request used."""
+        if self._resolved_preferences is not None:
+            return self._resolved_preferences
+        return self.preferences if self.preferences is not None else self.columnar_preferences
+
+    def attach_preferences(self, arrays: Any) -> None:
+        """Attach PreferenceArrays (loaded from the group store and/or validated) to the request."""
+        self._resolved_preferences = arrays
+
+    @property
+    def group_size(self) -> int:
+        """Number of users in the group (0 for stored preferences not loaded yet)."""
+        if self._resolved_preferences is not None:
+            return self._resolved_preferences.size
+        if self.preferences is not None:
+            return len(self.preferences)
+        if self.columnar_preferences is not None:
+            return len(self.columnar_preferences.user_ids)
+        return 0
+
+
+class GroupPreferencesRequest(PreferencePayload):
+    """
+    Base for compute requests on a group.
+
+    Besides sending preferences inline, a client that stored the group with
+    PUT /groups/{group_id}/preferences can send just `preferences_version`.
+    """
+    PAYLOAD_FIELDS: ClassVar[Tuple[str, ...]] = ("preferences", "columnar_preferences", "preferences_version")
+
     group_id: str = Field(..., description="UUID of the group")
-    preferences: List[UserPreference] = Field(..., min_length=2, description="List of user preferences (minimum 2 users)")
+    preferences_version: Optional[int] = Field(None, ge=1, description="Use the group's stored preferences at this version instead of sending them (see PUT /groups/{group_id}/preferences)")
+    exclusion_mode: Literal["symmetric", "directed", "strict"] = Field(
+        "symmetric",
+        description="How exclusions apply: 'symmetric' blocks both directions, 'directed' only the excluder giving to the excluded, 'strict' is symmetric but rejects one-sided exclusions"
+    )
+
+
+class RecalculateRequest(GroupPreferencesRequest):
+    """
+    Request body for /recalculate endpoint.
+
+    Runs the requested matching algorithms (all of them by default) and returns
+    statistics for comparison.
+    """
+    rulesets: Optional[List[str]] = Field(None, min_length=1, description="Rulesets to compute (optional, defaults to all rulesets except opt-in ones such as 'Pareto Frontier')")
+    ruleset_options: Dict[str, RulesetOptions] = Field(default_factory=dict, description="Per-ruleset options keyed by ruleset name (optional)")
+    include_user_stats: bool = Field(True, description="Include per-user statistics; set false for group-level scores only and page them via GET /recalculate/user_stats/{group_id}")
 
     model_config = ConfigDict(
         json_schema_extra={
@@ -130,16 +213,30 @@ class RecalculateRequest(BaseModel):
     )
 
 
-class FinalizeGroupRequest(BaseModel):
+class BatchRecalculateRequest(BaseModel):
+    """
+    Request body for /recalculate/batch endpoint.
+
+    Recalculates many groups in one call; each entry is a full /recalculate body.
+    """
+    requests: List[RecalculateRequest] = Field(..., min_length=1, max_length=10000, description="Recalculate requests, one per group")
+
+
+class FinalizeGroupRequest(GroupPreferencesRequest):
     """
     Request body for /finalize_group endpoint.
 
     Generates final pairings for the chosen ruleset.
     """
-    group_id: str = Field(..., description="UUID of the group")
-    ruleset: str = Field(..., description="Chosen ruleset: 'Random Matching', 'Max Utility', 'Max Fairness', or 'White Elephant'")
-    preferences: List[UserPreference] = Field(..., min_length=2, description="List of user preferences (minimum 2 users)")
+    ruleset: str = Field(..., description="Chosen ruleset: 'Random Matching', 'Max Utility', 'Max Fairness', 'Pareto Frontier', or 'White Elephant'")
     seed: Optional[int] = Field(None, description="Random seed for reproducible results (optional)")
+    options: Optional[RulesetOptions] = Field(None, description="Ruleset options used in /recalculate, so the reviewed matching is reused (optional)")
+    idempotency_key: Optional[str] = Field(
+        None,
+        min_length=1,
+        max_length=200,
+        description="Key under which the result is stored; repeating it returns the stored result (optional, also accepted as the Idempotency-Key header; defaults to a hash of group_id, preferences, ruleset, options and seed)"
+    )
 
     model_config = ConfigDict(
         json_schema_extra={
@@ -256,3 +353,21 @@ class FinalizeGroupRequest(BaseModel):
             }
         }
     )
+
+
+class GroupPreferencesPatch(BaseModel):
+    """
+    Request body for PATCH /groups/{group_id}/preferences.
+
+    Changes individual members of a stored group without resending it.
+    """
+    upsert: List[UserPreference] = Field(default_factory=list, description="Members to add, or to replace (matched by user_id)")
+    remove: List[str] = Field(default_factory=list, description="User IDs of members to remove")
+    expected_version: Optional[int] = Field(None, ge=1, description="Reject the update unless the group is still at this version (optional)")
+
+    @model_validator(mode="after")
+    def _require_changes(self):
+        """At least one member must be upserted or removed."""
+        if not self.upsert and not self.remove:
+            raise ValueError("Provide at least one member to upsert or remove")
+        return self
@@ -16,6 +16,17 @@ class UserStats(BaseModel):
     times_stole_pct: Optional[float] = Field(None, description="Percentage of times stole (White Elephant)")
 
 
+class ParetoOption(BaseModel):
+    """One matching on the utility-versus-fairness frontier (Pareto Frontier ruleset)."""
+    option: int = Field(..., description="Index to pass as pareto_option to /finalize_group")
+    fairness_weight: float = Field(..., description="Sweep position where the matching was found (0 = utility only, 1 = highest possible floor)")
+    utility_floor: float = Field(..., description="Minimum utility everyone was guaranteed while maximizing total utility")
+    group_satisfaction_score: float = Field(..., description="Average utility in this matching")
+    group_fairness_score: float = Field(..., description="Fairness metric of this matching")
+    min_utility: float = Field(..., description="Minimum utility in this matching")
+    std_dev: float = Field(..., description="Standard deviation of utilities in this matching")
+
+
 class RulesetStats(BaseModel):
     """Statistics for one matching algorithm/ruleset."""
     group_satisfaction_score: float = Field(..., description="Overall group satisfaction")
@@ -30,6 +41,14 @@ class RulesetStats(BaseModel):
     max_steals_observed: Optional[int] = Field(None, description="Max steals observed (White Elephant)")
     simulations_run: Optional[int] = Field(None, description="Number of simulations run (White Elephant)")
 
+    # Approximate Max Utility specific (top_k mode)
+    utility_upper_bound: Optional[float] = Field(None, description="Upper bound on the best achievable group_satisfaction_score (approximate Max Utility)")
+    optimality_gap: Optional[float] = Field(None, description="Most the score can fall short of the best matching, as a fraction of utility_upper_bound (approximate Max Utility)")
+    candidates_per_user: Optional[int] = Field(None, description="Candidate givers/receivers kept per user in the pruned solve (approximate Max Utility)")
+
+    # Pareto Frontier specific
+    pareto_options: Optional[List[ParetoOption]] = Field(None, description="Pareto-optimal trade-offs between total utility and minimum utility, from most utility to most fairness (Pareto Frontier)")
+
 
 class RecalculateResponse(BaseModel):
     """
@@ -72,6 +91,38 @@ class RecalculateResponse(BaseModel):
     )
 
 
+class UserStatsPage(BaseModel):
+    """
+    One page of per-user statistics from a group's latest recalculation
+    (GET /recalculate/user_stats/{group_id}).
+    """
+    group_id: str = Field(..., description="UUID of the group")
+    ruleset: str = Field(..., description="Ruleset the statistics belong to")
+    preferences_hash: str = Field(..., description="Fingerprint of the preferences the statistics were computed from")
+    total_users: int = Field(..., description="Number of users in the group")
+    offset: int = Field(..., description="Index of the first user on this page")
+    limit: int = Field(..., description="Maximum number of users per page")
+    user_stats: Dict[str, UserStats] = Field(default_factory=dict, description="Per-user statistics for this page, in group order")
+
+
+class RecalculateJobResponse(BaseModel):
+    """
+    Status of a background recalculation job (POST/GET /recalculate/jobs).
+
+    Rulesets appear in `rulesets` as soon as they finish, so clients can show
+    partial results while the rest are still computing.
+    """
+    job_id: str = Field(..., description="ID to poll with GET /recalculate/jobs/{job_id}")
+    group_id: str = Field(..., description="UUID of the group")
+    status: str = Field(..., description="One of: queued, running, completed, failed")
+    progress: float = Field(..., description="Fraction of requested rulesets finished (0-1)")
+    pending_rulesets: List[str] = Field(default_factory=list, description="Requested rulesets not finished yet")
+    rulesets: Dict[str, RulesetStats] = Field(default_factory=dict, description="Statistics for finished rulesets")
+    error: Optional[str] = Field(None, description="Error message if the job failed")
+    created_at: datetime = Field(..., description="When the job was submitted")
+    finished_at: Optional[datetime] = Field(None, description="When the job finished")
+
+
 class FinalizeResponse(BaseModel):
     """
     Response from /finalize_group endpoint.
@@ -103,6 +154,35 @@ class FinalizeResponse(BaseModel):
     )
 
 
+class GroupVersionResponse(BaseModel):
+    """Version of a group's stored preferences (PUT/PATCH /groups/{group_id}/preferences)."""
+    group_id: str = Field(..., description="UUID of the group")
+    version: int = Field(..., description="Version to pass as preferences_version to the compute endpoints")
+    num_users: int = Field(..., description="Number of users in the stored group")
+    updated_at: str = Field(..., description="ISO timestamp of this version")
+
+
+class ProfiledFunction(BaseModel):
+    """One function's entry in a request profile."""
+    function: str = Field(..., description="file:line(function), with paths relative to the app root")
+    calls: int = Field(..., description="Number of calls (including recursive calls)")
+    own_seconds: float = Field(..., description="Time spent in the function itself")
+    cumulative_seconds: float = Field(..., description="Time spent in the function and everything it called")
+    highlight: bool = Field(False, description="True for algorithm and matching service code")
+
+
+class RequestProfile(BaseModel):
+    """A profiled request (GET /profiles/{profile_id})."""
+    profile_id: str = Field(..., description="ID of the profile")
+    method: str = Field(..., description="HTTP method of the profiled request")
+    path: str = Field(..., description="Path of the profiled request")
+    status_code: Optional[int] = Field(None, description="Response status code")
+    total_seconds: float = Field(..., description="Wall time of the profiled request")
+    created_at: datetime = Field(..., description="When the request was profiled")
+    hot_spots: List[ProfiledFunction] = Field(default_factory=list, description="Highlighted functions by cumulative time")
+    functions: List[ProfiledFunction] = Field(default_factory=list, description="Top functions by cumulative time")
+
+
 class ErrorResponse(BaseModel):
     """Standard error response."""
     error: str = Field(..., description="Error type")
@@ -0,0 +1,188 @@
+"""
+Scaling benchmark.
+
+Times every ruleset and both compute endpoints on synthetic groups
+(tests/synthetic_groups.py) of increasing size, and reports per run:
+- seconds: best wall time over the repeats, after warming up the process
+  on a tiny group (lazy imports are not timed)
+- peak_rss_mb: peak resident memory of the run's process
+- baseline_rss_mb: resident memory after imports and group generation,
+  before the measured work (peak - baseline is the work's own footprint)
+- status: "ok", "error" (with a message) or "timeout"
+
+Targets are "context" (building the GroupContext, i.e. the utility matrix
+and exclusion mask), each ruleset by name (computed through the matching
+service), "/recalculate" (default rulesets) and "/finalize_group" (Max
+Utility). Every (size, target) pair runs in a fresh interpreter, so peak
+memory is not inherited from earlier runs and a run that exceeds
+--timeout is killed without stopping the rest.
+
+With --offices K every group is split into K offices that match
+internally (partitions), so the solvers work on K independent components.
+
+Results are printed (or written with --output) as JSON together with the
+environment they were measured in; pass an earlier results file with
+--compare to add each run's speedup relative to it.
+
+Usage:
+    python scripts/benchmark_scaling.py [--sizes 8 64 512 4096 16384] [--targets ...]
+        [--repeats 3] [--timeout 600] [--seed 0] [--offices 0] [--output results.json] [--compare old.json]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from algorithms.registry import ruleset_names  # noqa: E402
+
+DEFAULT_SIZES = (8, 64, 512, 4096, 16384)
+ENDPOINTS = ("/recalculate", "/finalize_group")
+FINALIZE_RULESET = "Max Utility"
+
+CHILD = r"""
+import json, resource, sys, time
+from tests.synthetic_groups import generate_group
+
+n, target, repeats, seed, offices = int(sys.argv[1]), sys.argv[2], int(sys.argv[3]), int(sys.argv[4]), int(sys.argv[5])
+group = generate_group(n, seed=seed, offices=offices)
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+if target in ("/recalculate", "/finalize_group"):
+    from fastapi.testclient import TestClient
+    from main import app
+    client = TestClient(app)
+    def run(group, i):
+        body = {"group_id": f"bench_{len(group['user_ids'])}_{i}", "columnar_preferences": group}
+        if target == "/finalize_group":
+            body["ruleset"] = %(finalize)r
+        response = client.post(target, json=body)
+        if response.status_code != 200:
+            raise RuntimeError(f"{response.status_code}: {response.text[:200]}")
+else:
+    from models.preferences import ColumnarPreferences
+    from services import matching_service
+    from utils.group_context import build_group_context
+    def run(group, i):
+        preferences = matching_service.validate_preferences(ColumnarPreferences(**group))
+        if target == "context":
+            build_group_context(preferences)
+            return
+        stats = matching_service.run_all_algorithms(preferences, rulesets=[target], group_id=f"bench_{len(group['user_ids'])}_{i}")
+        if stats[target].group_satisfaction_score == 0.0 and not stats[target].user_stats:
+            raise RuntimeError(f"{target} failed")
+
+# Warm up on a tiny group first so lazy imports (numpy, scipy) are not timed
+run(generate_group(8, seed=seed), "warmup")
+baseline = rss_mb()
+times = []
+for i in range(repeats):
+    started = time.perf_counter()
+    run(group, i)
+    times.append(time.perf_counter() - started)
+print(json.dumps({"seconds": min(times), "peak_rss_mb": rss_mb(), "baseline_rss_mb": baseline}))
+""" % {"finalize": FINALIZE_RULESET}
+
+
+def run_one(n: int, target: str, repeats: int, seed: int, timeout: float, offices: int = 0) -> dict:
+    """Run one (size, target) measurement in a fresh interpreter."""
+    result = {"n_users": n, "target": target}
+    try:
+        completed = subprocess.run(
+            [sys.executable, "-c", CHILD, str(n), target, str(repeats), str(seed), str(offices)],
+            cwd=ROOT,
+            env={**os.environ, "PRESENTS_PREWARM": "0"},
+            capture_output=True,
+            text=True,
+            timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return {**result, "status": "timeout", "timeout_s": timeout}
+
+    if completed.returncode != 0:
+        message = (completed.stderr.strip().splitlines() or [f"exit code {completed.returncode}"])[-1]
+        return {**result, "status": "error", "message": message}
+    measured = json.loads(completed.stdout.strip().splitlines()[-1])
+    return {
+        **result,
+        "status": "ok",
+        "seconds": round(measured["seconds"], 6),
+        "peak_rss_mb": round(measured["peak_rss_mb"], 1),
+        "baseline_rss_mb": round(measured["baseline_rss_mb"], 1)
+    }
+
+
+def environment() -> dict:
+    """Describe where the results were measured, so runs can be compared fairly."""
+    import numpy
+    import scipy
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "measured_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "scipy": scipy.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def add_comparison(results: list, baseline_path: str) -> None:
+    """Add speedup (baseline seconds / current seconds) to runs measured in both files."""
+    with open(baseline_path) as f:
+        baseline = {(r["n_users"], r["target"]): r for r in json.load(f)["results"]}
+    for result in results:
+        previous = baseline.get((result["n_users"], result["target"]))
+        if previous and previous.get("status") == "ok" and result["status"] == "ok":
+            result["baseline_seconds"] = previous["seconds"]
+            result["speedup"] = round(previous["seconds"] / result["seconds"], 2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--targets", nargs="+", default=["context", *ruleset_names(), *ENDPOINTS])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds before a single run is killed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--offices", type=int, default=0, help="Split each group into this many partitions")
+    parser.add_argument("--output", help="Write results to this file instead of stdout")
+    parser.add_argument("--compare", help="Earlier results file to compute speedups against")
+    args = parser.parse_args()
+
+    results = []
+    for n in args.sizes:
+        for target in args.targets:
+            started = time.perf_counter()
+            result = run_one(n, target, args.repeats, args.seed, args.timeout, args.offices)
+            results.append(result)
+            print(f"n={n:<6} {target:<20} {result['status']:<8} {time.perf_counter() - started:8.2f}s", file=sys.stderr)
+
+    if args.compare:
+        add_comparison(results, args.compare)
+
+    report = json.dumps({"environment": {**environment(), "seed": args.seed, "repeats": args.repeats, "offices": args.offices}, "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
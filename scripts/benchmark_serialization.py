@@ -0,0 +1,118 @@
+"""
+Response serialization benchmark.
+
+Compares, for synthetic groups of several sizes, how long it takes to build
+and ship a four-ruleset RecalculateResponse:
+- legacy: one UserStats model per user, returned through FastAPI's
+  response_model validation and the stdlib JSON encoder
+- fast: stats built from NumPy columns converted with tolist()
+  (build_ruleset_stats) and returned as a FastJSONResponse
+It also times encoding one /recalculate/stream event line with the stdlib
+encoder versus utils.fast_json, and reports the response size with and
+without gzip. Output is JSON.
+
+Usage:
+    python scripts/benchmark_serialization.py [n_users ...]
+"""
+import gzip
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from models.responses import RecalculateResponse, RulesetStats, UserStats
+from utils import fast_json
+from utils.fast_json import FastJSONResponse
+from utils.matching_stats import build_ruleset_stats
+
+RULESETS = ("Random Matching", "Max Utility", "Max Fairness", "White Elephant")
+REPEATS = 20
+
+
+def _legacy_stats(user_ids, utilities):
+    return RulesetStats(
+        group_satisfaction_score=float(utilities.mean()),
+        group_fairness_score=5.0,
+        std_dev=float(utilities.std()),
+        user_stats={
+            user_id: UserStats(expected_utility=float(utilities[i]), variance=0.0)
+            for i, user_id in enumerate(user_ids)
+        }
+    )
+
+
+def _fast_stats(user_ids, utilities):
+    return build_ruleset_stats(
+        user_ids,
+        {"expected_utility": utilities, "variance": np.zeros(len(user_ids))},
+        group_satisfaction_score=float(utilities.mean()),
+        group_fairness_score=5.0,
+        std_dev=float(utilities.std())
+    )
+
+
+def _make_app(user_ids, utilities) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/legacy", response_model=RecalculateResponse)
+    def legacy():
+        stats = _legacy_stats(user_ids, utilities)
+        return RecalculateResponse(group_id="bench", rulesets={name: stats for name in RULESETS})
+
+    @app.get("/fast", response_model=RecalculateResponse)
+    def fast():
+        stats = _fast_stats(user_ids, utilities)
+        return FastJSONResponse(RecalculateResponse(group_id="bench", rulesets={name: stats for name in RULESETS}))
+
+    return app
+
+
+def _time_ms(client: TestClient, path: str) -> float:
+    client.get(path)
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        client.get(path, headers={"Accept-Encoding": "identity"})
+    return (time.perf_counter() - started) / REPEATS * 1000
+
+
+def _encode_ms(encode, event) -> float:
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        encode(event)
+    return (time.perf_counter() - started) / REPEATS * 1000
+
+
+def benchmark(n: int) -> dict:
+    user_ids = [f"user_{i}" for i in range(n)]
+    utilities = np.random.default_rng(0).uniform(0, 10, n)
+    client = TestClient(_make_app(user_ids, utilities))
+
+    legacy_ms = _time_ms(client, "/legacy")
+    fast_ms = _time_ms(client, "/fast")
+    body = client.get("/fast").content
+    assert json.loads(body) == client.get("/legacy").json()
+
+    event = {"event": "ruleset", "ruleset": RULESETS[0], "stats": _fast_stats(user_ids, utilities).model_dump(mode="json")}
+    stream_legacy_ms = _encode_ms(lambda e: (json.dumps(e) + "\n").encode(), event)
+    stream_fast_ms = _encode_ms(lambda e: fast_json.dumps(e) + b"\n", event)
+
+    return {
+        "n_users": n,
+        "legacy_ms": round(legacy_ms, 2),
+        "fast_ms": round(fast_ms, 2),
+        "speedup": round(legacy_ms / fast_ms, 2),
+        "stream_line_legacy_ms": round(stream_legacy_ms, 3),
+        "stream_line_fast_ms": round(stream_fast_ms, 3),
+        "bytes": len(body),
+        "gzip_bytes": len(gzip.compress(body, compresslevel=5))
+    }
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 5000]
+    print(json.dumps([benchmark(n) for n in sizes], indent=2))
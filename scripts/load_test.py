@@ -0,0 +1,199 @@
+"""
+Concurrent load test.
+
+Drives the API with a fixed number of concurrent clients per level, each
+sending requests back to back from a weighted mix of endpoints and group
+sizes (synthetic groups from tests/synthetic_groups.py), while a probe
+polls /health. Per concurrency level it reports, as JSON:
+- throughput_rps, error_rate and p50/p95/p99 latency of the mix, overall
+  and per mix entry
+- health_ms: p50/p95/p99 latency of the /health probe, measured from when
+  each probe was due (so waiting for a blocked event loop counts)
+- loop_lag_ms: p50/p95/p99/max event-loop scheduling delay
+
+Every request uses a fresh group_id, so results are computed rather than
+served from the result cache.
+
+By default the ASGI app runs in-process (httpx.ASGITransport), so the
+measured event loop is the app's own loop. With --url the load goes to a
+running server over HTTP; loop_lag_ms is then the load generator's own
+loop and /health latency is the signal for the server.
+
+"capacity" is the highest level whose /health p99 stays within
+--health-slo-ms and whose error rate stays within --max-error-rate.
+
+Usage:
+    python scripts/load_test.py [--levels 1 2 4 8] [--duration 10]
+        [--mix recalculate:8=6 recalculate:64=3 finalize:64=1]
+        [--url http://127.0.0.1:8000] [--output load.json]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+from scripts.benchmark_scaling import environment  # noqa: E402
+from tests.synthetic_groups import generate_group  # noqa: E402
+
+ENDPOINTS = {"recalculate": "/recalculate", "finalize": "/finalize_group"}
+DEFAULT_MIX = ("recalculate:8=6", "recalculate:64=3", "finalize:64=1")
+HEALTH_INTERVAL = 0.1
+LAG_INTERVAL = 0.01
+
+_request_ids = itertools.count()
+
+
+def parse_mix(entries: List[str]) -> List[dict]:
+    """Parse "endpoint:size=weight" entries (weight optional, default 1)."""
+    mix = []
+    for entry in entries:
+        target, _, weight = entry.partition("=")
+        endpoint, _, size = target.partition(":")
+        if endpoint not in ENDPOINTS or not size.isdigit():
+            raise ValueError(f"Invalid mix entry {entry!r}; expected endpoint:size[=weight] with endpoint in {list(ENDPOINTS)}")
+        mix.append({"name": target, "endpoint": endpoint, "group": generate_group(int(size)), "weight": float(weight or 1)})
+    return mix
+
+
+def _body(entry: dict) -> dict:
+    body = {"group_id": f"load_{entry['name']}_{next(_request_ids)}", "columnar_preferences": entry["group"]}
+    if entry["endpoint"] == "finalize":
+        body["ruleset"] = "Max Utility"
+    return body
+
+
+def _percentiles(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(p50, 2), "p95": round(p95, 2), "p99": round(p99, 2), "max": round(max(values), 2)}
+
+
+async def run_level(client: httpx.AsyncClient, mix: List[dict], concurrency: int, duration: float) -> dict:
+    """Run `concurrency` clients for `duration` seconds and summarize."""
+    rng = random.Random(concurrency)
+    weights = [entry["weight"] for entry in mix]
+    samples: List[tuple] = []  # (mix entry name, latency_ms, ok)
+    health_ms: List[float] = []
+    lag_ms: List[float] = []
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            entry = rng.choices(mix, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await client.post(ENDPOINTS[entry["endpoint"]], json=_body(entry))
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            samples.append((entry["name"], (time.perf_counter() - started) * 1000, ok))
+            # In-process requests can complete without suspending; yield so probes get scheduled
+            await asyncio.sleep(0)
+
+    async def health_probe() -> None:
+        # Latency counts from when the probe was due, so time spent waiting
+        # for a blocked event loop is included (as a load balancer would see it)
+        due = time.perf_counter()
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            await client.get("/health")
+            health_ms.append((time.perf_counter() - due) * 1000)
+            due = max(due + HEALTH_INTERVAL, time.perf_counter())
+
+    async def lag_probe() -> None:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await asyncio.sleep(LAG_INTERVAL)
+            lag_ms.append(max(0.0, (time.perf_counter() - started - LAG_INTERVAL) * 1000))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)), health_probe(), lag_probe())
+    elapsed = time.perf_counter() - started
+
+    by_entry = {}
+    for entry in mix:
+        latencies = [latency for name, latency, _ in samples if name == entry["name"]]
+        by_entry[entry["name"]] = {"requests": len(latencies), "latency_ms": _percentiles(latencies)}
+    errors = sum(1 for _, _, ok in samples if not ok)
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "latency_ms": _percentiles([latency for _, latency, _ in samples]),
+        "by_entry": by_entry,
+        "health_ms": _percentiles(health_ms),
+        "loop_lag_ms": _percentiles(lag_ms)
+    }
+
+
+async def main_async(args) -> dict:
+    mix = parse_mix(args.mix)
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.request_timeout)
+    else:
+        os.environ.setdefault("PRESENTS_PREWARM", "0")
+        from main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=args.request_timeout)
+
+    async with client:
+        # One untimed request per mix entry so imports and first-call costs are excluded
+        for entry in mix:
+            await client.post(ENDPOINTS[entry["endpoint"]], json=_body(entry))
+
+        levels = []
+        for concurrency in args.levels:
+            level = await run_level(client, mix, concurrency, args.duration)
+            levels.append(level)
+            print(
+                f"concurrency={concurrency:<4} rps={level['throughput_rps']:<8} "
+                f"p99={level['latency_ms'] and level['latency_ms']['p99']}ms "
+                f"health_p99={level['health_ms'] and level['health_ms']['p99']}ms",
+                file=sys.stderr
+            )
+
+    healthy = [
+        level["concurrency"] for level in levels
+        if level["health_ms"] and level["health_ms"]["p99"] <= args.health_slo_ms and level["error_rate"] <= args.max_error_rate
+    ]
+    return {
+        "environment": {**environment(), "mode": "http" if args.url else "in-process", "url": args.url},
+        "settings": {"mix": args.mix, "duration_s": args.duration, "health_slo_ms": args.health_slo_ms, "max_error_rate": args.max_error_rate},
+        "capacity": max(healthy) if healthy else 0,
+        "levels": levels
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8], help="Concurrent clients per level")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per level")
+    parser.add_argument("--mix", nargs="+", default=list(DEFAULT_MIX), help="endpoint:size=weight entries")
+    parser.add_argument("--url", help="Load a running server instead of the in-process app")
+    parser.add_argument("--health-slo-ms", type=float, default=250)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--request-timeout", type=float, default=120)
+    parser.add_argument("--output", help="Write results to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = json.dumps(asyncio.run(main_async(args)), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
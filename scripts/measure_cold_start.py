@@ -0,0 +1,78 @@
+"""
+Cold-start measurement.
+
+Starts a fresh interpreter per configuration and reports, as JSON:
+- interpreter_ms: bare interpreter start-up
+- import_ms: time to import the app (`import main`)
+- startup_ms: app start-up (lifespan), i.e. until the port would open
+- prewarm_ms: duration of the warm-up (imports + tiny solve), if enabled
+- first_request_ms / second_request_ms: /recalculate latency, cold then warm
+
+Usage:
+    python scripts/measure_cold_start.py
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIGURATIONS = {
+    "fast_start": {"PRESENTS_FAST_START": "1", "PRESENTS_PREWARM": "1"},
+    "eager": {"PRESENTS_FAST_START": "0", "PRESENTS_PREWARM": "1"},
+    "no_prewarm": {"PRESENTS_FAST_START": "1", "PRESENTS_PREWARM": "0"},
+}
+
+CHILD = r"""
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+from tests.test_data import SAMPLE_RECALCULATE_REQUEST
+with TestClient(main.app) as client:
+    up = time.perf_counter()
+    t = time.perf_counter()
+    client.post("/recalculate", json={**SAMPLE_RECALCULATE_REQUEST, "group_id": "cold_1"})
+    first = time.perf_counter() - t
+    t = time.perf_counter()
+    client.post("/recalculate", json={**SAMPLE_RECALCULATE_REQUEST, "group_id": "cold_2"})
+    second = time.perf_counter() - t
+    while client.get("/ready").json()["status"] == "warming":
+        time.sleep(0.01)
+    prewarm = client.get("/ready").json()["duration_ms"] or 0.0
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (up - imported) * 1000,
+    "prewarm_ms": prewarm,
+    "first_request_ms": first * 1000,
+    "second_request_ms": second * 1000,
+}))
+"""
+
+
+def _interpreter_ms() -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return (time.perf_counter() - started) * 1000
+
+
+def main() -> None:
+    results = {"interpreter_ms": round(_interpreter_ms(), 1)}
+    for name, env in CONFIGURATIONS.items():
+        output = subprocess.run(
+            [sys.executable, "-c", CHILD],
+            cwd=ROOT,
+            env={**os.environ, **env},
+            check=True,
+            capture_output=True,
+            text=True
+        ).stdout
+        results[name] = {key: round(value, 1) for key, value in json.loads(output.splitlines()[-1]).items()}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Solver quality report: optimality gap versus runtime.
+
+Runs each solver on small synthetic groups (random integer utilities on the
+synthetic exclusion structure, see tests/oracle.py) and compares its answer
+with the brute-force oracle. Per (solver, group size) it reports, as JSON:
+- gap: mean and max relative optimality gap, (optimum - achieved) / optimum
+  for objectives that are maximized; for Random Matching's expected
+  statistics it is the mean absolute error of the per-user expected
+  utility relative to the exact expectation's mean
+- optimal_share: share of groups solved exactly (gap within 1e-9)
+- ms: mean and max solver wall time in milliseconds
+
+Exact solvers should always report a gap of 0; the report exists to track
+approximate modes, whose gap is allowed to trade against runtime, such as
+Max Utility's top_k mode at a few values of k (its own reported
+optimality_gap is an upper bound on the gap measured here).
+
+Usage:
+    python scripts/solver_quality_report.py [--sizes 4 6 8 9] [--seeds 20] [--output quality.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+from algorithms import max_fairness_matching, max_utility_matching, random_matching  # noqa: E402
+from scripts.benchmark_scaling import environment  # noqa: E402
+from tests.oracle import MAX_ORACLE_USERS, exact_optima, exact_random_expectations, random_context  # noqa: E402
+
+TOLERANCE = 1e-9
+
+
+def _relative_gap(optimum: float, achieved: float) -> float:
+    return max(0.0, optimum - achieved) / abs(optimum) if optimum else max(0.0, optimum - achieved)
+
+
+def _expectation_error(context, stats) -> float:
+    approximate = np.array([user.expected_utility for user in stats.user_stats.values()])
+    exact = exact_random_expectations(context)
+    return float(np.abs(approximate - exact).mean() / (abs(exact.mean()) or 1.0))
+
+
+# Solver name -> (solver call, which is what gets timed; gap of its statistics against the oracle)
+SOLVERS: Dict[str, Tuple[Callable, Callable]] = {
+    "Max Utility": (
+        max_utility_matching.calculate_statistics,
+        lambda context, stats: _relative_gap(
+            exact_optima(context)["max_total"], stats.group_satisfaction_score * context.size
+        )
+    ),
+    **{
+        f"Max Utility (top_k, k={k})": (
+            lambda context, k=k: max_utility_matching.calculate_statistics(context, mode="top_k", top_k=k),
+            lambda context, stats: _relative_gap(
+                exact_optima(context)["max_total"], stats.group_satisfaction_score * context.size
+            )
+        )
+        for k in (1, 2, 4)
+    },
+    "Max Fairness (minimax floor)": (
+        lambda context: max_fairness_matching.calculate_statistics(context, objective="minimax"),
+        lambda context, stats: _relative_gap(exact_optima(context)["max_min"], stats.min_utility)
+    ),
+    "Random Matching (expected statistics)": (random_matching.calculate_statistics, _expectation_error),
+}
+
+
+def measure(name: str, n: int, seeds: int) -> dict:
+    """Gap and runtime of one solver over `seeds` groups of n users."""
+    solve, gap = SOLVERS[name]
+    gaps: List[float] = []
+    times_ms: List[float] = []
+    for seed in range(seeds):
+        context = random_context(n, seed)
+        started = time.perf_counter()
+        stats = solve(context)
+        times_ms.append((time.perf_counter() - started) * 1000)
+        gaps.append(gap(context, stats))
+    return {
+        "solver": name,
+        "n_users": n,
+        "groups": seeds,
+        "gap": {"mean": round(float(np.mean(gaps)), 6), "max": round(float(np.max(gaps)), 6)},
+        "optimal_share": round(sum(value <= TOLERANCE for value in gaps) / seeds, 4),
+        "ms": {"mean": round(float(np.mean(times_ms)), 3), "max": round(float(np.max(times_ms)), 3)}
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4, 6, 8, MAX_ORACLE_USERS])
+    parser.add_argument("--seeds", type=int, default=20, help="Groups per size")
+    parser.add_argument("--solvers", nargs="+", default=list(SOLVERS), choices=list(SOLVERS))
+    parser.add_argument("--output", help="Write results to this file instead of stdout")
+    args = parser.parse_args()
+
+    results = [measure(name, n, args.seeds) for n in args.sizes for name in args.solvers]
+    report = json.dumps({"environment": environment(), "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Batch Recalculate
+
+Recalculates many groups in one request. Groups are packed into tasks
+(small groups share a task to amortize per-task overhead), spread across
+the process pool, and results are yielded as each task completes. The
+workers only compute; the result cache lives in the server process.
+"""
+from typing import Any, AsyncIterator, Dict, List, Tuple
+import asyncio
+import time
+from algorithms.registry import RulesetOptionError
+from models.requests import RecalculateRequest, RulesetOptions
+from services import matching_service
+from services.result_cache import CachedResult
+from services.worker_pool import executor, get_process_pool
+from utils import metrics
+
+# Groups are packed into one task until their combined cost reaches this.
+# Cost is roughly the utility matrix size (n^2), so this is a ~250-person group.
+PACK_TARGET_COST = 64_000
+
+
+def pack_requests(requests: List[RecalculateRequest]) -> List[List[int]]:
+    """
+    Group request indexes into tasks of roughly PACK_TARGET_COST each.
+
+    Requests are taken largest first so big groups start early and small
+    groups fill in the remaining tasks.
+
+    Args:
+        requests: Requests in the batch
+
+    Returns:
+        List of tasks, each a list of request indexes
+    """
+    order = sorted(range(len(requests)), key=lambda i: -_estimated_cost(requests[i]))
+    tasks: List[List[int]] = []
+    current: List[int] = []
+    current_cost = 0
+
+    for i in order:
+        cost = _estimated_cost(requests[i])
+        if current and current_cost + cost > PACK_TARGET_COST:
+            tasks.append(current)
+            current, current_cost = [], 0
+        current.append(i)
+        current_cost += cost
+
+    if current:
+        tasks.append(current)
+    return tasks
+
+
+async def stream_batch(requests: List[RecalculateRequest], indexes: List[int]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run the given requests across the process pool, yielding results as tasks finish.
+
+    Only cache misses are sent to the workers, as serialized preference
+    arrays; the workers send back the computed results, which go into this
+    process's result cache just like a /recalculate would (so
+    /recalculate/user_stats and /finalize_group can reuse them).
+
+    Args:
+        requests: All requests in the batch
+        indexes: Indexes of the requests to compute, already validated (their
+            validated preference arrays attached)
+
+    Yields:
+        {"event": "result", "index": i, "group_id": ..., "rulesets": {...}} per group, or
+        {"event": "error", "index": i, "group_id": ..., "message": ...} if its task failed
+        or one of its ruleset options does not fit the group
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+
+    cached = {}
+    missing = {}
+    for i in indexes:
+        request = requests[i]
+        arrays = request.preference_payload
+        metrics.GROUP_SIZE.observe(arrays.size, operation="recalculate")
+        # Hashing the preferences and building events is CPU-bound, so it stays off the event loop
+        cached[i] = await loop.run_in_executor(
+            executor, matching_service.cached_results, arrays, request.rulesets, request.ruleset_options, request.group_id
+        )
+        names = [name for name in matching_service.resolve_rulesets(request.rulesets) if name not in cached[i]]
+        if names:
+            missing[i] = names
+        else:
+            yield await loop.run_in_executor(executor, _result_event, i, request, cached[i], {})
+
+    computing = list(missing)
+    pending = {}
+    for task in pack_requests([requests[i] for i in computing]):
+        task_indexes = [computing[i] for i in task]
+        payloads = [
+            (requests[i].preference_payload.to_bytes(), missing[i], requests[i].ruleset_options)
+            for i in task_indexes
+        ]
+        # Wall-clock time, since the task may start in another process
+        future = loop.run_in_executor(pool, _run_task, payloads, time.time())
+        pending[future] = task_indexes
+
+    while pending:
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for future in done:
+            task_indexes = pending.pop(future)
+            try:
+                results = future.result()
+                metrics.QUEUE_WAIT_SECONDS.observe(results.pop(), pool="batch")
+            except Exception as e:
+                # The whole task failed (e.g. a worker died); report each of its groups
+                for i in task_indexes:
+                    yield {"event": "error", "index": i, "group_id": requests[i].group_id, "message": str(e)}
+                continue
+            for i, computed in zip(task_indexes, results):
+                if isinstance(computed, RulesetOptionError):
+                    yield {
+                        "event": "error", "index": i, "group_id": requests[i].group_id,
+                        "error": "ValidationError", "message": str(computed), "details": {}
+                    }
+                    continue
+                yield await loop.run_in_executor(executor, _result_event, i, requests[i], cached[i], computed)
+
+
+def _result_event(
+    index: int,
+    request: RecalculateRequest,
+    cached: Dict[str, CachedResult],
+    computed: Dict[str, matching_service.ComputedRuleset]
+) -> Dict[str, Any]:
+    """Store a group's computed results in the cache and build its result event."""
+    rulesets = matching_service.collect_results(
+        request.preference_payload,
+        request.rulesets,
+        request.ruleset_options,
+        request.group_id,
+        cached,
+        computed,
+        include_user_stats=request.include_user_stats
+    )
+    return {
+        "event": "result",
+        "index": index,
+        "group_id": request.group_id,
+        "rulesets": {name: stats.model_dump(mode="json") for name, stats in rulesets.items()}
+    }
+
+
+def _estimated_cost(request: RecalculateRequest) -> int:
+    """Rough relative cost of recalculating one group."""
+    return request.group_size ** 2
+
+
+def _run_task(payloads: List[Tuple[bytes, List[str], Dict[str, RulesetOptions]]], submitted_at: float) -> List[Any]:
+    """
+    Worker entry point: compute each packed group in order (runs in a worker process).
+
+    Each payload is (serialized PreferenceArrays, rulesets to compute, ruleset
+    options). Returns one {ruleset: ComputedRuleset} dict (or the
+    RulesetOptionError that rejected the group) per payload, followed by the seconds the task waited before starting (for the
+    parent's queue wait metric).
+    """
+    from utils.preference_arrays import from_bytes
+
+    queue_wait = max(0.0, time.time() - submitted_at)
+    results: List[Any] = []
+    for blob, rulesets, options in payloads:
+        try:
+            results.append(matching_service.compute_rulesets(from_bytes(blob), rulesets, options))
+        except RulesetOptionError as e:
+            results.append(e)
+    results.append(queue_wait)
+    return results
@@ -0,0 +1,218 @@
+"""
+Finalize Store
+
+Makes /finalize_group idempotent. Admins double-click "Finalize" and clients
+retry on timeouts; without a seed every run could return different pairings.
+Each finalization is identified by an idempotency key (the client's own, or
+one derived from the request, see request_hash) and:
+
+- its response is persisted in SQLite, so a replay returns the identical
+  response at once, also after a restart
+- concurrent requests with the same key share one computation (single
+  flight) instead of racing to store different results
+
+Controlled by environment variables:
+- PRESENTS_FINALIZE_STORE (default: the group store's file,
+  PRESENTS_GROUP_STORE): path of the SQLite file
+- PRESENTS_FINALIZE_RETENTION_DAYS (default 30): stored responses older
+  than this are deleted
+"""
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from models.responses import FinalizeResponse
+from services.group_store import store as group_store
+from services.worker_pool import executor
+
+RETENTION_DAYS = float(os.environ.get("PRESENTS_FINALIZE_RETENTION_DAYS", "30"))
+
+
+class IdempotencyKeyConflictError(ValueError):
+    """The idempotency key was already used for a different finalize request."""
+
+    def __init__(self, key: str):
+        self.key = key
+        super().__init__(f"Idempotency key {key} was already used for a different finalize request")
+
+
+def request_hash(group_id: str, preferences_hash: str, ruleset: str, options: tuple, seed: Optional[int]) -> str:
+    """
+    Hash identifying what a finalize request computes; the default idempotency key.
+
+    `preferences_hash` is PreferenceArrays.fingerprint() and `options` the
+    ruleset's effective options (as in result_cache.result_key), so requests
+    that would produce the same pairings share a key.
+    """
+    payload = json.dumps([group_id, preferences_hash, ruleset, [list(item) for item in options], seed], default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class FinalizeStore:
+    """
+    SQLite-backed store of finalize responses by idempotency key.
+
+    Shares one connection across threads behind a lock, like GroupStore.
+    The first response stored under a key wins.
+
+    Args:
+        path: SQLite database file (":memory:" for a throwaway store)
+        retention_days: Age after which stored responses are deleted
+    """
+
+    def __init__(self, path: str, retention_days: float = RETENTION_DAYS):
+        self.path = path
+        self.retention_days = retention_days
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # SQLite connections must not cross fork(), so worker processes open their own
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._pid = os.getpid()
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS finalize_results ("
+                "idempotency_key TEXT PRIMARY KEY, request_hash TEXT NOT NULL, group_id TEXT NOT NULL, "
+                "created_at TEXT NOT NULL, response TEXT NOT NULL)"
+            )
+        return self._connection
+
+    def get(self, key: str, expected_hash: str) -> Optional[FinalizeResponse]:
+        """
+        Return the response stored under key, or None if there is none.
+
+        Raises:
+            IdempotencyKeyConflictError: If the key was stored for a different request
+        """
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT request_hash, response FROM finalize_results WHERE idempotency_key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        if row[0] != expected_hash:
+            raise IdempotencyKeyConflictError(key)
+        return FinalizeResponse.model_validate_json(row[1])
+
+    def put(self, key: str, hash_: str, response: FinalizeResponse) -> FinalizeResponse:
+        """
+        Store a response unless the key already has one.
+
+        Returns:
+            The response now stored under key (an earlier one if it existed)
+
+        Raises:
+            IdempotencyKeyConflictError: If the key was stored for a different request
+        """
+        now = datetime.now()
+        connection = self._connect()
+        with self._lock, connection:
+            connection.execute(
+                "DELETE FROM finalize_results WHERE created_at < ?",
+                ((now - timedelta(days=self.retention_days)).isoformat(),)
+            )
+            connection.execute(
+                "INSERT OR IGNORE INTO finalize_results (idempotency_key, request_hash, group_id, created_at, response) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, hash_, response.group_id, now.isoformat(), response.model_dump_json())
+            )
+        stored = self.get(key, hash_)
+        return response if stored is None else stored
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution.
+
+    The first caller's function runs on the worker pool; callers arriving
+    before it finishes with the same request hash get the same future.
+    Exceptions reach every caller.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Tuple[str, Future]] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, hash_: str, function: Callable[[], FinalizeResponse]) -> Tuple[Future, bool]:
+        """
+        Run function for key unless a call for key is already in flight.
+
+        Returns:
+            Tuple of (future of the result, whether this call started it)
+
+        Raises:
+            IdempotencyKeyConflictError: If the call in flight for key is for a
+                different request (hash_ differs)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                if call[0] != hash_:
+                    raise IdempotencyKeyConflictError(key)
+                return call[1], False
+            future = Future()
+            self._calls[key] = (hash_, future)
+
+        # The caller's context travels along, so timings land in its request trace
+        context = contextvars.copy_context()
+        executor.submit(context.run, self._run, key, function, future)
+        return future, True
+
+    def _run(self, key: str, function: Callable[[], FinalizeResponse], future: Future) -> None:
+        try:
+            result = function()
+        except BaseException as e:
+            with self._lock:
+                del self._calls[key]
+            future.set_exception(e)
+        else:
+            with self._lock:
+                del self._calls[key]
+            future.set_result(result)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+def finalize_once(key: str, hash_: str, compute: Callable[[], FinalizeResponse]) -> Tuple[Future, bool]:
+    """
+    Finalize at most once per idempotency key.
+
+    Args:
+        key: Idempotency key (the client's, or hash_ itself)
+        hash_: request_hash of the request
+        compute: Produces the response when nothing is stored for key
+
+    Returns:
+        Tuple of (future of the response, whether it was replayed rather
+        than computed for this call: stored earlier or computed for a
+        concurrent identical call)
+
+    Raises:
+        IdempotencyKeyConflictError: If key belongs to a different request
+            (immediately, or through the future)
+    """
+    stored = store.get(key, hash_)
+    if stored is not None:
+        future = Future()
+        future.set_result(stored)
+        return future, True
+
+    def compute_and_store() -> FinalizeResponse:
+        # Another process may have finished the same key meanwhile
+        return store.get(key, hash_) or store.put(key, hash_, compute())
+
+    future, started = single_flight.submit(key, hash_, compute_and_store)
+    return future, not started
+
+
+store = FinalizeStore(os.environ.get("PRESENTS_FINALIZE_STORE", group_store.path))
+single_flight = SingleFlight()
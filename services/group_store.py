@@ -0,0 +1,165 @@
+"""
+Group Store
+
+Keeps each group's preferences server-side in SQLite, in the compact array
+form (PreferenceArrays serialized as an .npz blob) that the utility engine
+consumes. Clients upload a group once (PUT), send single-member changes
+(PATCH), and call the compute endpoints with just group_id + version.
+
+Configured by PRESENTS_GROUP_STORE: path of the SQLite file (default
+"presents_groups.db"; on fly.io point it at a mounted volume).
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Iterable, Optional, Tuple
+import os
+import sqlite3
+import threading
+from models.preferences import UserPreference
+
+if TYPE_CHECKING:
+    from utils.preference_arrays import PreferenceArrays
+
+
+class GroupNotFoundError(LookupError):
+    """No preferences are stored for the group."""
+
+
+class VersionConflictError(ValueError):
+    """The stored version differs from the one the caller expected."""
+
+    def __init__(self, group_id: str, expected_version: int, current_version: int):
+        self.expected_version = expected_version
+        self.current_version = current_version
+        super().__init__(f"Group {group_id} is at version {current_version}, not {expected_version}")
+
+
+@dataclass
+class StoredGroup:
+    """Metadata of a stored group."""
+    group_id: str
+    version: int
+    num_users: int
+    updated_at: str
+
+
+class GroupStore:
+    """
+    SQLite-backed store of group preferences with a version per group.
+
+    Every write bumps the version; one connection is shared across threads
+    behind a lock, so read-modify-write updates (PATCH) are atomic.
+
+    Args:
+        path: SQLite database file (":memory:" for a throwaway store)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # SQLite connections must not cross fork(), so worker processes open their own
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._pid = os.getpid()
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS group_preferences ("
+                "group_id TEXT PRIMARY KEY, version INTEGER NOT NULL, num_users INTEGER NOT NULL, "
+                "updated_at TEXT NOT NULL, arrays BLOB NOT NULL)"
+            )
+        return self._connection
+
+    def put(self, group_id: str, arrays: "PreferenceArrays") -> StoredGroup:
+        """Replace the group's preferences, creating the group if needed."""
+        with self._lock:
+            current = self._read(group_id)
+            return self._write(group_id, arrays, (current[0].version if current else 0) + 1)
+
+    def patch(
+        self,
+        group_id: str,
+        upsert: Iterable[UserPreference] = (),
+        remove: Iterable[str] = (),
+        expected_version: Optional[int] = None
+    ) -> StoredGroup:
+        """
+        Apply single-member changes to a stored group.
+
+        Args:
+            group_id: Group to update
+            upsert: New or changed members
+            remove: User IDs of members to drop
+            expected_version: If given, fail unless the group is at this version
+
+        Returns:
+            Metadata of the new version
+
+        Raises:
+            GroupNotFoundError: If the group is not stored
+            VersionConflictError: If expected_version is stale
+            ValueError: If a removed user is not in the group
+        """
+        from utils.preference_arrays import update_members
+
+        with self._lock:
+            current = self._read(group_id)
+            if current is None:
+                raise GroupNotFoundError(f"No stored preferences for group {group_id}")
+            stored, arrays = current
+            if expected_version is not None and expected_version != stored.version:
+                raise VersionConflictError(group_id, expected_version, stored.version)
+
+            remove = list(remove)
+            unknown = [user_id for user_id in remove if user_id not in arrays.index]
+            if unknown:
+                raise ValueError(f"Cannot remove users not in the group: {', '.join(unknown)}")
+
+            return self._write(group_id, update_members(arrays, upsert, remove), stored.version + 1)
+
+    def load(self, group_id: str, version: Optional[int] = None) -> Tuple[StoredGroup, "PreferenceArrays"]:
+        """
+        Load a group's stored preferences.
+
+        Args:
+            group_id: Group to load
+            version: If given, fail unless the group is at this version
+
+        Raises:
+            GroupNotFoundError: If the group is not stored
+            VersionConflictError: If version is not the current version
+        """
+        with self._lock:
+            current = self._read(group_id)
+        if current is None:
+            raise GroupNotFoundError(f"No stored preferences for group {group_id}")
+        if version is not None and version != current[0].version:
+            raise VersionConflictError(group_id, version, current[0].version)
+        return current
+
+    def _read(self, group_id: str) -> Optional[Tuple[StoredGroup, "PreferenceArrays"]]:
+        from utils.preference_arrays import from_bytes
+
+        row = self._connect().execute(
+            "SELECT version, num_users, updated_at, arrays FROM group_preferences WHERE group_id = ?", (group_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        version, num_users, updated_at, blob = row
+        return StoredGroup(group_id, version, num_users, updated_at), from_bytes(blob)
+
+    def _write(self, group_id: str, arrays: "PreferenceArrays", version: int) -> StoredGroup:
+        stored = StoredGroup(group_id, version, arrays.size, datetime.now().isoformat())
+        connection = self._connect()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO group_preferences (group_id, version, num_users, updated_at, arrays) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (group_id, version, stored.num_users, stored.updated_at, arrays.to_bytes())
+            )
+        return stored
+
+
+store = GroupStore(os.environ.get("PRESENTS_GROUP_STORE", "presents_groups.db"))
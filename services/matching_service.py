@@ -2,140 +2,507 @@
 Matching Service
 
 Orchestrates all matching algorithms and provides unified interface.
+
+Heavy numeric modules (numpy via the group context, scipy via the algorithms)
+are imported on first use so the app starts quickly after scale-to-zero.
 """
-from typing import List, Dict, Optional
-from models.preferences import UserPreference
-from models.responses import RulesetStats, FinalizeResponse
-from algorithms import random_matching, max_utility_matching, max_fairness_matching, white_elephant_simulation
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, List, Dict, Optional, Union
+import itertools
+import logging
+import time
+from models.preferences import UserPreference, ColumnarPreferences
+from models.requests import RulesetOptions
+from models.responses import RulesetStats, FinalizeResponse, UserStatsPage
+from algorithms.registry import RulesetOptionError, RulesetSpec, get_ruleset, ruleset_names, default_ruleset_names
+from services.result_cache import CachedResult, result_cache, result_key, latest_results
+from services.finalize_store import request_hash
+from utils import metrics
+from utils.metrics import timed, timing_name
 from datetime import datetime
-import random as py_random
-import numpy as np
 
+if TYPE_CHECKING:
+    from utils.group_context import GroupContext
+    from utils.preference_arrays import PreferenceArrays
+
+# Either request format (a list of per-user objects or parallel arrays), or
+# PreferenceArrays already returned by validate_preferences
+Preferences = Union[List[UserPreference], ColumnarPreferences, "PreferenceArrays"]
+
+
+class GroupValidationError(ValueError):
+    """
+    A group failed its integrity checks.
+
+    Attributes:
+        problems: Problems found (capped per type), each with a "type" key
+        problem_counts: Total number of problems per type
+    """
+
+    def __init__(self, problems: List[dict], problem_counts: Dict[str, int]):
+        self.problems = problems
+        self.problem_counts = problem_counts
+        summary = ", ".join(f"{count} {problem_type}" for problem_type, count in problem_counts.items())
+        super().__init__(f"Group failed validation: {summary}")
+
+
+VALID_RULESETS = ruleset_names()
+
+logger = logging.getLogger(__name__)
 
-def run_all_algorithms(preferences: List[UserPreference]) -> Dict[str, RulesetStats]:
+
+def run_all_algorithms(
+    preferences: Preferences,
+    rulesets: Optional[List[str]] = None,
+    options: Optional[Dict[str, RulesetOptions]] = None,
+    group_id: str = "",
+    on_result: Optional[Callable[[str, RulesetStats], None]] = None,
+    on_progress: Optional[Callable[[str, RulesetStats], None]] = None,
+    include_user_stats: bool = True,
+    exclusion_mode: str = "symmetric"
+) -> Dict[str, RulesetStats]:
     """
-    Run all matching algorithms and return statistics for comparison.
+    Run the requested matching algorithms and return statistics for comparison.
 
     This is called by the /recalculate endpoint to generate comparison data
-    for all available rulesets.
+    for the available rulesets. Only the requested rulesets are computed, so a
+    targeted refresh (e.g. just Max Fairness) skips the expensive simulations.
+    The group context (utility matrix, exclusion mask) is built once and
+    shared by every algorithm.
+
+    Results are cached per (group_id, preference hash, ruleset, options), so a
+    repeat recalculation is served from the cache and the context is only
+    built if at least one ruleset needs computing.
 
     Args:
-        preferences: List of user preference objects
+        preferences: List of user preference objects, or the columnar equivalent
+        rulesets: Names of the rulesets to compute (defaults to the registry's default rulesets)
+        options: Optional per-ruleset options keyed by ruleset name
+        group_id: Group the preferences belong to (part of the cache key)
+        on_result: Optional callback invoked with (name, stats) as each ruleset finishes
+        on_progress: Optional callback invoked with (name, interim stats) while a
+            simulation-based ruleset is still running
+        include_user_stats: If False, returned (and streamed) stats omit the
+            per-user block; the full result is still cached and can be paged
+            with get_user_stats_page
+        exclusion_mode: How exclusions are interpreted (see validate_preferences)
 
     Returns:
-        Dict with keys: "Random Matching", "Max Utility", "Max Fairness", "White Elephant"
+        Dict keyed by ruleset name (in VALID_RULESETS order).
         Each value is a RulesetStats object
+
+    Raises:
+        ValueError: If a requested ruleset is not recognized
+        GroupValidationError: If the group fails its integrity checks
+        RulesetOptionError: If a ruleset option does not fit the group (other
+            ruleset failures only replace that ruleset's stats with placeholders)
     """
+    options = options or {}
+    arrays = validate_preferences(preferences, exclusion_mode)
+    metrics.GROUP_SIZE.observe(arrays.size, operation="recalculate")
+    metrics.annotate(group_size=arrays.size)
+    preferences_hash = arrays.fingerprint()
+    context = None
     results = {}
 
-    # Run each algorithm
-    try:
-        results["Random Matching"] = random_matching.calculate_statistics(preferences)
-    except Exception as e:
-        print(f"Error in Random Matching: {e}")
-        # Return placeholder stats on error
-        results["Random Matching"] = _create_error_stats()
-
-    try:
-        results["Max Utility"] = max_utility_matching.calculate_statistics(preferences)
-    except Exception as e:
-        print(f"Error in Max Utility: {e}")
-        results["Max Utility"] = _create_error_stats()
-
-    try:
-        results["Max Fairness"] = max_fairness_matching.calculate_statistics(preferences)
-    except Exception as e:
-        print(f"Error in Max Fairness: {e}")
-        results["Max Fairness"] = _create_error_stats()
-
-    try:
-        results["White Elephant"] = white_elephant_simulation.calculate_statistics(preferences, num_simulations=1000)
-    except Exception as e:
-        print(f"Error in White Elephant: {e}")
-        results["White Elephant"] = _create_error_stats()
+    # Run each requested algorithm
+    for name in resolve_rulesets(rulesets):
+        spec = get_ruleset(name)
+        ruleset_options = _effective_options(spec, options.get(name))
+        key = result_key(group_id, preferences_hash, name, _options_key(ruleset_options))
+        result = result_cache.get(key)
+        if result is None:
+            try:
+                if context is None:
+                    context = _build_context(arrays)
+                with timed(f"ruleset_{timing_name(name)}", metrics.RULESET_SECONDS, name, ruleset=name):
+                    result = _compute_ruleset(spec, context, ruleset_options, on_progress, include_user_stats)
+                result_cache.put(key, result)
+            except RulesetOptionError:
+                # The request's fault, not the ruleset's: no placeholder stats
+                raise
+            except Exception:
+                logger.exception("Ruleset %s failed for group %s", name, group_id)
+                metrics.RULESET_ERRORS.inc(ruleset=name)
+                # Return placeholder stats on error
+                results[name] = _create_error_stats()
+
+        if result is not None:
+            latest_results.put((group_id, name), key)
+            results[name] = result.stats if include_user_stats else result.stats.model_copy(update={"user_stats": {}})
+
+        if on_result is not None:
+            on_result(name, results[name])
+
+    return results
+
+
+@dataclass
+class ComputedRuleset:
+    """A ruleset result computed outside the result cache (in a batch worker process)."""
+    result: Optional[CachedResult]  # None if the ruleset failed
+    seconds: float
+
+
+def cached_results(
+    arrays: "PreferenceArrays",
+    rulesets: Optional[List[str]] = None,
+    options: Optional[Dict[str, RulesetOptions]] = None,
+    group_id: str = ""
+) -> Dict[str, CachedResult]:
+    """
+    Look up the requested rulesets in the result cache.
+
+    The batch path splits run_all_algorithms in three: cached_results in the
+    server process, compute_rulesets in a worker for the rulesets it missed,
+    and collect_results back in the server process.
+
+    Returns:
+        Cached results by ruleset name (the rulesets that need no computing)
+    """
+    options = options or {}
+    preferences_hash = arrays.fingerprint()
+    found = {}
+    for name in resolve_rulesets(rulesets):
+        ruleset_options = _effective_options(get_ruleset(name), options.get(name))
+        result = result_cache.get(result_key(group_id, preferences_hash, name, _options_key(ruleset_options)))
+        if result is not None:
+            found[name] = result
+    return found
+
+
+def compute_rulesets(
+    arrays: "PreferenceArrays",
+    rulesets: List[str],
+    options: Optional[Dict[str, RulesetOptions]] = None
+) -> Dict[str, ComputedRuleset]:
+    """
+    Compute rulesets without reading or filling the result cache (runs in a worker process).
+
+    Failures are logged and returned as a None result, so the server
+    process can report them like run_all_algorithms does.
+
+    Raises:
+        RulesetOptionError: If a ruleset option does not fit the group
+    """
+    options = options or {}
+    context = None
+    computed = {}
+    for name in rulesets:
+        spec = get_ruleset(name)
+        started = time.perf_counter()
+        try:
+            if context is None:
+                context = _build_context(arrays)
+            result = _compute_ruleset(spec, context, _effective_options(spec, options.get(name)))
+        except RulesetOptionError:
+            raise
+        except Exception:
+            logger.exception("Ruleset %s failed in a batch worker", name)
+            result = None
+        computed[name] = ComputedRuleset(result=result, seconds=time.perf_counter() - started)
+    return computed
+
+
+def collect_results(
+    arrays: "PreferenceArrays",
+    rulesets: Optional[List[str]],
+    options: Optional[Dict[str, RulesetOptions]],
+    group_id: str,
+    cached: Dict[str, CachedResult],
+    computed: Dict[str, ComputedRuleset],
+    include_user_stats: bool = True
+) -> Dict[str, RulesetStats]:
+    """
+    Finish a batch group in the server process, as run_all_algorithms would.
+
+    Computed results go into the result cache under the same keys, every
+    ruleset becomes the group's latest result (so /recalculate/user_stats
+    and /finalize_group find them), and ruleset timings and failures are
+    recorded in the metrics.
+
+    Args:
+        arrays: The group's validated preferences
+        rulesets: Rulesets requested
+        options: Per-ruleset options keyed by ruleset name
+        group_id: Group the preferences belong to
+        cached: Results from cached_results
+        computed: Results from compute_rulesets for the other rulesets
+        include_user_stats: If False, returned stats omit the per-user block
+
+    Returns:
+        Statistics keyed by ruleset name, like run_all_algorithms
+    """
+    options = options or {}
+    preferences_hash = arrays.fingerprint()
+    results = {}
+    for name in resolve_rulesets(rulesets):
+        ruleset_options = _effective_options(get_ruleset(name), options.get(name))
+        key = result_key(group_id, preferences_hash, name, _options_key(ruleset_options))
+        result = cached.get(name)
+        if result is None:
+            metrics.RULESET_SECONDS.observe(computed[name].seconds, ruleset=name)
+            result = computed[name].result
+            if result is None:
+                metrics.RULESET_ERRORS.inc(ruleset=name)
+                results[name] = _create_error_stats()
+                continue
+            result_cache.put(key, result)
 
+        latest_results.put((group_id, name), key)
+        results[name] = result.stats if include_user_stats else result.stats.model_copy(update={"user_stats": {}})
     return results
 
 
+def validate_preferences(preferences: Preferences, exclusion_mode: str = "symmetric") -> "PreferenceArrays":
+    """
+    Convert a group's preferences to arrays and check the group's integrity.
+
+    All checks run in one vectorized pass (utils.group_validation): duplicate
+    user IDs, exclusions of unknown or own IDs, and in "strict" mode one-sided
+    exclusions. The returned arrays carry the normalized exclusions and the
+    ID index, and are used as-is by run_all_algorithms / finalize_matching,
+    so the work is not repeated.
+
+    Args:
+        preferences: Either request format, or arrays already validated
+        exclusion_mode: "symmetric" (either side's exclusion blocks both
+            directions), "directed" (only the excluder's direction) or
+            "strict" (symmetric, but one-sided exclusions are problems)
+
+    Returns:
+        Validated PreferenceArrays
+
+    Raises:
+        GroupValidationError: If any problem is found
+        ValueError: If the exclusion mode is unknown
+    """
+    from utils.group_validation import check_group
+
+    arrays = to_preference_arrays(preferences)
+    if arrays.exclusion_mode is not None:
+        return arrays
+
+    check = check_group(arrays, exclusion_mode)
+    if check.problems:
+        raise GroupValidationError(check.problems, check.problem_counts)
+    return check.arrays
+
+
+def get_user_stats_page(group_id: str, ruleset: str, offset: int = 0, limit: int = 100) -> Optional[UserStatsPage]:
+    """
+    Page through the per-user statistics of a group's latest recalculation.
+
+    Served entirely from the result cache, so a dashboard can request
+    group-level scores only and fetch per-user rows on demand.
+
+    Args:
+        group_id: Group that was recalculated
+        ruleset: Ruleset whose statistics to page
+        offset: Index of the first user to return
+        limit: Maximum number of users to return
+
+    Returns:
+        UserStatsPage, or None if the group has no cached result for the ruleset
+    """
+    key = latest_results.get((group_id, ruleset))
+    result = result_cache.get(key) if key is not None else None
+    if result is None:
+        return None
+
+    user_stats = result.stats.user_stats
+    return UserStatsPage(
+        group_id=group_id,
+        ruleset=ruleset,
+        preferences_hash=key[1],
+        total_users=len(user_stats),
+        offset=offset,
+        limit=limit,
+        user_stats=dict(itertools.islice(user_stats.items(), offset, offset + limit))
+    )
+
+
+def resolve_rulesets(rulesets: Optional[List[str]] = None) -> List[str]:
+    """
+    Normalize a requested ruleset list into registry order.
+
+    Args:
+        rulesets: Requested ruleset names, or None for the default rulesets
+
+    Returns:
+        Requested names (deduplicated) in VALID_RULESETS order
+
+    Raises:
+        ValueError: If a requested ruleset is not recognized
+    """
+    requested = rulesets or default_ruleset_names()
+    unknown = [name for name in requested if name not in VALID_RULESETS]
+    if unknown:
+        raise ValueError(f"Unknown ruleset(s): {', '.join(unknown)}. Must be one of: {', '.join(VALID_RULESETS)}")
+    return [name for name in VALID_RULESETS if name in requested]
+
+
+def _effective_options(spec: RulesetSpec, options: Optional[RulesetOptions]) -> RulesetOptions:
+    """Resolve a ruleset's options: apply its defaults and drop options it does not use."""
+    options = options or RulesetOptions()
+    resolved = {}
+    for field_name, (_, default) in spec.options.items():
+        value = getattr(options, field_name)
+        resolved[field_name] = default if value is None else value
+    return RulesetOptions(**resolved)
+
+
+def _options_key(options: RulesetOptions) -> tuple:
+    """Hashable form of resolved options for use in cache keys."""
+    return tuple(sorted(options.model_dump().items()))
+
+
+def _option_kwargs(spec: RulesetSpec, options: RulesetOptions) -> dict:
+    """Map resolved options onto the implementation's keyword arguments."""
+    return {kwarg: getattr(options, field_name) for field_name, (kwarg, _) in spec.options.items()}
+
+
+def _compute_ruleset(
+    spec: RulesetSpec,
+    context: "GroupContext",
+    options: RulesetOptions,
+    on_progress: Optional[Callable[[str, RulesetStats], None]] = None,
+    include_user_stats: bool = True
+) -> CachedResult:
+    """
+    Compute a single ruleset with its resolved options applied.
+
+    For deterministic rulesets the underlying solution is kept next to
+    the statistics so /finalize_group can return exactly that matching.
+    Interim stats passed to on_progress omit the per-user block unless
+    include_user_stats is set; the returned result always has it.
+    """
+    implementation = spec.load()
+    kwargs = _option_kwargs(spec, options)
+    context = context.for_ruleset(spec.name)
+
+    if spec.deterministic:
+        matching, stats = implementation.solve(context, **kwargs)
+        return CachedResult(stats=stats, solution=matching)
+
+    if spec.has("progress") and on_progress is not None:
+        if include_user_stats:
+            kwargs["on_progress"] = lambda stats: on_progress(spec.name, stats)
+        else:
+            kwargs["on_progress"] = lambda stats: on_progress(spec.name, stats.model_copy(update={"user_stats": {}}))
+    return CachedResult(stats=implementation.calculate_statistics(context, **kwargs))
+
+
 def finalize_matching(
     ruleset: str,
-    preferences: List[UserPreference],
-    seed: Optional[int] = None
+    preferences: Preferences,
+    seed: Optional[int] = None,
+    group_id: str = "",
+    options: Optional[RulesetOptions] = None,
+    exclusion_mode: str = "symmetric"
 ) -> FinalizeResponse:
     """
     Generate final pairings or play order for the chosen ruleset.
 
     This is called by the /finalize_group endpoint to create the actual
-    gift exchange assignments.
+    gift exchange assignments. Randomness comes only from the request's own
+    generator (derived per ruleset from `seed`), never from the global
+    random/np.random state, so concurrent finalizations stay reproducible.
+    For Max Utility and Max Fairness the matching
+    computed by a previous /recalculate (same group, preferences and options)
+    is reused from the result cache, so the admin gets exactly the matching
+    whose statistics they reviewed.
 
     Args:
         ruleset: Name of the chosen ruleset
-        preferences: List of user preference objects
+        preferences: List of user preference objects, or the columnar equivalent
         seed: Optional random seed for reproducibility
+        group_id: Group the preferences belong to (part of the cache key)
+        options: Optional ruleset options (must match those used in /recalculate to reuse its result)
+        exclusion_mode: How exclusions are interpreted (see validate_preferences)
 
     Returns:
         FinalizeResponse with pairings or play_order
 
     Raises:
         ValueError: If ruleset is not recognized
+        GroupValidationError: If the group fails its integrity checks
+    """
+    spec = get_ruleset(ruleset)
+    if spec is None:
+        raise ValueError(f"Unknown ruleset: {ruleset}. Must be one of: {', '.join(VALID_RULESETS)}")
+
+    ruleset_options = _effective_options(spec, options)
+    arrays = validate_preferences(preferences, exclusion_mode)
+    metrics.GROUP_SIZE.observe(arrays.size, operation="finalize")
+    metrics.annotate(group_size=arrays.size)
+    metadata = {
+        "timestamp": datetime.now().isoformat(),
+        "seed": seed
+    }
+
+    # Generate matching based on the ruleset's capabilities
+    if spec.has("pairings") and spec.deterministic:
+        key = result_key(group_id, arrays.fingerprint(), ruleset, _options_key(ruleset_options))
+        result = result_cache.get(key)
+        metadata["from_cache"] = result is not None
+        if result is None:
+            context = _build_context(arrays, seed)
+            with timed(f"ruleset_{timing_name(ruleset)}", metrics.RULESET_SECONDS, ruleset, ruleset=ruleset):
+                result = _compute_ruleset(spec, context, ruleset_options)
+            result_cache.put(key, result)
+
+        return FinalizeResponse(group_id=group_id, ruleset=ruleset, pairings=result.solution, metadata=metadata)
+
+    context = _build_context(arrays, seed).for_ruleset(spec.name)
+
+    if spec.has("pairings"):
+        pairings = spec.load().generate_matching(context, **_option_kwargs(spec, ruleset_options))
+        return FinalizeResponse(group_id=group_id, ruleset=ruleset, pairings=pairings, metadata=metadata)
+
+    if spec.has("play_order"):
+        play_order = spec.load().generate_play_order(context)
+        return FinalizeResponse(group_id=group_id, ruleset=ruleset, play_order=play_order, metadata=metadata)
+
+    raise ValueError(f"Ruleset {ruleset} cannot be finalized")
+
+
+def finalize_request_hash(
+    ruleset: str,
+    preferences: Preferences,
+    seed: Optional[int] = None,
+    group_id: str = "",
+    options: Optional[RulesetOptions] = None,
+    exclusion_mode: str = "symmetric"
+) -> str:
+    """
+    Identify what a finalize_matching call would compute (the default idempotency key).
+
+    Covers the group, its preferences, the ruleset, the ruleset's effective
+    options and the seed; see finalize_store.request_hash.
+
+    Raises:
+        ValueError: If ruleset is not recognized
+        GroupValidationError: If the group fails its integrity checks
     """
-    # Set random seed if provided
-    if seed is not None:
-        py_random.seed(seed)
-        np.random.seed(seed)
-
-    group_id = "placeholder_group_id"  # This would come from request
-
-    # Generate matching based on ruleset
-    if ruleset == "Random Matching":
-        pairings = random_matching.generate_matching(preferences, seed)
-        return FinalizeResponse(
-            group_id=group_id,
-            ruleset=ruleset,
-            pairings=pairings,
-            metadata={
-                "timestamp": datetime.now().isoformat(),
-                "seed": seed
-            }
-        )
-
-    elif ruleset == "Max Utility":
-        pairings = max_utility_matching.generate_matching(preferences)
-        return FinalizeResponse(
-            group_id=group_id,
-            ruleset=ruleset,
-            pairings=pairings,
-            metadata={
-                "timestamp": datetime.now().isoformat()
-            }
-        )
-
-    elif ruleset == "Max Fairness":
-        pairings = max_fairness_matching.generate_matching(preferences, seed)
-        return FinalizeResponse(
-            group_id=group_id,
-            ruleset=ruleset,
-            pairings=pairings,
-            metadata={
-                "timestamp": datetime.now().isoformat(),
-                "seed": seed
-            }
-        )
-
-    elif ruleset == "White Elephant":
-        play_order = white_elephant_simulation.generate_play_order(preferences, seed)
-        return FinalizeResponse(
-            group_id=group_id,
-            ruleset=ruleset,
-            play_order=play_order,
-            metadata={
-                "timestamp": datetime.now().isoformat(),
-                "seed": seed
-            }
-        )
-
-    else:
-        raise ValueError(f"Unknown ruleset: {ruleset}. Must be one of: Random Matching, Max Utility, Max Fairness, White Elephant")
+    spec = get_ruleset(ruleset)
+    if spec is None:
+        raise ValueError(f"Unknown ruleset: {ruleset}. Must be one of: {', '.join(VALID_RULESETS)}")
+    arrays = validate_preferences(preferences, exclusion_mode)
+    return request_hash(group_id, arrays.fingerprint(), ruleset, _options_key(_effective_options(spec, options)), seed)
+
+
+def to_preference_arrays(preferences: Preferences) -> "PreferenceArrays":
+    """Convert either preferences format into PreferenceArrays, importing numpy on first use."""
+    from utils.preference_arrays import as_preference_arrays
+    return as_preference_arrays(preferences)
+
+
+def _build_context(arrays: "PreferenceArrays", seed: Optional[int] = None) -> "GroupContext":
+    """Build the group context, importing numpy on first use."""
+    from utils.group_context import build_group_context
+    with timed("utility", metrics.UTILITY_BUILD_SECONDS, "Utility matrix and exclusion mask"):
+        return build_group_context(arrays, seed)
 
 
 def _create_error_stats() -> RulesetStats:
@@ -0,0 +1,160 @@
+"""
+Request Profiling
+
+Opt-in deterministic profiling (cProfile) of individual requests, for
+finding out why one customer's group is slow without reproducing it
+locally. A request with `?profile=1` runs under the profiler; the response
+gets an `X-Profile-Id` header and the profile can be downloaded from
+GET /profiles/{profile_id}, either summarized (hot functions in algorithms/
+and services/matching_service.py highlighted) or as a raw pstats file for
+snakeviz / `python -m pstats`.
+
+Controlled by environment variables:
+- PRESENTS_PROFILING (default "0"): "1" lets any request be profiled
+  (local debugging)
+- PRESENTS_PROFILE_TOKEN (default unset): only requests that send it in the
+  X-Profile-Token header may be profiled or download profiles (production);
+  takes precedence over PRESENTS_PROFILING
+If neither is set the middleware and endpoint are not installed at all, so
+profiling costs nothing when off.
+
+Only one request is profiled at a time. The profiler sees everything the
+event loop thread runs meanwhile (including other requests' coroutines) but
+not work handed to the worker pools, so profile the plain /recalculate
+endpoint rather than the stream/job/batch variants (/finalize_group also
+computes on the worker pool, see services.finalize_store).
+"""
+from datetime import datetime
+from typing import Optional
+from urllib.parse import parse_qs
+import cProfile
+import hmac
+import marshal
+import os
+import pstats
+import threading
+import time
+import uuid
+from models.responses import ProfiledFunction, RequestProfile
+from services.result_cache import TTLCache
+
+PROFILING = os.environ.get("PRESENTS_PROFILING", "0") == "1"
+PROFILE_TOKEN = os.environ.get("PRESENTS_PROFILE_TOKEN") or None
+ENABLED = PROFILING or PROFILE_TOKEN is not None
+
+# Functions listed per profile (by cumulative time)
+TOP_FUNCTIONS = 40
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_HIGHLIGHTED = (os.path.join(ROOT, "algorithms") + os.sep, os.path.join(ROOT, "services", "matching_service.py"))
+
+profile_store = TTLCache(
+    max_entries=int(os.environ.get("PRESENTS_PROFILE_STORE_SIZE", "20")),
+    ttl_seconds=float(os.environ.get("PRESENTS_PROFILE_TTL", "3600"))
+)
+
+_profiler_lock = threading.Lock()
+
+
+def is_authorized(token: Optional[str]) -> bool:
+    """Whether a request presenting `token` (or none) may profile / download profiles."""
+    if PROFILE_TOKEN is not None and token is not None and hmac.compare_digest(token, PROFILE_TOKEN):
+        return True
+    return PROFILING and PROFILE_TOKEN is None
+
+
+def get_profile(profile_id: str) -> Optional[tuple]:
+    """Return (RequestProfile, raw pstats bytes) for a stored profile, or None if unknown or expired."""
+    return profile_store.get(profile_id)
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles requests carrying ?profile=1 (see module docstring)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or b"profile=" not in scope.get("query_string", b""):
+            await self.app(scope, receive, send)
+            return
+        if parse_qs(scope["query_string"].decode("latin-1")).get("profile") != ["1"]:
+            await self.app(scope, receive, send)
+            return
+
+        token = dict(scope.get("headers", [])).get(b"x-profile-token")
+        if not is_authorized(token.decode("latin-1") if token is not None else None):
+            await _send_status(send, scope, self.app, receive, b"unauthorized")
+            return
+        if not _profiler_lock.acquire(blocking=False):
+            await _send_status(send, scope, self.app, receive, b"busy")
+            return
+
+        profile_id = uuid.uuid4().hex
+        status = {}
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile_id.encode()),
+                    (b"x-profile-status", b"profiled")
+                ]}
+            await send(message)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (e.g. a coverage tool) is already active in this process
+            _profiler_lock.release()
+            await _send_status(send, scope, self.app, receive, b"unavailable")
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.disable()
+            _profiler_lock.release()
+            _store_profile(profile_id, scope, status.get("code"), time.perf_counter() - started, profiler)
+
+
+async def _send_status(send, scope, app, receive, value: bytes) -> None:
+    """Serve the request unprofiled, telling the caller why via X-Profile-Status."""
+    async def send_with_status(message):
+        if message["type"] == "http.response.start":
+            message = {**message, "headers": list(message.get("headers", [])) + [(b"x-profile-status", value)]}
+        await send(message)
+
+    await app(scope, receive, send_with_status)
+
+
+def _store_profile(profile_id: str, scope, status_code: Optional[int], seconds: float, profiler: cProfile.Profile) -> None:
+    stats = pstats.Stats(profiler)
+    entries = sorted(stats.stats.items(), key=lambda item: -item[1][3])
+    functions = [_function_entry(key, value) for key, value in entries]
+    profile = RequestProfile(
+        profile_id=profile_id,
+        method=scope["method"],
+        path=scope["path"],
+        status_code=status_code,
+        total_seconds=seconds,
+        created_at=datetime.now(),
+        hot_spots=[entry for entry in functions if entry.highlight][:TOP_FUNCTIONS],
+        functions=functions[:TOP_FUNCTIONS]
+    )
+    profile_store.put(profile_id, (profile, marshal.dumps(stats.stats)))
+
+
+def _function_entry(key: tuple, value: tuple) -> ProfiledFunction:
+    filename, line, name = key
+    _, calls, own, cumulative, _ = value
+    label = os.path.relpath(filename, ROOT) if filename.startswith(ROOT) else filename
+    return ProfiledFunction(
+        function=f"{label}:{line}({name})",
+        calls=calls,
+        own_seconds=own,
+        cumulative_seconds=cumulative,
+        highlight=filename.startswith(_HIGHLIGHTED)
+    )
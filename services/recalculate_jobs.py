@@ -0,0 +1,157 @@
+"""
+Recalculate Jobs
+
+Runs /recalculate work in the background worker pool so large groups are not
+bound by HTTP timeouts. Jobs (including their partial results) live in a
+bounded in-memory store and expire a TTL after they finish; queued and
+running jobs are never evicted, so a full store rejects new jobs instead.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+import os
+import threading
+import time
+import uuid
+from models.requests import RecalculateRequest
+from models.responses import RulesetStats
+from services import matching_service
+from services.worker_pool import executor
+from utils import metrics
+
+
+@dataclass
+class RecalculateJob:
+    """State of one background recalculation."""
+    job_id: str
+    group_id: str
+    rulesets: List[str]
+    status: str = "queued"  # queued -> running -> completed | failed
+    results: Dict[str, RulesetStats] = field(default_factory=dict)
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.now)
+    finished_at: Optional[datetime] = None
+
+
+class JobStoreFullError(RuntimeError):
+    """The job store is full of queued and running jobs."""
+
+    def __init__(self, max_jobs: int):
+        self.max_jobs = max_jobs
+        super().__init__(f"Too many unfinished recalculation jobs (limit {max_jobs})")
+
+
+class JobStore:
+    """
+    Thread-safe store of jobs by id.
+
+    Unfinished jobs stay until they finish; finished jobs expire ttl_seconds
+    after finishing and, when the store is full, the oldest finished job is
+    evicted to make room.
+
+    Args:
+        max_jobs: Maximum number of jobs kept
+        ttl_seconds: Seconds a finished job is kept
+    """
+
+    def __init__(self, max_jobs: int, ttl_seconds: float):
+        self.max_jobs = max_jobs
+        self.ttl_seconds = ttl_seconds
+        # job_id -> (expiry, job); expiry is None until the job finishes. Ordered by add/finish time.
+        self._entries: "OrderedDict[str, tuple[Optional[float], RecalculateJob]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, job: RecalculateJob) -> None:
+        """
+        Store a new job, evicting expired or the oldest finished jobs if full.
+
+        Raises:
+            JobStoreFullError: If every stored job is still queued or running
+        """
+        with self._lock:
+            now = time.monotonic()
+            for job_id in [job_id for job_id, (expiry, _) in self._entries.items() if expiry is not None and expiry < now]:
+                del self._entries[job_id]
+            if len(self._entries) >= self.max_jobs:
+                finished = next((job_id for job_id, (expiry, _) in self._entries.items() if expiry is not None), None)
+                if finished is None:
+                    raise JobStoreFullError(self.max_jobs)
+                del self._entries[finished]
+            self._entries[job.job_id] = (None, job)
+
+    def finish(self, job: RecalculateJob) -> None:
+        """Start a finished job's TTL."""
+        with self._lock:
+            if job.job_id in self._entries:
+                self._entries[job.job_id] = (time.monotonic() + self.ttl_seconds, job)
+                self._entries.move_to_end(job.job_id)
+
+    def get(self, job_id: str) -> Optional[RecalculateJob]:
+        """Return the job, or None if unknown or expired."""
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] < time.monotonic():
+                del self._entries[job_id]
+                return None
+            return entry[1]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+job_store = JobStore(
+    max_jobs=int(os.environ.get("PRESENTS_JOB_STORE_SIZE", "1000")),
+    ttl_seconds=float(os.environ.get("PRESENTS_JOB_TTL", "3600"))
+)
+
+
+def submit_recalculate_job(request: RecalculateRequest) -> RecalculateJob:
+    """
+    Queue a recalculation in the background worker pool.
+
+    Args:
+        request: Validated RecalculateRequest
+
+    Returns:
+        The queued RecalculateJob (poll it with get_job)
+
+    Raises:
+        JobStoreFullError: If the store is full of unfinished jobs
+    """
+    rulesets = matching_service.resolve_rulesets(request.rulesets)
+    job = RecalculateJob(job_id=uuid.uuid4().hex, group_id=request.group_id, rulesets=rulesets)
+    job_store.add(job)
+    executor.submit(_run_job, job, request, time.monotonic())
+    return job
+
+
+def get_job(job_id: str) -> Optional[RecalculateJob]:
+    """Look up a job by id; returns None if unknown or expired."""
+    return job_store.get(job_id)
+
+
+def _run_job(job: RecalculateJob, request: RecalculateRequest, submitted_at: float) -> None:
+    """Worker entry point: run the algorithms, recording each ruleset as it finishes."""
+    metrics.QUEUE_WAIT_SECONDS.observe(time.monotonic() - submitted_at, pool="jobs")
+    job.status = "running"
+    try:
+        matching_service.run_all_algorithms(
+            request.preference_payload,
+            rulesets=job.rulesets,
+            options=request.ruleset_options,
+            group_id=request.group_id,
+            include_user_stats=request.include_user_stats,
+            exclusion_mode=request.exclusion_mode,
+            on_result=job.results.__setitem__
+        )
+        job.status = "completed"
+    except Exception as e:
+        job.error = str(e)
+        job.status = "failed"
+    finally:
+        job.finished_at = datetime.now()
+        job_store.finish(job)
@@ -0,0 +1,69 @@
+"""
+Recalculate Stream
+
+Runs /recalculate work in the background worker pool and yields events as
+each ruleset finishes, plus progressive estimates for simulations.
+"""
+from typing import Any, AsyncIterator, Dict
+import asyncio
+import time
+from models.requests import RecalculateRequest
+from models.responses import RulesetStats
+from services import matching_service
+from services.worker_pool import executor
+from utils import metrics
+
+_DONE = object()
+
+
+async def stream_recalculation(request: RecalculateRequest) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield recalculation events as they happen.
+
+    Event shapes:
+    - {"event": "progress", "ruleset": name, "stats": {...}}: interim simulation estimate
+    - {"event": "ruleset", "ruleset": name, "stats": {...}}: final statistics for one ruleset
+    - {"event": "done", "group_id": ...}: all requested rulesets finished
+    - {"event": "error", "message": ...}: the recalculation failed
+
+    Args:
+        request: Validated RecalculateRequest
+
+    Yields:
+        JSON-serializable event dicts
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def emit(event: str, name: str, stats: RulesetStats) -> None:
+        payload = {"event": event, "ruleset": name, "stats": stats.model_dump(mode="json")}
+        loop.call_soon_threadsafe(queue.put_nowait, payload)
+
+    submitted_at = time.monotonic()
+
+    def run() -> None:
+        metrics.QUEUE_WAIT_SECONDS.observe(time.monotonic() - submitted_at, pool="stream")
+        try:
+            matching_service.run_all_algorithms(
+                request.preference_payload,
+                rulesets=request.rulesets,
+                options=request.ruleset_options,
+                group_id=request.group_id,
+                include_user_stats=request.include_user_stats,
+                exclusion_mode=request.exclusion_mode,
+                on_result=lambda name, stats: emit("ruleset", name, stats),
+                on_progress=lambda name, stats: emit("progress", name, stats)
+            )
+            loop.call_soon_threadsafe(queue.put_nowait, {"event": "done", "group_id": request.group_id})
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, {"event": "error", "message": f"Failed to calculate statistics: {str(e)}"})
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+
+    loop.run_in_executor(executor, run)
+
+    while True:
+        event = await queue.get()
+        if event is _DONE:
+            return
+        yield event
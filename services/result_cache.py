@@ -0,0 +1,98 @@
+"""
+Result Cache
+
+In-memory TTL + LRU store for computed ruleset results, so repeated
+/recalculate calls are served without recomputing and /finalize_group can
+return the exact matching whose statistics the admin just reviewed.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Optional
+import os
+import threading
+import time
+from models.responses import RulesetStats
+from utils.metrics import FunctionCounter
+
+
+@dataclass
+class CachedResult:
+    """A ruleset's statistics plus the concrete matching behind them (if any)."""
+    stats: RulesetStats
+    solution: Optional[Dict[str, str]] = None
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after a fixed TTL.
+
+    Args:
+        max_entries: Maximum number of entries before the least recently used is evicted
+        ttl_seconds: Seconds after insertion at which an entry expires
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store value under key, evicting the least recently used entries if full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all entries and reset hit/miss counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+def result_key(group_id: str, preferences_hash: str, ruleset: str, options: tuple) -> tuple:
+    """
+    Cache key for one ruleset result.
+
+    `preferences_hash` is PreferenceArrays.fingerprint() and `options` must be
+    the ruleset's effective options.
+    """
+    return (group_id, preferences_hash, ruleset, options)
+
+
+result_cache = TTLCache(
+    max_entries=int(os.environ.get("PRESENTS_RESULT_CACHE_SIZE", "256")),
+    ttl_seconds=float(os.environ.get("PRESENTS_RESULT_CACHE_TTL", "3600"))
+)
+
+# Most recent result key per (group_id, ruleset), so per-user statistics can be
+# paged later without the client resending the group's preferences
+latest_results = TTLCache(
+    max_entries=result_cache.max_entries,
+    ttl_seconds=result_cache.ttl_seconds
+)
+
+FunctionCounter("presents_result_cache_hits_total", "Result cache lookups that found a result", lambda: result_cache.hits)
+FunctionCounter("presents_result_cache_misses_total", "Result cache lookups that missed", lambda: result_cache.misses)
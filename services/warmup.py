@@ -0,0 +1,97 @@
+"""
+Warm-up
+
+Loads the ruleset implementations (and with them numpy/scipy) and runs a
+tiny solve so the first real request does not pay for imports.
+
+Controlled by environment variables:
+- PRESENTS_FAST_START (default "1"): start serving immediately and warm up
+  in a background thread after the port opens. Set to "0" to warm up
+  synchronously during startup instead.
+- PRESENTS_PREWARM (default "1"): set to "0" to skip warm-up entirely; heavy
+  modules are then imported by the first request that needs them.
+"""
+from datetime import datetime
+from typing import Any, Dict, Optional
+import os
+import threading
+import time
+from algorithms.registry import RULESETS
+from models.preferences import UserPreference
+
+FAST_START = os.environ.get("PRESENTS_FAST_START", "1") == "1"
+PREWARM = os.environ.get("PRESENTS_PREWARM", "1") == "1"
+
+_state: Dict[str, Any] = {
+    "status": "cold",  # cold -> warming -> ready | failed
+    "duration_ms": None,
+    "finished_at": None,
+    "error": None
+}
+_lock = threading.Lock()
+
+_WARMUP_PREFERENCES = [
+    UserPreference(
+        user_id=f"warmup_{i}",
+        preference_practicality_giving=1 + i,
+        preference_practicality_receiving=3,
+        preference_novelty_giving=3,
+        preference_novelty_receiving=1 + i,
+        preference_thoughtfulness_giving=3,
+        preference_thoughtfulness_receiving=3,
+        we_hate_being_stolen_from=3,
+        we_enjoy_stealing=3
+    )
+    for i in range(3)
+]
+
+# Smallest settings of the costly options (by keyword argument): warm-up only
+# needs each code path to run once, not a full simulation or Pareto sweep
+_WARMUP_OPTIONS = {"num_simulations": 1, "points": 2}
+
+
+def start() -> None:
+    """Warm up according to PRESENTS_FAST_START / PRESENTS_PREWARM (called at app startup)."""
+    if not PREWARM:
+        _state["status"] = "ready"
+        return
+
+    if FAST_START:
+        threading.Thread(target=prewarm, name="presents-prewarm", daemon=True).start()
+    else:
+        prewarm()
+
+
+def prewarm() -> None:
+    """Import every ruleset implementation and run a tiny, minimal-option solve with each (idempotent)."""
+    with _lock:
+        if _state["status"] == "ready":
+            return
+        _state["status"] = "warming"
+        started = time.perf_counter()
+        try:
+            from utils.group_context import build_group_context
+
+            context = build_group_context(_WARMUP_PREFERENCES, seed=0)
+            for spec in RULESETS.values():
+                implementation = spec.load()
+                if spec.has("stats"):
+                    kwargs = {kwarg: _WARMUP_OPTIONS.get(kwarg, default) for kwarg, default in spec.options.values()}
+                    implementation.calculate_statistics(context, **kwargs)
+            _state["status"] = "ready"
+        except Exception as e:
+            _state["status"] = "failed"
+            _state["error"] = str(e)
+        finally:
+            _state["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            _state["finished_at"] = datetime.now().isoformat()
+
+
+def is_ready() -> bool:
+    """True once warm-up has completed (or was disabled)."""
+    return _state["status"] == "ready"
+
+
+def status() -> Dict[str, Optional[Any]]:
+    """Snapshot of the warm-up state for the /ready endpoint."""
+    return dict(_state)
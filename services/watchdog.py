@@ -0,0 +1,138 @@
+"""
+Watchdog
+
+Makes event-loop stalls visible. The compute endpoints are `async` but run
+their CPU work synchronously on the event loop, so while one runs nothing
+else (health checks included) is served.
+
+- A heartbeat task wakes every LOOP_INTERVAL and records how late it woke
+  (scheduling delay) in the presents_event_loop_lag_seconds histogram.
+- A watchdog thread notices when the heartbeat has been silent for longer
+  than BLOCKED_THRESHOLD, captures the event-loop thread's stack at that
+  moment and logs it (once per stall) as an "event_loop_blocked" event.
+- log_slow_request (the ServerTimingMiddleware on_complete hook) logs
+  requests slower than SLOW_REQUEST_THRESHOLD, with their group size and
+  per-stage timings, as a sampled "slow_request" event.
+
+Events are single-line JSON messages on the "presents.watchdog" logger.
+
+Controlled by environment variables:
+- PRESENTS_WATCHDOG (default "1"): "0" disables the heartbeat and thread
+- PRESENTS_BLOCKED_THRESHOLD_MS (default 500): stall length that is logged
+- PRESENTS_SLOW_REQUEST_MS (default 1000): request duration that is logged
+- PRESENTS_SLOW_REQUEST_SAMPLE_RATE (default 1.0): share of slow requests logged
+"""
+from typing import Optional
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import traceback
+from utils.metrics import Counter, Histogram, RequestTrace
+
+WATCHDOG = os.environ.get("PRESENTS_WATCHDOG", "1") == "1"
+BLOCKED_THRESHOLD = float(os.environ.get("PRESENTS_BLOCKED_THRESHOLD_MS", "500")) / 1000
+SLOW_REQUEST_THRESHOLD = float(os.environ.get("PRESENTS_SLOW_REQUEST_MS", "1000")) / 1000
+SLOW_REQUEST_SAMPLE_RATE = float(os.environ.get("PRESENTS_SLOW_REQUEST_SAMPLE_RATE", "1.0"))
+
+LOOP_INTERVAL = 0.1
+# Innermost stack frames included in a stall report
+STACK_DEPTH = 30
+
+logger = logging.getLogger("presents.watchdog")
+
+LOOP_LAG_SECONDS = Histogram(
+    "presents_event_loop_lag_seconds", "How late the event loop ran a task scheduled LOOP_INTERVAL ahead",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+LOOP_BLOCKED = Counter("presents_event_loop_blocked_total", "Event-loop stalls longer than the blocked threshold")
+SLOW_REQUESTS = Counter("presents_slow_requests_total", "Requests slower than the slow-request threshold", ["path"])
+
+_state = {"heartbeat": 0.0, "task": None, "thread": None, "stop": None}
+
+
+def start() -> None:
+    """Start the heartbeat task on the running loop and the watchdog thread (called at app startup)."""
+    if not WATCHDOG or _state["task"] is not None:
+        return
+    _state["heartbeat"] = time.monotonic()
+    _state["task"] = asyncio.get_running_loop().create_task(_heartbeat())
+    _state["stop"] = threading.Event()
+    _state["thread"] = threading.Thread(
+        target=_watch, args=(threading.get_ident(), _state["stop"]), name="presents-watchdog", daemon=True
+    )
+    _state["thread"].start()
+
+
+def stop() -> None:
+    """Stop the heartbeat task and watchdog thread (called at app shutdown)."""
+    if _state["task"] is None:
+        return
+    _state["task"].cancel()
+    _state["stop"].set()
+    _state.update(task=None, thread=None, stop=None)
+
+
+def log_slow_request(scope: dict, status_code: Optional[int], seconds: float, trace: RequestTrace) -> None:
+    """
+    Log a request if it exceeded SLOW_REQUEST_THRESHOLD (sampled at SLOW_REQUEST_SAMPLE_RATE).
+
+    Args:
+        scope: ASGI scope of the request
+        status_code: Response status (None if no response was started)
+        seconds: Total request duration
+        trace: Timings and fields recorded during the request
+    """
+    if seconds < SLOW_REQUEST_THRESHOLD:
+        return
+    SLOW_REQUESTS.inc(path=scope.get("path", ""))
+    if random.random() >= SLOW_REQUEST_SAMPLE_RATE:
+        return
+    _log_event(
+        "slow_request",
+        method=scope.get("method"),
+        path=scope.get("path"),
+        status_code=status_code,
+        duration_ms=round(seconds * 1000, 2),
+        timings_ms={name: round(duration, 2) for name, duration, _ in trace.timings},
+        sample_rate=SLOW_REQUEST_SAMPLE_RATE,
+        **trace.fields
+    )
+
+
+async def _heartbeat() -> None:
+    while True:
+        expected = time.monotonic() + LOOP_INTERVAL
+        await asyncio.sleep(LOOP_INTERVAL)
+        now = time.monotonic()
+        _state["heartbeat"] = now
+        LOOP_LAG_SECONDS.observe(max(0.0, now - expected))
+
+
+def _watch(loop_thread_id: int, stop: threading.Event) -> None:
+    """Watchdog thread: report each stall once, with the loop thread's stack."""
+    reported = 0.0
+    while not stop.wait(min(BLOCKED_THRESHOLD, LOOP_INTERVAL) / 2):
+        heartbeat = _state["heartbeat"]
+        blocked = time.monotonic() - heartbeat - LOOP_INTERVAL
+        if blocked < BLOCKED_THRESHOLD or heartbeat == reported:
+            continue
+        reported = heartbeat
+        LOOP_BLOCKED.inc()
+        frame = sys._current_frames().get(loop_thread_id)
+        stack = traceback.extract_stack(frame, limit=STACK_DEPTH) if frame is not None else []
+        _log_event(
+            "event_loop_blocked",
+            blocked_ms=round(blocked * 1000, 2),
+            threshold_ms=round(BLOCKED_THRESHOLD * 1000, 2),
+            stack=[f"{entry.filename}:{entry.lineno} in {entry.name}: {entry.line}" for entry in stack]
+        )
+
+
+def _log_event(event: str, **fields) -> None:
+    logger.warning(json.dumps({"event": event, **fields}, default=str))
+
@@ -0,0 +1,44 @@
+"""
+Worker Pool
+
+Shared background executors for compute work that should not run on the
+request's event loop: a thread pool for jobs and streaming, and a lazily
+started process pool for cross-group parallelism in batches.
+
+Process workers start from a forkserver rather than by forking the server,
+which already runs thread pools and holds locks a forked child could
+inherit mid-use. Each is a full interpreter, so only a couple run by default.
+"""
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+import multiprocessing
+import os
+import threading
+
+MAX_WORKERS = int(os.environ.get("PRESENTS_WORKERS", str(os.cpu_count() or 1)))
+
+# Set to 0 to run batch work on the thread pool instead of separate processes
+MAX_PROCESS_WORKERS = int(os.environ.get("PRESENTS_PROCESS_WORKERS", str(min(2, os.cpu_count() or 1))))
+
+# forkserver is unavailable on Windows, where spawn is the only option
+_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="presents-worker")
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> Executor:
+    """Return the shared process pool, starting it on first use (falls back to the thread pool)."""
+    global _process_pool
+    if MAX_PROCESS_WORKERS <= 0:
+        return executor
+
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=MAX_PROCESS_WORKERS,
+                mp_context=multiprocessing.get_context(_START_METHOD)
+            )
+        return _process_pool
@@ -0,0 +1,108 @@
+"""
+Brute-force oracle for small groups.
+
+Enumerates every permutation of n <= MAX_ORACLE_USERS people, keeps the
+valid ones (no self-gifts, exclusions respected, i.e. allowed[g, perm[g]]
+for every giver) and evaluates them all at once with NumPy. The exact
+answers are the reference the solvers are checked against in
+tests/test_solver_quality.py and scripts/solver_quality_report.py.
+"""
+from dataclasses import replace
+from functools import lru_cache
+from itertools import permutations
+from typing import Dict
+import numpy as np
+from models.preferences import ColumnarPreferences
+from services.matching_service import validate_preferences
+from utils.group_context import GroupContext, build_group_context
+from tests.synthetic_groups import generate_group
+
+# 9! = 362,880 permutations; beyond that enumeration gets too slow for a test suite
+MAX_ORACLE_USERS = 9
+
+
+def random_context(n: int, seed: int, exclusions: bool = True) -> GroupContext:
+    """
+    A synthetic group's context with a random integer 0-10 utility matrix.
+
+    The placeholder utility function scores every pair the same, so the
+    solvers are exercised with random utilities (integers, so ties occur)
+    on the synthetic group's exclusion structure.
+
+    Args:
+        n: Number of users
+        seed: Seed for the group and the utilities
+        exclusions: If False, drop the group's exclusions (only self-gifts are blocked)
+    """
+    group = generate_group(n, seed=seed)
+    if not exclusions:
+        group = {**group, "exclusion_sources": [], "exclusion_targets": []}
+    context = build_group_context(validate_preferences(ColumnarPreferences(**group)), seed=seed)
+    utility = np.random.default_rng(seed).integers(0, 11, size=(n, n)).astype(np.float64)
+    return replace(context, utility=utility)
+
+
+@lru_cache(maxsize=None)
+def all_permutations(n: int) -> np.ndarray:
+    """All permutations of range(n) as rows of a (n!, n) array (receivers by giver)."""
+    if n > MAX_ORACLE_USERS:
+        raise ValueError(f"The oracle enumerates at most {MAX_ORACLE_USERS} users, got {n}")
+    return np.array(list(permutations(range(n))), dtype=np.int8).reshape(-1, n)
+
+
+def valid_matchings(context: GroupContext) -> np.ndarray:
+    """Every valid matching of the group as rows of receivers-by-giver."""
+    perms = all_permutations(context.size)
+    return perms[context.allowed[np.arange(context.size), perms].all(axis=1)]
+
+
+def matching_utilities(context: GroupContext, matchings: np.ndarray) -> np.ndarray:
+    """Utility of each giver's gift per matching, shape (matchings, n); the multiset equals the receivers' utilities."""
+    return np.asarray(context.utility, dtype=np.float64)[np.arange(context.size), matchings]
+
+
+def exact_optima(context: GroupContext) -> Dict[str, float]:
+    """
+    Exact optimum of every objective the solvers target.
+
+    Returns:
+        Dict with:
+        - max_total: Highest total utility (Max Utility)
+        - max_min: Highest minimum utility (Max Fairness floor)
+        - max_total_at_max_min: Highest total among matchings at that floor (minimax tie-break)
+        - min_squared_deviation: Lowest sum of squared deviations from the mean of
+          the minimax matching, among matchings at the floor (variance objective)
+        - valid_matchings: Number of valid matchings
+
+    Raises:
+        ValueError: If the group has no valid matching
+    """
+    matchings = valid_matchings(context)
+    if len(matchings) == 0:
+        raise ValueError("No valid matching exists that satisfies all exclusions")
+
+    utilities = matching_utilities(context, matchings)
+    totals = utilities.sum(axis=1)
+    minimums = utilities.min(axis=1)
+    max_min = minimums.max()
+    at_floor = minimums >= max_min
+    max_total_at_floor = totals[at_floor].max()
+    target = max_total_at_floor / context.size
+    return {
+        "max_total": float(totals.max()),
+        "max_min": float(max_min),
+        "max_total_at_max_min": float(max_total_at_floor),
+        "min_squared_deviation": float(((utilities[at_floor] - target) ** 2).sum(axis=1).min()),
+        "valid_matchings": len(matchings)
+    }
+
+
+def exact_random_expectations(context: GroupContext) -> np.ndarray:
+    """Each receiver's exact expected utility when one valid matching is drawn uniformly at random."""
+    matchings = valid_matchings(context)
+    if len(matchings) == 0:
+        raise ValueError("No valid matching exists that satisfies all exclusions")
+    utilities = matching_utilities(context, matchings)
+    expected = np.zeros(context.size)
+    np.add.at(expected, matchings.ravel(), utilities.ravel())
+    return expected / len(matchings)
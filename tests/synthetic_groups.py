@@ -0,0 +1,151 @@
+"""
+Seeded synthetic group generator.
+
+Produces groups of any size in the columnar request format, with the
+structure real groups have rather than independent uniform noise:
+- correlated preferences: every score is driven by a per-user "taste"
+  factor plus a per-dimension factor shared by that dimension's giving and
+  receiving scores, so e.g. practical givers tend to want practical gifts
+- clustered interests: users belong to interest communities and draw most
+  interests from their community's topics
+- exclusion structure: households (partners, family) exclude each other,
+  and a few people in each department exclude one colleague one-sidedly
+- optionally, offices: contiguous sub-groups given as partitions, so
+  everyone matches within their own office
+
+Used by the scaling benchmark (scripts/benchmark_scaling.py) and by tests
+that need groups larger than the hand-written samples in test_data.py.
+"""
+from typing import Any, Dict, List
+import numpy as np
+from models.preferences import SCORE_COLUMNS
+
+INTERESTS = (
+    "Coffee", "Tea", "Books", "Tech", "Gaming", "Music", "Art", "Photography", "Hiking", "Nature",
+    "Cooking", "Baking", "Wine", "Fitness", "Yoga", "Running", "Cycling", "Travel", "Movies", "Theater",
+    "Fashion", "Gardening", "Pets", "Crafts", "Board Games", "Sports", "Science", "History", "Puzzles", "Camping"
+)
+
+# (giving column, receiving column) pairs that share a dimension factor
+_DIMENSIONS = (
+    ("preference_practicality_giving", "preference_practicality_receiving"),
+    ("preference_novelty_giving", "preference_novelty_receiving"),
+    ("preference_thoughtfulness_giving", "preference_thoughtfulness_receiving"),
+)
+
+MAX_HOUSEHOLD_SIZE = 4
+DEPARTMENT_SIZE = 50
+# Share of users who exclude one colleague from their department
+DEPARTMENT_EXCLUSION_RATE = 0.05
+
+
+def generate_group(n: int, seed: int = 0, offices: int = 0) -> Dict[str, Any]:
+    """
+    Generate a synthetic group in the columnar request format.
+
+    Args:
+        n: Number of users (at least 2)
+        seed: Seed; the same (n, seed) always gives the same group
+        offices: Number of equal-sized offices to partition the group into
+            (0 = no partitions; at most n // 2, so every office can match)
+
+    Returns:
+        Dict matching ColumnarPreferences (ready to send as `columnar_preferences`)
+    """
+    rng = np.random.default_rng(seed)
+    user_ids = [f"user_{seed}_{i}" for i in range(n)]
+
+    taste = rng.normal(size=n)
+    columns: Dict[str, List[int]] = {}
+    for giving, receiving in _DIMENSIONS:
+        dimension = rng.normal(size=n)
+        for column in (giving, receiving):
+            columns[column] = _to_scale(0.6 * taste + 0.8 * dimension + 0.5 * rng.normal(size=n))
+    stealing = rng.normal(size=n)
+    columns["we_enjoy_stealing"] = _to_scale(stealing + 0.3 * taste)
+    columns["we_hate_being_stolen_from"] = _to_scale(-0.6 * stealing + 0.8 * rng.normal(size=n))
+
+    interest_offsets, interest_values = _clustered_interests(rng, n)
+    exclusion_sources, exclusion_targets = _exclusions(rng, n)
+
+    group = {
+        "user_ids": user_ids,
+        **{column: columns[column] for column in SCORE_COLUMNS},
+        "interest_offsets": interest_offsets,
+        "interest_values": interest_values,
+        "exclusion_sources": exclusion_sources,
+        "exclusion_targets": exclusion_targets
+    }
+    if offices:
+        if not 0 < offices <= n // 2:
+            raise ValueError(f"offices must be between 1 and {n // 2} for {n} users")
+        group["partitions"] = [f"office_{i * offices // n}" for i in range(n)]
+    return group
+
+
+def to_user_preferences(group: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Convert a generated group to the per-user object format (`preferences`)."""
+    by_user: List[List[str]] = [[] for _ in group["user_ids"]]
+    for source, target in zip(group["exclusion_sources"], group["exclusion_targets"]):
+        by_user[source].append(group["user_ids"][target])
+
+    offsets = group["interest_offsets"]
+    return [
+        {
+            "user_id": user_id,
+            **{column: group[column][i] for column in SCORE_COLUMNS},
+            "preferred_interests": group["interest_values"][offsets[i]:offsets[i + 1]],
+            "exclusions": by_user[i],
+            **({"partition": group["partitions"][i]} if "partitions" in group else {})
+        }
+        for i, user_id in enumerate(group["user_ids"])
+    ]
+
+
+def _to_scale(latent: np.ndarray) -> List[int]:
+    """Map standard-normal-ish values onto the 1-5 scale."""
+    return np.clip(np.rint(3 + 1.2 * latent), 1, 5).astype(int).tolist()
+
+
+def _clustered_interests(rng: np.random.Generator, n: int):
+    """Assign each user 1-5 interests, mostly from their community's topics (CSR offsets + values)."""
+    n_communities = max(1, min(len(INTERESTS) // 3, int(np.sqrt(n))))
+    topics = [rng.choice(len(INTERESTS), size=5, replace=False) for _ in range(n_communities)]
+    community = rng.integers(n_communities, size=n)
+    counts = rng.integers(1, 6, size=n)
+
+    offsets = [0]
+    values: List[str] = []
+    for i in range(n):
+        own = topics[community[i]]
+        picks = {int(rng.choice(own)) if rng.random() < 0.8 else int(rng.integers(len(INTERESTS))) for _ in range(counts[i])}
+        values.extend(INTERESTS[p] for p in sorted(picks))
+        offsets.append(len(values))
+    return offsets, values
+
+
+def _exclusions(rng: np.random.Generator, n: int):
+    """Household exclusions (both ways, everyone in the household) plus one-sided department exclusions."""
+    sources: List[int] = []
+    targets: List[int] = []
+
+    # Small groups get smaller households so everyone keeps enough possible partners
+    max_household = max(1, min(MAX_HOUSEHOLD_SIZE, n // 3))
+    start = 0
+    while start < n:
+        size = min(n - start, int(rng.integers(1, max_household + 1)))
+        members = range(start, start + size)
+        for a in members:
+            for b in members:
+                if a != b:
+                    sources.append(a)
+                    targets.append(b)
+        start += size
+
+    for i in np.flatnonzero(rng.random(n) < DEPARTMENT_EXCLUSION_RATE).tolist():
+        department = i // DEPARTMENT_SIZE * DEPARTMENT_SIZE
+        colleague = int(rng.integers(department, min(n, department + DEPARTMENT_SIZE)))
+        if colleague != i:
+            sources.append(i)
+            targets.append(colleague)
+    return sources, targets
@@ -0,0 +1,263 @@
+"""
+Algorithm tests.
+
+Runs each algorithm directly against a GroupContext built from sample data
+or from a hand-written utility matrix.
+"""
+import numpy as np
+import pytest
+from scipy.optimize import linear_sum_assignment
+from models.preferences import UserPreference, ColumnarPreferences
+from utils.group_context import GroupContext, build_group_context
+from utils.preference_arrays import from_columnar, from_preferences
+from utils.group_validation import check_group
+from utils.utility_calculator import calculate_utility, calculate_utility_matrix
+from utils import assignment, components, utility_storage
+from utils.assignment import solve_assignment
+from algorithms import random_matching, max_utility_matching, max_fairness_matching, white_elephant_simulation
+from algorithms.registry import RULESETS
+from tests.test_data import SAMPLE_PREFERENCES, SAMPLE_COLUMNAR_PREFERENCES
+
+
+def _context_from_matrix(utility, seed=0):
+    """Build a context directly from a utility matrix (no exclusions)."""
+    n = len(utility)
+    user_ids = [f"user_{i}" for i in range(n)]
+    return GroupContext(
+        user_ids=user_ids,
+        index={user_id: i for i, user_id in enumerate(user_ids)},
+        utility=np.asarray(utility, dtype=np.float64),
+        allowed=~np.eye(n, dtype=bool),
+        hate_being_stolen_from=np.full(n, 3.0),
+        enjoy_stealing=np.full(n, 3.0),
+        rng=np.random.default_rng(seed),
+        seed=seed
+    )
+
+
+def _assert_valid_matching(context, matching):
+    assert sorted(matching) == sorted(context.user_ids)
+    assert sorted(matching.values()) == sorted(context.user_ids)
+    for giver, receiver in matching.items():
+        assert context.allowed[context.index[giver], context.index[receiver]]
+
+
+def test_context_applies_exclusions_symmetrically():
+    """Test an exclusion listed by one person blocks both directions."""
+    preferences = [UserPreference(**pref) for pref in SAMPLE_PREFERENCES]
+    preferences[0].exclusions = [preferences[1].user_id]
+    context = build_group_context(preferences)
+
+    assert not context.allowed[0, 1]
+    assert not context.allowed[1, 0]
+    assert not context.allowed.diagonal().any()
+
+
+def test_columnar_preferences_match_object_preferences():
+    """Test both request formats convert to identical arrays and utilities."""
+    preferences = [UserPreference(**pref) for pref in SAMPLE_PREFERENCES]
+    preferences[0].exclusions = [preferences[2].user_id]
+    columnar = ColumnarPreferences(**{**SAMPLE_COLUMNAR_PREFERENCES, "exclusion_sources": [0], "exclusion_targets": [2]})
+
+    from_objects = from_preferences(preferences)
+    assert from_columnar(columnar).fingerprint() == from_objects.fingerprint()
+
+    utility = calculate_utility_matrix(from_objects)
+    for g, giver in enumerate(preferences):
+        for r, receiver in enumerate(preferences):
+            assert utility[g, r] == calculate_utility(giver, receiver)
+
+    context = build_group_context(columnar)
+    assert not context.allowed[0, 2] and not context.allowed[2, 0]
+
+
+def test_exclusion_modes_normalize_blocked_pairs():
+    """Test symmetric mode blocks both directions and directed mode only the excluder's."""
+    preferences = [UserPreference(**pref) for pref in SAMPLE_PREFERENCES]
+    preferences[0].exclusions = [preferences[1].user_id]
+    arrays = from_preferences(preferences)
+
+    symmetric = check_group(arrays, "symmetric")
+    assert symmetric.problems == []
+    context = build_group_context(symmetric.arrays)
+    assert not context.allowed[0, 1] and not context.allowed[1, 0]
+
+    directed = build_group_context(check_group(arrays, "directed").arrays)
+    assert not directed.allowed[0, 1] and directed.allowed[1, 0]
+
+    assert check_group(arrays, "strict").problem_counts == {"asymmetric_exclusion": 1}
+
+
+def test_matchings_respect_exclusions():
+    """Test every Secret Santa algorithm returns a valid derangement."""
+    preferences = [UserPreference(**pref) for pref in SAMPLE_PREFERENCES]
+    preferences[0].exclusions = [preferences[1].user_id, preferences[2].user_id]
+    context = build_group_context(preferences, seed=7)
+
+    _assert_valid_matching(context, random_matching.generate_matching(context))
+    _assert_valid_matching(context, max_utility_matching.generate_matching(context))
+    _assert_valid_matching(context, max_fairness_matching.generate_matching(context))
+
+
+def test_partitions_match_within_themselves():
+    """Test partitioned users only match within their partition, component by component."""
+    preferences = [UserPreference(**pref, partition="north" if i % 2 else "south") for i, pref in enumerate(SAMPLE_PREFERENCES)]
+    columnar = ColumnarPreferences(**{**SAMPLE_COLUMNAR_PREFERENCES, "partitions": [p.partition for p in preferences]})
+    assert from_columnar(columnar).fingerprint() == from_preferences(preferences).fingerprint()
+    assert from_preferences(preferences).fingerprint() != from_preferences([UserPreference(**pref) for pref in SAMPLE_PREFERENCES]).fingerprint()
+
+    context = build_group_context(check_group(from_preferences(preferences)).arrays, seed=3)
+    assert sorted(map(len, context.components)) == [4, 4]
+    partition = {pref.user_id: pref.partition for pref in preferences}
+    for algorithm in (random_matching, max_utility_matching, max_fairness_matching):
+        matching = algorithm.generate_matching(context)
+        _assert_valid_matching(context, matching)
+        assert all(partition[giver] == partition[receiver] for giver, receiver in matching.items())
+
+    preferences[0].partition = "alone"
+    assert check_group(from_preferences(preferences)).problem_counts == {"singleton_partition": 1}
+
+
+def test_component_solves_match_a_whole_group_solve(monkeypatch):
+    """Test solving independent components in parallel gives the same optimum as one dense solve."""
+    monkeypatch.setattr(components, "PARALLEL_MIN_USERS", 0)
+    monkeypatch.setattr(components, "COMPONENT_WORKERS", 2)
+    rng = np.random.default_rng(0)
+    labels = rng.integers(0, 4, size=60)
+    weights = rng.random((60, 60))
+    allowed = (labels[:, None] == labels[None, :]) & ~np.eye(60, dtype=bool)
+
+    assert len(components.matching_components(allowed)) == 4
+    assert len(components.matching_components(~np.eye(60, dtype=bool))) == 1
+    receivers = solve_assignment(weights, allowed)
+    cost = np.where(allowed, weights, -np.inf)
+    rows, cols = linear_sum_assignment(cost, maximize=True)
+    assert allowed[np.arange(60), receivers].all()
+    assert weights[np.arange(60), receivers].sum() == pytest.approx(weights[rows, cols].sum())
+
+
+def test_floor_and_center_match_a_masked_solve(monkeypatch):
+    """Test the floor and squared-deviation options equal solving a masked, transformed copy."""
+    monkeypatch.setattr(assignment, "ROW_BLOCK", 7)
+    rng = np.random.default_rng(1)
+    weights = rng.random((40, 40)).astype(np.float32)
+    allowed = ~np.eye(40, dtype=bool)
+    floor = float(np.sort(weights[allowed])[200])
+
+    receivers = solve_assignment(weights, allowed, maximize=False, floor=floor, center=0.5)
+    cost = np.where(allowed & (weights >= floor), (weights.astype(np.float64) - 0.5) ** 2, np.inf)
+    rows, cols = linear_sum_assignment(cost)
+    assert (weights[np.arange(40), receivers] >= floor).all()
+    assert cost[np.arange(40), receivers].sum() == pytest.approx(cost[rows, cols].sum())
+
+
+def test_top_k_max_utility_expands_candidates_until_feasible():
+    """Test top_k mode doubles k when the candidate graph has no perfect matching, and is near-optimal."""
+    # Everyone's favourite receiver is user_1 and everyone's favourite giver
+    # is user_0, so one candidate each leaves no perfect matching
+    utility = np.tile(np.arange(6, dtype=np.float64), (6, 1)) * 0.1
+    utility[:, 1] = 5
+    utility[0, :] = 9
+    context = _context_from_matrix(utility)
+    stats = max_utility_matching.calculate_statistics(context, mode="top_k", top_k=1)
+    assert stats.candidates_per_user > 1
+    assert stats.group_satisfaction_score == max_utility_matching.calculate_statistics(context, mode="exact").group_satisfaction_score
+
+    rng = np.random.default_rng(0)
+    context = _context_from_matrix(np.clip(5 + rng.normal(size=(300, 300)) + rng.normal(size=300), 0, 10))
+    exact = max_utility_matching.calculate_statistics(context, mode="exact")
+    approximate = max_utility_matching.calculate_statistics(context, mode="top_k", top_k=16)
+    assert approximate.group_satisfaction_score <= exact.group_satisfaction_score + 1e-9
+    assert approximate.group_satisfaction_score > 0.999 * exact.group_satisfaction_score
+    assert exact.group_satisfaction_score <= approximate.utility_upper_bound
+    assert 0 <= approximate.optimality_gap < 0.05
+    assert exact.optimality_gap is None
+
+    # All-equal utilities: tie-breaking spreads candidates, so k never grows
+    stats = max_utility_matching.calculate_statistics(_context_from_matrix(np.full((50, 50), 5.0)), mode="top_k", top_k=2)
+    assert stats.candidates_per_user == 2
+    assert stats.optimality_gap == 0
+
+
+def test_max_utility_and_max_fairness_objectives():
+    """Test Max Utility maximizes the total while Max Fairness maximizes the minimum."""
+    utility = [
+        [0, 10, 1],
+        [1, 0, 10],
+        [6, 6, 0],
+    ]
+    # Cycles: 0->1->2->0 gives utilities (10, 10, 6); 0->2->1->0 gives (1, 6, 1)
+    context = _context_from_matrix(utility)
+    assert max_utility_matching.calculate_statistics(context).group_satisfaction_score == 26 / 3
+    assert max_fairness_matching.calculate_statistics(context).min_utility == 6
+
+
+def test_memory_mapped_utility_matrix(tmp_path, monkeypatch):
+    """Test large groups get a shared read-only memmap and algorithms give the same results from it."""
+    monkeypatch.setattr(utility_storage, "SCRATCH_DIR", str(tmp_path))
+    monkeypatch.setattr(utility_storage, "MEMMAP_MIN_USERS", 0)
+    preferences = [UserPreference(**pref) for pref in SAMPLE_PREFERENCES]
+    mapped = build_group_context(preferences, seed=0)
+
+    assert isinstance(mapped.utility, np.memmap)
+    assert mapped.utility.dtype == np.dtype(utility_storage.MEMMAP_DTYPE)
+    assert not mapped.utility.flags.writeable
+    assert build_group_context(preferences).utility.filename == mapped.utility.filename
+    assert len(list(tmp_path.iterdir())) == 1
+
+    monkeypatch.setattr(utility_storage, "MEMMAP_MIN_USERS", 10_000)
+    in_memory = build_group_context(preferences, seed=0)
+    for algorithm in (random_matching, max_utility_matching, max_fairness_matching):
+        assert algorithm.calculate_statistics(mapped) == algorithm.calculate_statistics(in_memory)
+
+
+def test_random_matching_statistics_in_row_blocks(monkeypatch):
+    """Test the blocked Random Matching reduction matches a single pass."""
+    utility = np.random.default_rng(3).uniform(0, 10, (7, 7))
+    context = _context_from_matrix(utility)
+    single_pass = random_matching.calculate_statistics(context)
+
+    monkeypatch.setattr(utility_storage, "BLOCK_BYTES", 2 * 7 * 8)
+    blocked = random_matching.calculate_statistics(context)
+    assert blocked.min_utility == single_pass.min_utility
+    assert blocked.max_utility == single_pass.max_utility
+    assert np.isclose(blocked.std_dev, single_pass.std_dev)
+    for user_id, stats in blocked.user_stats.items():
+        assert np.isclose(stats.variance, single_pass.user_stats[user_id].variance)
+
+
+def test_white_elephant_statistics():
+    """Test the White Elephant simulation runs the requested number of games."""
+    context = build_group_context([UserPreference(**pref) for pref in SAMPLE_PREFERENCES], seed=1)
+    stats = white_elephant_simulation.calculate_statistics(context, num_simulations=20)
+
+    assert stats.simulations_run == 20
+    assert len(stats.user_stats) == len(SAMPLE_PREFERENCES)
+
+
+def test_registered_rulesets_implement_their_capabilities():
+    """Test every registered ruleset module exposes the functions its capabilities require."""
+    required = {
+        "stats": "calculate_statistics",
+        "pairings": "generate_matching",
+        "play_order": "generate_play_order"
+    }
+    for spec in RULESETS.values():
+        implementation = spec.load()
+        for capability, function_name in required.items():
+            if spec.has(capability):
+                assert callable(getattr(implementation, function_name)), (spec.name, function_name)
+        if spec.deterministic:
+            assert callable(implementation.solve), spec.name
+
+
+def test_ruleset_generators_are_independent_and_reproducible():
+    """Test per-ruleset generators depend only on the seed and the ruleset name."""
+    preferences = [UserPreference(**pref) for pref in SAMPLE_PREFERENCES]
+    first = build_group_context(preferences, seed=42)
+    second = build_group_context(preferences, seed=42)
+    second.for_ruleset("Random Matching").rng.random(100)
+
+    order_a = white_elephant_simulation.generate_play_order(first.for_ruleset("White Elephant"))
+    order_b = white_elephant_simulation.generate_play_order(second.for_ruleset("White Elephant"))
+    assert order_a == order_b
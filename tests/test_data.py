@@ -112,6 +112,28 @@ SAMPLE_PREFERENCES = [
     }
 ]
 
+# The same group as parallel arrays (columnar request format)
+SAMPLE_COLUMNAR_PREFERENCES = {
+    "user_ids": [pref["user_id"] for pref in SAMPLE_PREFERENCES],
+    **{
+        column: [pref[column] for pref in SAMPLE_PREFERENCES]
+        for column in (
+            "preference_practicality_giving",
+            "preference_practicality_receiving",
+            "preference_novelty_giving",
+            "preference_novelty_receiving",
+            "preference_thoughtfulness_giving",
+            "preference_thoughtfulness_receiving",
+            "we_hate_being_stolen_from",
+            "we_enjoy_stealing"
+        )
+    },
+    "interest_offsets": [3 * i for i in range(len(SAMPLE_PREFERENCES) + 1)],
+    "interest_values": [interest for pref in SAMPLE_PREFERENCES for interest in pref["preferred_interests"]],
+    "exclusion_sources": [],
+    "exclusion_targets": []
+}
+
 # Sample recalculate request
 SAMPLE_RECALCULATE_REQUEST = {
     "group_id": "test_group_001",
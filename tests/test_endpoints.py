@@ -3,20 +3,36 @@ Basic endpoint tests.
 
 Tests the API endpoints with sample data to ensure everything is wired correctly.
 """
+import json
+import marshal
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from main import app
+from models.responses import RecalculateResponse
+from controllers import recalculate, profiles
+from services import warmup, group_store, profiling, watchdog, finalize_store, matching_service
 from tests.test_data import (
     SAMPLE_RECALCULATE_REQUEST,
     SAMPLE_FINALIZE_RANDOM,
     SAMPLE_FINALIZE_MAX_UTILITY,
     SAMPLE_FINALIZE_MAX_FAIRNESS,
     SAMPLE_FINALIZE_WHITE_ELEPHANT,
-    SAMPLE_PREFERENCES_1_USER
+    SAMPLE_PREFERENCES_1_USER,
+    SAMPLE_COLUMNAR_PREFERENCES
 )
 
 client = TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def isolated_finalize_store(monkeypatch, tmp_path):
+    """Keep finalize results of one test from being replayed in another."""
+    monkeypatch.setattr(finalize_store, "store", finalize_store.FinalizeStore(str(tmp_path / "finalize.db")))
+
+
 def test_root():
     """Test root endpoint returns API info."""
     response = client.get("/")
@@ -34,6 +50,14 @@ def test_health_check():
     assert data["status"] == "healthy"
 
 
+def test_ready_after_prewarm():
+    """Test readiness endpoint reports ready once solvers are warmed up."""
+    warmup.prewarm()
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+
+
 def test_recalculate_success():
     """Test /recalculate endpoint with valid data."""
     response = client.post("/recalculate", json=SAMPLE_RECALCULATE_REQUEST)
@@ -51,6 +75,7 @@ def test_recalculate_success():
     assert "Max Utility" in rulesets
     assert "Max Fairness" in rulesets
     assert "White Elephant" in rulesets
+    assert "Pareto Frontier" not in rulesets  # opt-in only
 
     # Check each ruleset has required fields
     for ruleset_name, stats in rulesets.items():
@@ -59,6 +84,331 @@ def test_recalculate_success():
         assert "std_dev" in stats
 
 
+def test_recalculate_response_matches_openapi_schema():
+    """Test the documented /recalculate schema is the model the FastJSONResponse body is serialized from."""
+    operation = client.get("/openapi.json").json()["paths"]["/recalculate"]["post"]
+    schema = operation["responses"]["200"]["content"]["application/json"]["schema"]
+    assert schema["$ref"].endswith("/RecalculateResponse")
+
+    response = client.post("/recalculate", json=SAMPLE_RECALCULATE_REQUEST)
+    assert response.headers["content-type"] == "application/json"
+    assert RecalculateResponse.model_validate(response.json()).group_id == "test_group_001"
+
+
+def test_recalculate_without_user_stats_then_page():
+    """Test group-level-only recalculation and paging per-user stats from the cache."""
+    request = {**SAMPLE_RECALCULATE_REQUEST, "group_id": "test_group_paging", "include_user_stats": False}
+    response = client.post("/recalculate", json=request)
+    assert response.status_code == 200
+    assert all(stats["user_stats"] == {} for stats in response.json()["rulesets"].values())
+
+    page = client.get("/recalculate/user_stats/test_group_paging", params={"ruleset": "Max Utility", "offset": 2, "limit": 3})
+    assert page.status_code == 200
+    data = page.json()
+    assert data["total_users"] == 8
+    assert list(data["user_stats"]) == [pref["user_id"] for pref in SAMPLE_RECALCULATE_REQUEST["preferences"][2:5]]
+
+    missing = client.get("/recalculate/user_stats/unknown_group", params={"ruleset": "Max Utility"})
+    assert missing.status_code == 404
+    assert missing.json()["detail"]["error"] == "ResultNotFound"
+
+
+def test_recalculate_response_is_gzipped():
+    """Test large JSON responses are compressed while NDJSON streams are not."""
+    response = client.post("/recalculate", json=SAMPLE_RECALCULATE_REQUEST, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json()["group_id"] == "test_group_001"
+
+    stream = client.post("/recalculate/stream", json=SAMPLE_RECALCULATE_REQUEST, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in stream.headers
+
+
+def test_recalculate_selected_rulesets():
+    """Test /recalculate only computes the requested rulesets with their options."""
+    request = {
+        **SAMPLE_RECALCULATE_REQUEST,
+        "rulesets": ["Max Fairness", "White Elephant"],
+        "ruleset_options": {
+            "Max Fairness": {"fairness_objective": "variance"},
+            "White Elephant": {"num_simulations": 50}
+        }
+    }
+    response = client.post("/recalculate", json=request)
+    assert response.status_code == 200
+    rulesets = response.json()["rulesets"]
+
+    assert set(rulesets) == {"Max Fairness", "White Elephant"}
+    assert rulesets["White Elephant"]["simulations_run"] == 50
+
+
+def test_recalculate_invalid_ruleset():
+    """Test /recalculate fails with an unknown ruleset name."""
+    request = {**SAMPLE_RECALCULATE_REQUEST, "rulesets": ["Invalid Ruleset"]}
+    response = client.post("/recalculate", json=request)
+    assert response.status_code == 400
+
+
+def test_recalculate_stream_ndjson():
+    """Test /recalculate/stream emits progress, one event per ruleset, then done."""
+    request = {
+        **SAMPLE_RECALCULATE_REQUEST,
+        "group_id": "test_group_stream",
+        "ruleset_options": {"White Elephant": {"num_simulations": 100}}
+    }
+    response = client.post("/recalculate/stream", json=request)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    events = [json.loads(line) for line in response.text.splitlines()]
+    finished = [event["ruleset"] for event in events if event["event"] == "ruleset"]
+    assert finished == ["Random Matching", "Max Utility", "Max Fairness", "White Elephant"]
+    assert any(event["event"] == "progress" for event in events)
+    assert events[-1]["event"] == "done"
+
+
+def test_recalculate_stream_without_user_stats():
+    """Test include_user_stats=false also strips per-user statistics from progress events."""
+    request = {
+        **SAMPLE_RECALCULATE_REQUEST,
+        "group_id": "test_group_stream_scores",
+        "rulesets": ["White Elephant"],
+        "ruleset_options": {"White Elephant": {"num_simulations": 100}},
+        "include_user_stats": False
+    }
+    events = [json.loads(line) for line in client.post("/recalculate/stream", json=request).text.splitlines()]
+    progress = [event for event in events if event["event"] == "progress"]
+    assert progress
+    assert all(event["stats"]["user_stats"] == {} for event in progress + [events[-2]])
+
+
+def test_recalculate_stream_sse():
+    """Test /recalculate/stream switches to server-sent events on request."""
+    request = {**SAMPLE_RECALCULATE_REQUEST, "rulesets": ["Max Utility"]}
+    response = client.post("/recalculate/stream", json=request, headers={"Accept": "text/event-stream"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert "event: ruleset\n" in response.text
+
+
+def test_recalculate_batch():
+    """Test /recalculate/batch returns one line per group, reporting invalid groups."""
+    request = {
+        "requests": [
+            {**SAMPLE_RECALCULATE_REQUEST, "group_id": "batch_a", "rulesets": ["Max Utility"]},
+            {**SAMPLE_RECALCULATE_REQUEST, "group_id": "batch_b", "rulesets": ["Invalid Ruleset"]},
+            {**SAMPLE_RECALCULATE_REQUEST, "group_id": "batch_c", "rulesets": ["Random Matching"]}
+        ]
+    }
+    response = client.post("/recalculate/batch", json=request)
+    assert response.status_code == 200
+
+    events = [json.loads(line) for line in response.text.splitlines()]
+    by_index = {event["index"]: event for event in events if "index" in event}
+    assert by_index[0]["event"] == "result"
+    assert set(by_index[0]["rulesets"]) == {"Max Utility"}
+    assert by_index[1]["event"] == "error"
+    assert by_index[2]["group_id"] == "batch_c"
+    assert events[-1] == {"event": "done", "count": 3}
+
+
+def test_recalculate_batch_fills_result_cache():
+    """Test batch results are cached for user_stats paging and finalization."""
+    request = {"requests": [{**SAMPLE_RECALCULATE_REQUEST, "group_id": "batch_cached", "rulesets": ["Max Utility"]}]}
+    response = client.post("/recalculate/batch", json=request)
+    assert json.loads(response.text.splitlines()[0])["event"] == "result"
+
+    page = client.get("/recalculate/user_stats/batch_cached", params={"ruleset": "Max Utility"})
+    assert page.status_code == 200
+
+    finalize = client.post("/finalize_group", json={
+        "group_id": "batch_cached",
+        "ruleset": "Max Utility",
+        "preferences": SAMPLE_RECALCULATE_REQUEST["preferences"]
+    })
+    assert finalize.status_code == 200
+    assert finalize.json()["metadata"]["from_cache"] is True
+
+
+def test_recalculate_job_completes():
+    """Test a background recalculation job can be polled to completion."""
+    request = {**SAMPLE_RECALCULATE_REQUEST, "group_id": "test_group_job", "rulesets": ["Max Utility", "Random Matching"]}
+    response = client.post("/recalculate/jobs", json=request)
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    deadline = time.time() + 10
+    while True:
+        data = client.get(f"/recalculate/jobs/{job_id}").json()
+        if data["status"] in ("completed", "failed") or time.time() > deadline:
+            break
+        time.sleep(0.05)
+
+    assert data["status"] == "completed"
+    assert data["progress"] == 1.0
+    assert set(data["rulesets"]) == {"Max Utility", "Random Matching"}
+
+
+def test_recalculate_job_not_found():
+    """Test polling an unknown job returns 404."""
+    response = client.get("/recalculate/jobs/does-not-exist")
+    assert response.status_code == 404
+
+
+def test_recalculate_columnar_preferences():
+    """Test /recalculate accepts the columnar format and shares cached results with the object format."""
+    request = {"group_id": "test_group_columnar", "rulesets": ["Max Utility"]}
+    objects = client.post("/recalculate", json={**request, "preferences": SAMPLE_RECALCULATE_REQUEST["preferences"]})
+    columnar = client.post("/recalculate", json={**request, "columnar_preferences": SAMPLE_COLUMNAR_PREFERENCES})
+    assert columnar.status_code == 200
+    assert columnar.json() == objects.json()
+
+    finalize = client.post("/finalize_group", json={
+        **request, "ruleset": "Max Utility", "columnar_preferences": SAMPLE_COLUMNAR_PREFERENCES
+    })
+    assert finalize.status_code == 200
+    assert finalize.json()["metadata"]["from_cache"] is True
+
+
+def test_recalculate_columnar_preferences_invalid():
+    """Test malformed columnar payloads and ambiguous requests are rejected."""
+    short = {**SAMPLE_COLUMNAR_PREFERENCES, "we_enjoy_stealing": [3]}
+    out_of_range = {**SAMPLE_COLUMNAR_PREFERENCES, "exclusion_sources": [0], "exclusion_targets": [99]}
+    for columnar in (short, out_of_range):
+        response = client.post("/recalculate", json={"group_id": "g", "columnar_preferences": columnar})
+        assert response.status_code == 422
+
+    both = {**SAMPLE_RECALCULATE_REQUEST, "columnar_preferences": SAMPLE_COLUMNAR_PREFERENCES}
+    assert client.post("/recalculate", json=both).status_code == 422
+    assert client.post("/recalculate", json={"group_id": "g"}).status_code == 422
+
+
+def test_recalculate_reports_all_group_problems():
+    """Test every integrity problem is reported together in one 400 response."""
+    preferences = [dict(pref) for pref in SAMPLE_RECALCULATE_REQUEST["preferences"]]
+    preferences[1]["user_id"] = preferences[0]["user_id"]
+    preferences[2]["exclusions"] = ["nobody", preferences[2]["user_id"]]
+    preferences[3]["exclusions"] = [preferences[4]["user_id"]]
+
+    response = client.post("/recalculate", json={
+        "group_id": "test_group_invalid", "preferences": preferences, "exclusion_mode": "strict"
+    })
+    assert response.status_code == 400
+    detail = response.json()["detail"]
+    assert detail["error"] == "InvalidGroup"
+    assert detail["details"]["problem_counts"] == {
+        "duplicate_user_id": 1, "unknown_exclusion": 1, "self_exclusion": 1, "asymmetric_exclusion": 1
+    }
+    assert {"type": "unknown_exclusion", "user_id": preferences[2]["user_id"], "excluded_id": "nobody"} in detail["details"]["problems"]
+
+
+def test_stored_group_preferences(tmp_path, monkeypatch):
+    """Test storing a group, patching one member and computing from the stored version."""
+    monkeypatch.setattr(group_store, "store", group_store.GroupStore(str(tmp_path / "groups.db")))
+    preferences = SAMPLE_RECALCULATE_REQUEST["preferences"]
+    url = "/groups/test_group_stored/preferences"
+
+    put = client.put(url, json={"preferences": preferences})
+    assert put.status_code == 200
+    assert put.json()["version"] == 1
+
+    changed = {**preferences[0], "exclusions": []}
+    patch = client.patch(url, json={"upsert": [changed], "remove": [preferences[-1]["user_id"]], "expected_version": 1})
+    assert patch.status_code == 200
+    assert patch.json()["version"] == 2
+    assert patch.json()["num_users"] == len(preferences) - 1
+
+    stale = client.patch(url, json={"remove": [preferences[1]["user_id"]], "expected_version": 1})
+    assert stale.status_code == 409
+    assert stale.json()["detail"]["details"]["current_version"] == 2
+
+    stored = client.post("/recalculate", json={"group_id": "test_group_stored", "preferences_version": 2})
+    inline = client.post("/recalculate", json={
+        "group_id": "test_group_stored", "preferences": [changed] + list(preferences[1:-1])
+    })
+    assert stored.status_code == 200
+    assert stored.json() == inline.json()
+
+    assert client.post("/recalculate", json={"group_id": "test_group_stored", "preferences_version": 1}).status_code == 409
+    assert client.post("/recalculate", json={"group_id": "missing", "preferences_version": 1}).status_code == 404
+    assert client.patch("/groups/missing/preferences", json={"remove": ["x"]}).status_code == 404
+
+
+def test_server_timing_and_metrics():
+    """Test /recalculate reports its time breakdown and /metrics exposes the recorded series."""
+    response = client.post("/recalculate", json={**SAMPLE_RECALCULATE_REQUEST, "group_id": "test_group_timing"})
+    timing = response.headers["server-timing"]
+    for name in ("validate;", "utility;", "ruleset_max_utility;", "serialize;", "total;"):
+        assert name in timing
+    assert 'desc="Max Utility"' in timing
+
+    metrics = client.get("/metrics")
+    assert metrics.status_code == 200
+    assert metrics.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = metrics.text
+    assert '# TYPE presents_ruleset_compute_seconds histogram' in body
+    assert 'presents_ruleset_compute_seconds_bucket{ruleset="Max Utility",le="+Inf"}' in body
+    assert 'presents_group_size_users_bucket{operation="recalculate",le="8"}' in body
+    assert "presents_result_cache_hits_total" in body
+
+
+def test_profiled_request(monkeypatch):
+    """Test ?profile=1 profiles a request for token holders and the profile can be downloaded."""
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    profiled_app = FastAPI()
+    profiled_app.add_middleware(profiling.ProfilingMiddleware)
+    profiled_app.include_router(recalculate.router)
+    profiled_app.include_router(profiles.router)
+    profiled_client = TestClient(profiled_app)
+    body = {**SAMPLE_RECALCULATE_REQUEST, "group_id": "test_group_profiled"}
+
+    denied = profiled_client.post("/recalculate?profile=1", json=body)
+    assert denied.status_code == 200
+    assert denied.headers["x-profile-status"] == "unauthorized"
+
+    response = profiled_client.post("/recalculate?profile=1", json=body, headers={"X-Profile-Token": "secret"})
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+
+    assert profiled_client.get(f"/profiles/{profile_id}").status_code == 403
+    summary = profiled_client.get(f"/profiles/{profile_id}", headers={"X-Profile-Token": "secret"}).json()
+    assert summary["path"] == "/recalculate"
+    assert summary["status_code"] == 200
+    assert any("services/matching_service.py" in entry["function"] for entry in summary["hot_spots"])
+    assert all(entry["highlight"] for entry in summary["hot_spots"])
+
+    raw = profiled_client.get(f"/profiles/{profile_id}?format=pstats", headers={"X-Profile-Token": "secret"})
+    assert isinstance(marshal.loads(raw.content), dict)
+
+
+def test_watchdog_logs_stalls_and_slow_requests(monkeypatch, caplog):
+    """Test a blocking request is reported with the loop's stack, and logged as slow with its stages."""
+    monkeypatch.setattr(watchdog, "BLOCKED_THRESHOLD", 0.05)
+    monkeypatch.setattr(watchdog, "SLOW_REQUEST_THRESHOLD", 0.0)
+    caplog.set_level("WARNING", logger="presents.watchdog")
+
+    with TestClient(app) as lifespan_client:
+        # A first request pays for lazy imports, which would otherwise be the stall reported
+        for group_id in ("test_group_watchdog_warmup", "test_group_watchdog"):
+            time.sleep(0.2)
+            lifespan_client.post("/recalculate", json={
+                **SAMPLE_RECALCULATE_REQUEST,
+                "group_id": group_id,
+                "rulesets": ["White Elephant"],
+                # Long enough to stall well past the heartbeat interval plus threshold
+                "ruleset_options": {"White Elephant": {"num_simulations": 5000}}
+            })
+
+    events = [json.loads(record.getMessage()) for record in caplog.records]
+    slow = next(event for event in events if event["event"] == "slow_request" and event["path"] == "/recalculate")
+    assert slow["group_size"] == len(SAMPLE_RECALCULATE_REQUEST["preferences"])
+    assert "ruleset_white_elephant" in slow["timings_ms"]
+
+    blocked = [event for event in events if event["event"] == "event_loop_blocked"]
+    assert blocked
+    assert any("white_elephant_simulation.py" in line for event in blocked for line in event["stack"])
+
+
 def test_recalculate_too_few_users():
     """Test /recalculate fails with only 1 user."""
     invalid_request = {
@@ -83,6 +433,74 @@ def test_finalize_random_matching():
     assert len(data["pairings"]) == 8  # 8 users
 
 
+def test_finalize_seed_is_reproducible_under_concurrency():
+    """Test concurrent finalizations with the same seed return identical results."""
+    def finalize(_):
+        return client.post("/finalize_group", json=SAMPLE_FINALIZE_RANDOM).json()["pairings"]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(finalize, range(8)))
+
+    assert all(result == results[0] for result in results)
+
+
+def test_finalize_is_idempotent():
+    """Test repeated finalizations replay the stored result, and keys cannot be reused for other requests."""
+    request = {key: value for key, value in SAMPLE_FINALIZE_RANDOM.items() if key != "seed"}
+    first = client.post("/finalize_group", json=request).json()
+    second = client.post("/finalize_group", json=request).json()
+    assert second["pairings"] == first["pairings"]
+    assert (first["metadata"]["replayed"], second["metadata"]["replayed"]) == (False, True)
+
+    headers = {"Idempotency-Key": "finalize-once"}
+    assert client.post("/finalize_group", json=request, headers=headers).json()["metadata"]["replayed"] is False
+    conflict = client.post("/finalize_group", json={**request, "seed": 7}, headers=headers)
+    assert conflict.status_code == 409
+    assert conflict.json()["detail"]["error"] == "IdempotencyKeyConflict"
+
+
+def test_concurrent_finalizations_share_one_computation(monkeypatch):
+    """Test identical finalizations in flight at the same time are computed once."""
+    calls = []
+    finalize_matching = matching_service.finalize_matching
+
+    def slow_finalize(**kwargs):
+        calls.append(kwargs["group_id"])
+        time.sleep(0.3)
+        return finalize_matching(**kwargs)
+
+    monkeypatch.setattr(matching_service, "finalize_matching", slow_finalize)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        responses = list(pool.map(lambda _: client.post("/finalize_group", json=SAMPLE_FINALIZE_MAX_UTILITY).json(), range(4)))
+
+    assert len(calls) == 1
+    assert all(response["pairings"] == responses[0]["pairings"] for response in responses)
+    assert sorted(response["metadata"]["replayed"] for response in responses) == [False, True, True, True]
+
+
+def test_concurrent_finalizations_with_one_key_for_different_requests_conflict(monkeypatch):
+    """Test a key already in flight for another request is rejected rather than merged."""
+    finalize_matching = matching_service.finalize_matching
+
+    def slow_finalize(**kwargs):
+        time.sleep(0.3)
+        return finalize_matching(**kwargs)
+
+    monkeypatch.setattr(matching_service, "finalize_matching", slow_finalize)
+    headers = {"Idempotency-Key": "shared-key"}
+    requests = [{**SAMPLE_FINALIZE_MAX_UTILITY, "group_id": group_id} for group_id in ("group_a", "group_b")]
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(client.post, "/finalize_group", json=requests[0], headers=headers)
+        time.sleep(0.1)
+        second = pool.submit(client.post, "/finalize_group", json=requests[1], headers=headers)
+        first, second = first.result(), second.result()
+
+    assert first.status_code == 200
+    assert first.json()["group_id"] == "group_a"
+    assert second.status_code == 409
+    assert second.json()["detail"]["error"] == "IdempotencyKeyConflict"
+
+
 def test_finalize_max_utility():
     """Test /finalize_group with Max Utility ruleset."""
     response = client.post("/finalize_group", json=SAMPLE_FINALIZE_MAX_UTILITY)
@@ -115,6 +533,63 @@ def test_finalize_white_elephant():
     assert len(data["play_order"]) == 8  # 8 users
 
 
+def test_finalize_reuses_recalculated_matching():
+    """Test /finalize_group returns the matching computed by /recalculate."""
+    request = {**SAMPLE_RECALCULATE_REQUEST, "group_id": "test_group_cache", "rulesets": ["Max Fairness"]}
+    assert client.post("/recalculate", json=request).status_code == 200
+
+    finalize_request = {**SAMPLE_FINALIZE_MAX_FAIRNESS, "group_id": "test_group_cache"}
+    response = client.post("/finalize_group", json=finalize_request)
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["group_id"] == "test_group_cache"
+    assert data["metadata"]["from_cache"] is True
+
+
+def test_pareto_frontier_options_can_be_finalized():
+    """Test /recalculate lists the frontier options and /finalize_group returns a chosen one."""
+    request = {**SAMPLE_RECALCULATE_REQUEST, "group_id": "test_group_pareto", "rulesets": ["Pareto Frontier"]}
+    response = client.post("/recalculate", json=request)
+    assert response.status_code == 200
+    options = response.json()["rulesets"]["Pareto Frontier"]["pareto_options"]
+
+    assert [option["option"] for option in options] == list(range(len(options)))
+    assert options[0]["fairness_weight"] == 0.0
+    for better_utility, fairer in zip(options, options[1:]):
+        assert better_utility["group_satisfaction_score"] > fairer["group_satisfaction_score"]
+        assert better_utility["min_utility"] < fairer["min_utility"]
+
+    finalize_request = {
+        **SAMPLE_FINALIZE_MAX_FAIRNESS,
+        "group_id": "test_group_pareto",
+        "ruleset": "Pareto Frontier",
+        "options": {"pareto_option": len(options) - 1}
+    }
+    response = client.post("/finalize_group", json=finalize_request)
+    assert response.status_code == 200
+    assert len(response.json()["pairings"]) == len(SAMPLE_FINALIZE_MAX_FAIRNESS["preferences"])
+
+    finalize_request["options"] = {"pareto_option": len(options)}
+    assert client.post("/finalize_group", json=finalize_request).status_code == 400
+
+
+def test_recalculate_rejects_unknown_pareto_option():
+    """Test an out-of-range pareto_option is a 400 on /recalculate, not placeholder stats."""
+    request = {
+        **SAMPLE_RECALCULATE_REQUEST,
+        "group_id": "test_group_pareto_option",
+        "rulesets": ["Pareto Frontier"],
+        "ruleset_options": {"Pareto Frontier": {"pareto_option": 50}}
+    }
+    response = client.post("/recalculate", json=request)
+    assert response.status_code == 400
+    assert "pareto_option" in response.json()["detail"]["message"]
+
+    batch = client.post("/recalculate/batch", json={"requests": [request]})
+    assert json.loads(batch.text.splitlines()[0])["event"] == "error"
+
+
 def test_finalize_invalid_ruleset():
     """Test /finalize_group fails with invalid ruleset."""
     invalid_request = SAMPLE_FINALIZE_RANDOM.copy()
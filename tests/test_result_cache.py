@@ -0,0 +1,47 @@
+"""
+Result cache and job store tests.
+"""
+import time
+import pytest
+from services.result_cache import TTLCache
+from services.recalculate_jobs import JobStore, JobStoreFullError, RecalculateJob
+
+
+def test_cache_evicts_least_recently_used():
+    """Test the oldest untouched entry is evicted when the cache is full."""
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_cache_entries_expire():
+    """Test entries are dropped once their TTL has passed."""
+    cache = TTLCache(max_entries=2, ttl_seconds=0.01)
+    cache.put("a", 1)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_job_store_keeps_unfinished_jobs():
+    """Test a full job store evicts finished jobs only, then rejects new jobs."""
+    store = JobStore(max_jobs=2, ttl_seconds=60)
+    running = RecalculateJob(job_id="running", group_id="g", rulesets=["Max Utility"])
+    finished = RecalculateJob(job_id="finished", group_id="g", rulesets=["Max Utility"])
+    store.add(running)
+    store.add(finished)
+    store.finish(finished)
+
+    store.add(RecalculateJob(job_id="queued", group_id="g", rulesets=["Max Utility"]))
+    assert store.get("finished") is None
+    assert store.get("running") is running
+
+    with pytest.raises(JobStoreFullError):
+        store.add(RecalculateJob(job_id="rejected", group_id="g", rulesets=["Max Utility"]))
@@ -0,0 +1,112 @@
+"""
+Solver quality tests.
+
+Checks the exact solvers against the brute-force oracle (tests/oracle.py) on
+synthetic groups of up to MAX_ORACLE_USERS people. Approximate quantities
+are not asserted here; scripts/solver_quality_report.py reports their gap
+to the oracle together with their runtime.
+"""
+from collections import Counter
+import numpy as np
+import pytest
+from algorithms import random_matching, max_utility_matching, max_fairness_matching, pareto_frontier
+from tests.oracle import (
+    MAX_ORACLE_USERS, exact_optima, exact_random_expectations, matching_utilities, random_context, valid_matchings
+)
+
+CASES = [(n, seed) for n in range(3, MAX_ORACLE_USERS + 1) for seed in range(3)]
+
+
+def _stats_total(stats, n):
+    return stats.group_satisfaction_score * n
+
+
+@pytest.mark.parametrize("n,seed", CASES)
+def test_max_utility_is_optimal(n, seed):
+    """Test Max Utility reaches the oracle's highest total utility."""
+    context = random_context(n, seed)
+    stats = max_utility_matching.calculate_statistics(context)
+    assert _stats_total(stats, n) == pytest.approx(exact_optima(context)["max_total"])
+
+
+@pytest.mark.parametrize("n,seed", CASES)
+def test_top_k_max_utility_is_bounded(n, seed):
+    """Test the top-k approximation stays valid and its reported bound covers the exact optimum."""
+    context = random_context(n, seed)
+    max_total = exact_optima(context)["max_total"]
+    for top_k in (1, 2, n):
+        matching, stats = max_utility_matching.solve(context, mode="top_k", top_k=top_k)
+        assert all(context.allowed[context.index[giver], context.index[receiver]] for giver, receiver in matching.items())
+        total = _stats_total(stats, n)
+        assert total <= max_total + 1e-9
+        assert stats.utility_upper_bound * n >= max_total - 1e-9
+        assert stats.optimality_gap == pytest.approx((stats.utility_upper_bound * n - total) / (stats.utility_upper_bound * n))
+        if stats.candidates_per_user >= n - 1:
+            assert total == pytest.approx(max_total)
+
+
+@pytest.mark.parametrize("n,seed", CASES)
+def test_max_fairness_minimax_is_optimal(n, seed):
+    """Test minimax reaches the oracle's highest floor, then the highest total at that floor."""
+    context = random_context(n, seed)
+    optima = exact_optima(context)
+    stats = max_fairness_matching.calculate_statistics(context, objective="minimax")
+    assert stats.min_utility == optima["max_min"]
+    assert _stats_total(stats, n) == pytest.approx(optima["max_total_at_max_min"])
+
+
+@pytest.mark.parametrize("n,seed", CASES)
+def test_max_fairness_variance_is_optimal(n, seed):
+    """Test the variance objective keeps the floor and minimizes squared deviation."""
+    context = random_context(n, seed)
+    optima = exact_optima(context)
+    stats = max_fairness_matching.calculate_statistics(context, objective="variance")
+    utilities = np.array([user.expected_utility for user in stats.user_stats.values()])
+    target = optima["max_total_at_max_min"] / n
+
+    assert stats.min_utility >= optima["max_min"]
+    assert ((utilities - target) ** 2).sum() == pytest.approx(optima["min_squared_deviation"])
+
+
+@pytest.mark.parametrize("n,seed", CASES)
+def test_pareto_frontier_options_are_pareto_optimal(n, seed):
+    """Test the frontier runs from Max Utility to minimax and each option has the best total for its minimum."""
+    context = random_context(n, seed)
+    optima = exact_optima(context)
+    utilities = matching_utilities(context, valid_matchings(context))
+    totals, minimums = utilities.sum(axis=1), utilities.min(axis=1)
+
+    options, _ = pareto_frontier.frontier(context, points=50)
+    assert options[0].group_satisfaction_score * n == pytest.approx(optima["max_total"])
+    assert options[-1].min_utility == optima["max_min"]
+    assert options[-1].group_satisfaction_score * n == pytest.approx(optima["max_total_at_max_min"])
+    for option in options:
+        best_total = totals[minimums >= option.min_utility].max()
+        assert option.group_satisfaction_score * n == pytest.approx(best_total)
+
+
+@pytest.mark.parametrize("n", range(3, MAX_ORACLE_USERS + 1))
+def test_random_matching_expectations_exact_without_exclusions(n):
+    """Test Random Matching's expected utilities are exact when only self-gifts are blocked."""
+    context = random_context(n, seed=n, exclusions=False)
+    stats = random_matching.calculate_statistics(context)
+    expected = [user.expected_utility for user in stats.user_stats.values()]
+    assert expected == pytest.approx(exact_random_expectations(context).tolist())
+
+
+def test_random_matching_draws_every_valid_matching_uniformly():
+    """Test generated random matchings are valid and uniform over the oracle's valid matchings."""
+    context = random_context(5, seed=1)
+    valid = {tuple(matching) for matching in valid_matchings(context).tolist()}
+    draws = 200 * len(valid)
+
+    counts = Counter()
+    for seed in range(draws):
+        matching = random_matching.generate_matching(context.for_ruleset(f"draw-{seed}"))
+        counts[tuple(context.index[matching[user_id]] for user_id in context.user_ids)] += 1
+
+    assert set(counts) == valid
+    # Chi-square goodness of fit against the uniform distribution (very loose bound)
+    expected = draws / len(valid)
+    chi_square = sum((count - expected) ** 2 / expected for count in counts.values())
+    assert chi_square < 3 * len(valid)
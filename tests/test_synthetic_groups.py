@@ -0,0 +1,29 @@
+"""
+Synthetic group generator tests.
+"""
+import numpy as np
+from models.preferences import UserPreference, ColumnarPreferences
+from utils.preference_arrays import from_columnar, from_preferences
+from utils.group_validation import check_group
+from tests.synthetic_groups import generate_group, to_user_preferences
+
+
+def test_generated_groups_are_valid_and_reproducible():
+    """Test generated groups pass validation, repeat for a seed and convert to both formats."""
+    for n, offices in ((2, 0), (8, 0), (300, 0), (300, 6)):
+        group = generate_group(n, seed=7, offices=offices)
+        assert generate_group(n, seed=7, offices=offices) == group
+
+        columnar = check_group(from_columnar(ColumnarPreferences(**group)))
+        assert columnar.problem_counts == {}
+        objects = check_group(from_preferences([UserPreference(**pref) for pref in to_user_preferences(group)]))
+        assert objects.arrays.fingerprint() == columnar.arrays.fingerprint()
+
+
+def test_generated_preferences_are_correlated():
+    """Test giving and receiving scores of the same dimension are positively correlated."""
+    group = generate_group(2000, seed=1)
+    giving = np.array(group["preference_novelty_giving"])
+    receiving = np.array(group["preference_novelty_receiving"])
+    assert np.corrcoef(giving, receiving)[0, 1] > 0.3
+    assert len(set(group["interest_values"])) > 5
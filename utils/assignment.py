@@ -0,0 +1,150 @@
+"""
+Assignment helpers shared by the Secret Santa algorithms.
+
+A matching is represented as an integer array `receivers` where
+`receivers[g]` is the index of the person giver `g` gives to.
+"""
+from typing import Optional
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import maximum_bipartite_matching
+from utils.components import map_components, matching_components
+
+
+# Rows of the cost matrix filled per step; bounds the temporaries to a few MB
+ROW_BLOCK = 512
+
+
+def solve_assignment(
+    weights: np.ndarray,
+    allowed: np.ndarray,
+    maximize: bool = True,
+    floor: Optional[float] = None,
+    center: Optional[float] = None
+) -> np.ndarray:
+    """
+    Solve the assignment problem restricted to allowed giver/receiver pairs.
+
+    If the allowed pairs split the group into independent components (see
+    utils.components), each component is solved on its own, in parallel for
+    large groups, and the results merged; the optimum is the same.
+
+    The solver's cost matrix is the only n x n (per component) allocation:
+    it is filled in row blocks straight from `weights` (which may be a
+    float32 memmap), with the floor and center applied on the way, so
+    callers need no masked or transformed copies of the utility matrix.
+
+    Args:
+        weights: n x n matrix, weights[g, r] for giver g giving to receiver r
+        allowed: n x n boolean mask of permitted pairs
+        maximize: Maximize total weight if True, minimize otherwise
+        floor: If set, pairs with weights below it are not allowed either
+        center: If set, optimize the squared deviations (weights - center)^2
+            instead of the weights themselves
+
+    Returns:
+        Array `receivers` with receivers[g] = receiver index for giver g
+
+    Raises:
+        ValueError: If no perfect matching exists within the allowed pairs
+    """
+    components = matching_components(allowed)
+    if len(components) == 1:
+        return _solve_dense(_cost_matrix(weights, allowed, maximize, floor, center), maximize)
+
+    def solve_component(component: np.ndarray) -> np.ndarray:
+        cost = _cost_matrix(weights, allowed, maximize, floor, center, component)
+        return component[_solve_dense(cost, maximize)]
+
+    receivers = np.empty(allowed.shape[0], dtype=np.intp)
+    for component, component_receivers in zip(components, map_components(solve_component, components)):
+        receivers[component] = component_receivers
+    return receivers
+
+
+def _cost_matrix(
+    weights: np.ndarray,
+    allowed: np.ndarray,
+    maximize: bool,
+    floor: Optional[float],
+    center: Optional[float],
+    members: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Build the float64 cost matrix of one assignment problem, ROW_BLOCK rows at a time.
+
+    float64 because scipy's solver copies any other dtype to float64;
+    forbidden pairs get an infinite cost. `members` restricts the problem
+    to one component (None = the whole group).
+    """
+    forbidden = -np.inf if maximize else np.inf
+    n = allowed.shape[0] if members is None else len(members)
+    cost = np.empty((n, n))
+    for start in range(0, n, ROW_BLOCK):
+        rows = slice(start, min(start + ROW_BLOCK, n))
+        if members is None:
+            block = cost[rows]
+            block[...] = weights[rows]
+            blocked = ~allowed[rows]
+        else:
+            pairs = np.ix_(members[rows], members)
+            block = cost[rows]
+            block[...] = weights[pairs]
+            blocked = ~allowed[pairs]
+        if floor is not None:
+            blocked |= block < floor
+        if center is not None:
+            block -= center
+            np.square(block, out=block)
+        block[blocked] = forbidden
+    return cost
+
+
+def _solve_dense(cost: np.ndarray, maximize: bool) -> np.ndarray:
+    """Solve one assignment problem with scipy's dense solver."""
+    try:
+        rows, cols = linear_sum_assignment(cost, maximize=maximize)
+    except ValueError:
+        raise ValueError("No valid matching exists that satisfies all exclusions")
+
+    receivers = np.empty(len(rows), dtype=np.intp)
+    receivers[rows] = cols
+    return receivers
+
+
+def has_perfect_matching(allowed: np.ndarray) -> bool:
+    """Check whether every giver can be matched to a distinct receiver within `allowed`."""
+    matched = maximum_bipartite_matching(csr_matrix(allowed), perm_type="column")
+    return bool(np.all(matched >= 0))
+
+
+def bottleneck_threshold(utility: np.ndarray, allowed: np.ndarray) -> float:
+    """
+    Find the largest utility floor that still admits a perfect matching.
+
+    Binary search over the distinct allowed utility values, checking each
+    candidate floor with a bipartite matching feasibility test.
+
+    Raises:
+        ValueError: If no perfect matching exists within the allowed pairs
+    """
+    if not has_perfect_matching(allowed):
+        raise ValueError("No valid matching exists that satisfies all exclusions")
+
+    values = np.unique(utility[allowed])
+    lo, hi = 0, len(values) - 1
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if has_perfect_matching(allowed & (utility >= values[mid])):
+            lo = mid
+        else:
+            hi = mid - 1
+    return float(values[lo])
+
+
+def givers_for_receivers(receivers: np.ndarray) -> np.ndarray:
+    """Invert a matching: return `givers` with givers[r] = giver index for receiver r."""
+    givers = np.empty_like(receivers)
+    givers[receivers] = np.arange(len(receivers))
+    return givers
@@ -0,0 +1,88 @@
+"""
+Independent components of a group's allowed-pair graph.
+
+A matching is a set of gift cycles, and every cycle stays inside one strongly
+connected component of the directed graph giver -> receiver over allowed
+pairs. Pairs between components can never be used, so each component can
+be matched on its own and the results merged: an O(n^3) assignment becomes
+a sum of much smaller cubes. Components come from explicit partitions (e.g.
+offices that match internally) or from exclusions that split the group.
+
+Components are solved on a small thread pool of their own (the solvers
+release the GIL inside SciPy); it is separate from services.worker_pool so
+a job already running on that pool never waits on itself.
+
+Controlled by environment variables:
+- PRESENTS_COMPONENT_WORKERS (default: CPU count): threads solving components
+  in parallel; 1 solves them one after another
+- PRESENTS_COMPONENT_PARALLEL_MIN_USERS (default 256): smallest group whose
+  components are solved in parallel (thread hand-off costs more below that)
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, TypeVar
+import os
+import threading
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+COMPONENT_WORKERS = int(os.environ.get("PRESENTS_COMPONENT_WORKERS", str(os.cpu_count() or 1)))
+PARALLEL_MIN_USERS = int(os.environ.get("PRESENTS_COMPONENT_PARALLEL_MIN_USERS", "256"))
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def matching_components(allowed: np.ndarray) -> List[np.ndarray]:
+    """
+    Split a group into the components a matching can never cross.
+
+    Args:
+        allowed: n x n boolean mask of permitted (giver, receiver) pairs
+
+    Returns:
+        Sorted index arrays, one per strongly connected component, largest
+        first; a single component covering everyone if the group does not split
+    """
+    n = allowed.shape[0]
+    out_degree, in_degree = allowed.sum(axis=1), allowed.sum(axis=0)
+    # With every in- and out-degree above n/2, any giver reaches any receiver
+    # through a shared neighbour, so the graph is one component (the common
+    # case, decided without building the sparse graph)
+    if 2 * min(out_degree.min(), in_degree.min()) > n:
+        return [np.arange(n)]
+
+    count, labels = connected_components(csr_matrix(allowed), directed=True, connection="strong")
+    if count == 1:
+        return [np.arange(n)]
+    order = np.argsort(labels, kind="stable")
+    sizes = np.bincount(labels, minlength=count)
+    components = np.split(order, np.cumsum(sizes)[:-1])
+    return sorted(components, key=len, reverse=True)
+
+
+def map_components(function: Callable[[np.ndarray], T], components: List[np.ndarray]) -> List[T]:
+    """
+    Apply `function` to every component, in parallel for large groups.
+
+    Args:
+        function: Called with one component's index array
+        components: Index arrays from matching_components
+
+    Returns:
+        Results in the order of `components`
+    """
+    total = sum(len(component) for component in components)
+    if len(components) == 1 or COMPONENT_WORKERS <= 1 or total < PARALLEL_MIN_USERS:
+        return [function(component) for component in components]
+    return list(_get_executor().map(function, components))
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=COMPONENT_WORKERS, thread_name_prefix="presents-component")
+        return _executor
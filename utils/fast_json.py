@@ -0,0 +1,48 @@
+"""
+Fast JSON encoding for API responses.
+
+Pydantic models are serialized by pydantic-core directly to JSON bytes.
+Plain dicts/lists (stream events, error details) use orjson when installed
+and fall back to the standard library json module otherwise.
+"""
+from typing import Any
+import json
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from utils import metrics
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt but optional
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize content to compact UTF-8 JSON bytes.
+
+    Args:
+        content: A pydantic model or JSON-compatible Python data
+
+    Returns:
+        bytes: The encoded JSON document
+    """
+    if isinstance(content, BaseModel):
+        return content.model_dump_json().encode()
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse that renders with dumps() above.
+
+    Returning one of these from an endpoint also skips FastAPI's
+    response_model re-validation, so hot endpoints build their response
+    model once and hand it over as-is.
+    """
+
+    def render(self, content: Any) -> bytes:
+        with metrics.timed("serialize", metrics.SERIALIZATION_SECONDS, "JSON encoding"):
+            return dumps(content)
@@ -0,0 +1,112 @@
+"""
+Per-request group context shared by all matching algorithms.
+
+The context is built once per request by the matching service so that every
+algorithm works from the same id/index mapping, utility matrix and
+exclusion mask instead of rebuilding them from the preference list.
+"""
+from dataclasses import dataclass, replace
+from functools import cached_property
+from typing import Dict, List, Optional, Union
+import zlib
+import numpy as np
+from models.preferences import UserPreference, ColumnarPreferences
+from utils.components import matching_components
+from utils.preference_arrays import PreferenceArrays, as_preference_arrays
+from utils.utility_storage import utility_matrix
+
+
+@dataclass
+class GroupContext:
+    """
+    Preprocessed view of a group's preferences.
+
+    All matrices are indexed [giver, receiver] using the positions in `user_ids`.
+    """
+    user_ids: List[str]
+    index: Dict[str, int]
+    utility: np.ndarray  # utility[g, r]: how happy receiver r is with a gift from giver g (read-only memmap for large groups)
+    allowed: np.ndarray  # allowed[g, r]: giver g may give to receiver r (no self, no exclusions)
+    hate_being_stolen_from: np.ndarray
+    enjoy_stealing: np.ndarray
+    rng: np.random.Generator
+    seed: Optional[int] = None
+    seed_sequence: Optional[np.random.SeedSequence] = None
+
+    @property
+    def size(self) -> int:
+        """Number of people in the group."""
+        return len(self.user_ids)
+
+    @cached_property
+    def components(self) -> List[np.ndarray]:
+        """Index arrays of the groups of people that can only match among themselves (see utils.components)."""
+        return matching_components(self.allowed)
+
+    def for_ruleset(self, name: str) -> "GroupContext":
+        """
+        Return a view of this context with its own random generator for one ruleset.
+
+        The generator is derived from the request's SeedSequence and the ruleset
+        name, so each ruleset's random stream is reproducible for a given seed and
+        independent of which other rulesets run, in what order or on which thread.
+        The matrices are shared, not copied.
+        """
+        base = self.seed_sequence or np.random.SeedSequence(self.seed)
+        sequence = np.random.SeedSequence(base.entropy, spawn_key=base.spawn_key + (zlib.crc32(name.encode()),))
+        view = replace(self, rng=np.random.default_rng(sequence), seed_sequence=sequence)
+        if "components" in self.__dict__:
+            view.__dict__["components"] = self.__dict__["components"]
+        return view
+
+    def matching_to_ids(self, receivers: np.ndarray) -> Dict[str, str]:
+        """Convert a receivers-by-giver index array into a giver_id -> receiver_id dict."""
+        return {self.user_ids[g]: self.user_ids[int(r)] for g, r in enumerate(receivers)}
+
+
+def build_group_context(
+    preferences: Union[List[UserPreference], ColumnarPreferences, PreferenceArrays],
+    seed: Optional[int] = None
+) -> GroupContext:
+    """
+    Build the shared context for a group.
+
+    Arrays normalized by utils.group_validation.check_group carry the exact
+    blocked (giver, receiver) pairs and are applied as-is. Otherwise
+    exclusions are treated as symmetric: if either person excludes the other,
+    neither may give to the other, and unknown user IDs are ignored. Users
+    with partitions may only give within their own partition.
+
+    Args:
+        preferences: User preferences in any supported format (list of
+            objects, columnar payload or already-converted PreferenceArrays)
+        seed: Optional seed for the per-request random generator (fresh entropy if None)
+
+    Returns:
+        GroupContext for the group
+    """
+    arrays = as_preference_arrays(preferences)
+    n = arrays.size
+
+    allowed = ~np.eye(n, dtype=bool)
+    known = arrays.exclusion_targets >= 0
+    sources, targets = arrays.exclusion_sources[known], arrays.exclusion_targets[known]
+    allowed[sources, targets] = False
+    if arrays.exclusion_mode is None:
+        allowed[targets, sources] = False
+    if arrays.partitions is not None:
+        _, codes = np.unique(np.asarray(arrays.partitions), return_inverse=True)
+        allowed &= codes[:, None] == codes[None, :]
+
+    seed_sequence = np.random.SeedSequence(seed)
+    return GroupContext(
+        user_ids=arrays.user_ids,
+        index=arrays.index,
+        utility=utility_matrix(arrays),
+        allowed=allowed,
+        hate_being_stolen_from=arrays.hate_being_stolen_from.astype(np.float64),
+        enjoy_stealing=arrays.enjoy_stealing.astype(np.float64),
+        rng=np.random.default_rng(seed_sequence),
+        seed=seed,
+        seed_sequence=seed_sequence
+    )
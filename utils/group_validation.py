@@ -0,0 +1,145 @@
+"""
+Bulk integrity checks for a group's preferences.
+
+Every check is a handful of vectorized NumPy operations over PreferenceArrays
+(sorting and set membership on ids and exclusion edges), so validating a
+group costs O(n log n + m log m) instead of a Python loop per user or pair.
+"""
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List
+import numpy as np
+from utils.preference_arrays import PreferenceArrays
+
+# How exclusions are interpreted:
+# - symmetric: an exclusion in either direction blocks both (the default)
+# - directed: an exclusion only stops the excluder from giving to the excluded
+# - strict: like symmetric, but one-sided exclusions are reported as problems
+EXCLUSION_MODES = ("symmetric", "directed", "strict")
+
+# Problems listed individually per type; the counts always cover all of them
+MAX_REPORTED_PROBLEMS = 100
+
+
+@dataclass
+class GroupCheck:
+    """
+    Result of check_group.
+
+    Attributes:
+        arrays: The group with exclusions normalized into a deduplicated list
+            of blocked (giver, receiver) pairs; only meaningful if `problems`
+            is empty
+        problems: Up to MAX_REPORTED_PROBLEMS problems of each type
+        problem_counts: Total number of problems per type
+    """
+    arrays: PreferenceArrays
+    problems: List[Dict[str, Any]]
+    problem_counts: Dict[str, int]
+
+
+def check_group(arrays: PreferenceArrays, exclusion_mode: str = "symmetric") -> GroupCheck:
+    """
+    Check a group's integrity and normalize its exclusions in one pass.
+
+    Detects duplicate user IDs, exclusions of unknown IDs, self-exclusions,
+    partitions of a single person (who could give to no one) and (in
+    "strict" mode) one-sided exclusions.
+
+    Args:
+        arrays: The group's preferences, as submitted (exclusion_mode None)
+        exclusion_mode: One of EXCLUSION_MODES
+
+    Returns:
+        GroupCheck with the normalized arrays and every problem found
+
+    Raises:
+        ValueError: If the exclusion mode is unknown
+    """
+    if exclusion_mode not in EXCLUSION_MODES:
+        raise ValueError(f"Unknown exclusion mode: {exclusion_mode}. Must be one of: {', '.join(EXCLUSION_MODES)}")
+
+    n = arrays.size
+    user_ids = np.asarray(arrays.user_ids)
+    problems: List[Dict[str, Any]] = []
+    problem_counts: Dict[str, int] = {}
+
+    def report(problem_type: str, count: int, rows: List[Dict[str, Any]]) -> None:
+        if count:
+            problem_counts[problem_type] = count
+            problems.extend({"type": problem_type, **row} for row in rows)
+
+    unique_ids, counts = np.unique(user_ids, return_counts=True)
+    duplicated = np.flatnonzero(counts > 1)
+    shown = duplicated[:MAX_REPORTED_PROBLEMS]
+    report("duplicate_user_id", len(duplicated), [
+        {"user_id": user_id, "count": count}
+        for user_id, count in zip(unique_ids[shown].tolist(), counts[shown].tolist())
+    ])
+
+    sources, targets = arrays.exclusion_sources, arrays.exclusion_targets
+    unknown = targets < 0
+    unknown_sources = sources[unknown]
+    report("unknown_exclusion", len(unknown_sources), [
+        {"user_id": user_id, "excluded_id": excluded_id}
+        for user_id, excluded_id in zip(
+            user_ids[unknown_sources[:MAX_REPORTED_PROBLEMS]].tolist(),
+            arrays.unknown_exclusions[:MAX_REPORTED_PROBLEMS]
+        )
+    ])
+
+    self_excluded = sources == targets
+    self_excluders = _sorted_unique(sources[self_excluded])
+    report("self_exclusion", len(self_excluders), [
+        {"user_id": user_id} for user_id in user_ids[self_excluders[:MAX_REPORTED_PROBLEMS]].tolist()
+    ])
+
+    if arrays.partitions is not None:
+        labels, codes, sizes = np.unique(np.asarray(arrays.partitions), return_inverse=True, return_counts=True)
+        alone = np.flatnonzero(sizes[codes] == 1)
+        shown = alone[:MAX_REPORTED_PROBLEMS]
+        report("singleton_partition", len(alone), [
+            {"user_id": user_id, "partition": partition}
+            for user_id, partition in zip(user_ids[shown].tolist(), labels[codes[shown]].tolist())
+        ])
+
+    # Encode each exclusion (a excludes b) as a * n + b for sorting and set lookups
+    valid = ~unknown & ~self_excluded
+    edges = _sorted_unique(sources[valid] * n + targets[valid])
+    reverse = (edges % n) * n + edges // n
+    if exclusion_mode == "strict":
+        one_sided = edges[~_contains(edges, reverse)]
+        shown = one_sided[:MAX_REPORTED_PROBLEMS]
+        report("asymmetric_exclusion", len(one_sided), [
+            {"user_id": user_id, "excluded_id": excluded_id}
+            for user_id, excluded_id in zip(user_ids[shown // n].tolist(), user_ids[shown % n].tolist())
+        ])
+
+    if exclusion_mode != "directed":
+        edges = _sorted_unique(np.concatenate([edges, reverse]))
+
+    normalized = replace(
+        arrays,
+        exclusion_sources=edges // n,
+        exclusion_targets=edges % n,
+        unknown_exclusions=[],
+        exclusion_mode=exclusion_mode
+    )
+    if "index" in arrays.__dict__:
+        normalized.__dict__["index"] = arrays.__dict__["index"]
+    return GroupCheck(arrays=normalized, problems=problems, problem_counts=problem_counts)
+
+
+def _sorted_unique(values: np.ndarray) -> np.ndarray:
+    """Sorted distinct values (sort + adjacent compare; faster than np.unique's hash path for int64)."""
+    values = np.sort(values)
+    if len(values) == 0:
+        return values
+    return values[np.concatenate(([True], values[1:] != values[:-1]))]
+
+
+def _contains(sorted_values: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    """Membership of each query in a sorted array, via binary search."""
+    if len(sorted_values) == 0:
+        return np.zeros(len(queries), dtype=bool)
+    positions = np.minimum(np.searchsorted(sorted_values, queries), len(sorted_values) - 1)
+    return sorted_values[positions] == queries
@@ -0,0 +1,66 @@
+"""
+Statistics helpers shared by the matching algorithms.
+"""
+from typing import Any, Dict, List
+import numpy as np
+from models.responses import RulesetStats, UserStats
+from utils.group_context import GroupContext
+from utils.assignment import givers_for_receivers
+
+
+def fairness_score(std_dev: float) -> float:
+    """Fairness metric on a 0-10 scale: 10 - std_dev, floored at 0."""
+    return max(0.0, 10.0 - float(std_dev))
+
+
+def build_ruleset_stats(user_ids: List[str], user_columns: Dict[str, np.ndarray], **fields: Any) -> RulesetStats:
+    """
+    Build RulesetStats from per-user NumPy columns.
+
+    Each column is converted to Python floats once with tolist(), and the
+    UserStats models are built directly from those values (no intermediate
+    nested dict to validate, and no per-element NumPy scalar conversions).
+    Every model is still validated once, on construction; for plain floats
+    that is as cheap as model_construct, which runs in Python.
+
+    Args:
+        user_ids: User IDs, in the row order of the columns
+        user_columns: UserStats field name -> array with one value per user
+        **fields: Group-level RulesetStats fields (plain Python numbers)
+
+    Returns:
+        RulesetStats with user_stats keyed by user ID
+    """
+    names = list(user_columns)
+    columns = [np.asarray(column, dtype=np.float64).tolist() for column in user_columns.values()]
+    user_stats = {user_id: UserStats(**dict(zip(names, row))) for user_id, row in zip(user_ids, zip(*columns))}
+    return RulesetStats(**fields, user_stats=user_stats)
+
+
+def matching_statistics(context: GroupContext, receivers: np.ndarray) -> RulesetStats:
+    """
+    Calculate statistics for one concrete matching.
+
+    Utility is measured from each receiver's perspective; a single matching
+    has no per-person variance.
+
+    Args:
+        context: Shared group context
+        receivers: receivers[g] = receiver index for giver g
+
+    Returns:
+        RulesetStats for the matching
+    """
+    givers = givers_for_receivers(receivers)
+    utilities = context.utility[givers, np.arange(context.size)].astype(np.float64)
+    std_dev = float(np.std(utilities))
+
+    return build_ruleset_stats(
+        context.user_ids,
+        {"expected_utility": utilities, "variance": np.zeros(context.size)},
+        group_satisfaction_score=float(np.mean(utilities)),
+        group_fairness_score=fairness_score(std_dev),
+        min_utility=float(np.min(utilities)),
+        max_utility=float(np.max(utilities)),
+        std_dev=std_dev
+    )
@@ -0,0 +1,277 @@
+"""
+Request instrumentation: Prometheus metrics and Server-Timing headers.
+
+Metrics are kept in process memory by a few minimal metric classes and
+rendered in the Prometheus text exposition format by render_metrics() (served
+at GET /metrics). Recording a sample is a dict lookup and a few additions
+under a lock, so instrumentation stays cheap enough for every request.
+Each process keeps its own registry: work done inside batch worker
+processes is not included (its queue wait time is, as it is measured by the
+parent).
+
+timed() measures a block of code, records it in a histogram and adds it to
+the current request's Server-Timing header, which ServerTimingMiddleware
+attaches to every response (for streaming responses, only what finished
+before the first byte was sent). annotate() attaches extra fields (such as
+the group size) to the current request's RequestTrace, which the
+middleware hands to an optional on_complete callback when the request ends.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import re
+import threading
+import time
+
+# Default histogram buckets for durations, in seconds
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+@dataclass
+class RequestTrace:
+    """
+    What was measured during one request.
+
+    Attributes:
+        timings: Server-Timing entries as (name, duration_ms, description)
+        fields: Extra fields recorded with annotate()
+    """
+    timings: List[Tuple[str, float, Optional[str]]] = field(default_factory=list)
+    fields: Dict[str, Any] = field(default_factory=dict)
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+_registry: List["_Metric"] = []
+_registry_lock = threading.Lock()
+
+
+class _Metric:
+    """Base class: a named metric, optionally with labels, registered on creation."""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _label_key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, key: Tuple[str, ...], extra: Sequence[Tuple[str, str]] = ()) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """A monotonically increasing count per label set."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Add amount to the counter for the given labels."""
+        key = self._label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{self._format_labels(key)} {_number(value)}" for key, value in sorted(values.items())]
+
+
+class FunctionCounter(_Metric):
+    """A counter whose value is read from a function at scrape time (e.g. an existing hit counter)."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, function: Callable[[], float]):
+        super().__init__(name, documentation)
+        self.function = function
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name} {_number(self.function())}"]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram per label set, with sum and count."""
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DURATION_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # bucket counts..., +Inf count, sum
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation for the given labels."""
+        key = self._label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        lines = []
+        for key, series in sorted(snapshot.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f"{self.name}_bucket{self._format_labels(key, [('le', le)])} {_number(cumulative)}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {_number(cumulative)}")
+        return lines
+
+
+def render_metrics() -> str:
+    """Render every registered metric in the Prometheus text exposition format (version 0.0.4)."""
+    with _registry_lock:
+        metrics = list(_registry)
+    return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+@contextmanager
+def timed(
+    name: str,
+    histogram: Optional[Histogram] = None,
+    description: Optional[str] = None,
+    **labels: str
+) -> Iterator[None]:
+    """
+    Time a block: observe it in `histogram` and add it to the Server-Timing header.
+
+    Args:
+        name: Server-Timing metric name (a token: letters, digits, "_", "-")
+        histogram: Optional histogram to record the duration in, in seconds
+        description: Optional human-readable Server-Timing description
+        **labels: Labels for the histogram observation
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if histogram is not None:
+            histogram.observe(elapsed, **labels)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.timings.append((name, elapsed * 1000, description))
+
+
+def annotate(**fields: Any) -> None:
+    """Attach fields (e.g. group_size) to the current request's trace; a no-op outside a request."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.fields.update(fields)
+
+
+def timing_name(text: str) -> str:
+    """Turn free text (e.g. a ruleset name) into a Server-Timing token: "Max Utility" -> "max_utility"."""
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware that collects timed() blocks per request into a Server-Timing header.
+
+    A "total" entry covers the time until the response headers were sent.
+
+    Args:
+        app: The ASGI app to wrap
+        on_complete: Optional callback invoked after each request with
+            (scope, status_code, duration_seconds, trace)
+    """
+
+    def __init__(self, app, on_complete: Optional[Callable[[dict, Optional[int], float, RequestTrace], None]] = None):
+        self.app = app
+        self.on_complete = on_complete
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace()
+        token = _current_trace.set(trace)
+        started = time.perf_counter()
+        status = {}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                entries = trace.timings + [("total", (time.perf_counter() - started) * 1000, None)]
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (b"server-timing", _format_server_timing(entries).encode("latin-1"))
+                ]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_trace.reset(token)
+            if self.on_complete is not None:
+                self.on_complete(scope, status.get("code"), time.perf_counter() - started, trace)
+
+
+def _format_server_timing(entries: Sequence[Tuple[str, float, Optional[str]]]) -> str:
+    parts = []
+    for name, duration_ms, description in entries:
+        part = f"{name};dur={duration_ms:.2f}"
+        if description:
+            part += ';desc="' + description.replace("\\", "").replace('"', "") + '"'
+        parts.append(part)
+    return ", ".join(parts)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+# Metrics recorded across the service
+RULESET_SECONDS = Histogram(
+    "presents_ruleset_compute_seconds", "Time to compute one ruleset (cache misses only)", ["ruleset"]
+)
+GROUP_SIZE = Histogram(
+    "presents_group_size_users", "Number of users per computed group", ["operation"],
+    buckets=(2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+)
+VALIDATION_SECONDS = Histogram("presents_validation_seconds", "Time to load and validate a request's group")
+UTILITY_BUILD_SECONDS = Histogram(
+    "presents_utility_build_seconds", "Time to build a group context (utility matrix and exclusion mask)"
+)
+SERIALIZATION_SECONDS = Histogram("presents_serialization_seconds", "Time to encode a JSON response body")
+QUEUE_WAIT_SECONDS = Histogram(
+    "presents_queue_wait_seconds", "Time work waited for a worker before starting", ["pool"]
+)
+RULESET_ERRORS = Counter("presents_ruleset_errors_total", "Rulesets that failed and returned placeholder statistics", ["ruleset"])
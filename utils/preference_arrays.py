@@ -0,0 +1,260 @@
+"""
+Struct-of-arrays representation of a group's preferences.
+
+Both request formats (a list of UserPreference objects or the columnar
+payload) are converted into PreferenceArrays, which is what the utility
+engine and the group context consume.
+"""
+from dataclasses import dataclass, field, fields
+from functools import cached_property
+from typing import Dict, Iterable, List, Optional, Union
+import hashlib
+import io
+import json
+import numpy as np
+from models.preferences import UserPreference, ColumnarPreferences
+
+# Column order of the `giving` / `receiving` matrices
+PREFERENCE_DIMENSIONS = ("practicality", "novelty", "thoughtfulness")
+
+
+@dataclass
+class PreferenceArrays:
+    """
+    Parallel arrays describing a group, one row/entry per user.
+
+    Interests are stored CSR-style: user i's interests are
+    interest_values[interest_offsets[i]:interest_offsets[i + 1]].
+    Exclusions are an edge list: exclusion_sources[k] excludes
+    exclusion_targets[k]. As submitted (exclusion_mode None), a target of -1
+    marks an ID that is not in the group; those IDs are kept, in edge order,
+    in unknown_exclusions. After utils.group_validation.check_group the edge
+    list holds exactly the blocked (giver, receiver) pairs and exclusion_mode
+    records how it was normalized. partitions, if set, holds each user's
+    sub-group label ("" for users without one); users only match within
+    their sub-group.
+    """
+    user_ids: List[str]
+    giving: np.ndarray  # (n, 3) int8, columns in PREFERENCE_DIMENSIONS order
+    receiving: np.ndarray  # (n, 3) int8, columns in PREFERENCE_DIMENSIONS order
+    hate_being_stolen_from: np.ndarray  # (n,) int8
+    enjoy_stealing: np.ndarray  # (n,) int8
+    interest_offsets: np.ndarray  # (n + 1,) int64
+    interest_values: List[str]
+    exclusion_sources: np.ndarray  # (m,) int64
+    exclusion_targets: np.ndarray  # (m,) int64
+    unknown_exclusions: List[str] = field(default_factory=list)
+    exclusion_mode: Optional[str] = None
+    partitions: Optional[List[str]] = None
+
+    @property
+    def size(self) -> int:
+        """Number of people in the group."""
+        return len(self.user_ids)
+
+    @cached_property
+    def index(self) -> Dict[str, int]:
+        """User ID -> position, built once and shared with the group context."""
+        return {user_id: i for i, user_id in enumerate(self.user_ids)}
+
+    def fingerprint(self) -> str:
+        """Stable content hash; identical for the same group in either request format."""
+        digest = hashlib.sha256()
+        digest.update("\x1f".join(self.user_ids).encode())
+        digest.update("\x1f".join(self.interest_values).encode())
+        digest.update((self.exclusion_mode or "").encode())
+        if self.partitions is not None:
+            digest.update(("\x1e" + "\x1f".join(self.partitions)).encode())
+        for array in (
+            self.giving, self.receiving, self.hate_being_stolen_from, self.enjoy_stealing,
+            self.interest_offsets, self.exclusion_sources, self.exclusion_targets
+        ):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    def to_bytes(self) -> bytes:
+        """Serialize to a compact .npz blob (no pickling); inverse of from_bytes."""
+        buffer = io.BytesIO()
+        arrays = {f.name: getattr(self, f.name) for f in fields(self) if isinstance(getattr(self, f.name), np.ndarray)}
+        strings = {
+            "user_ids": self.user_ids,
+            "interest_values": self.interest_values,
+            "unknown_exclusions": self.unknown_exclusions,
+            "exclusion_mode": self.exclusion_mode,
+            "partitions": self.partitions
+        }
+        np.savez(buffer, strings=np.frombuffer(json.dumps(strings).encode(), dtype=np.uint8), **arrays)
+        return buffer.getvalue()
+
+    def exclusion_target_ids(self) -> List[str]:
+        """Excluded user ID for every exclusion edge, including IDs not in the group."""
+        unknown = iter(self.unknown_exclusions)
+        return [self.user_ids[t] if t >= 0 else next(unknown) for t in self.exclusion_targets.tolist()]
+
+
+def from_bytes(blob: bytes) -> PreferenceArrays:
+    """Load PreferenceArrays serialized with PreferenceArrays.to_bytes."""
+    with np.load(io.BytesIO(blob), allow_pickle=False) as data:
+        strings = json.loads(data["strings"].tobytes())
+        arrays = {name: data[name] for name in data.files if name != "strings"}
+    return PreferenceArrays(**strings, **arrays)
+
+
+def from_preferences(preferences: List[UserPreference]) -> PreferenceArrays:
+    """Convert a list of UserPreference objects into PreferenceArrays."""
+    user_ids = [pref.user_id for pref in preferences]
+    index = {user_id: i for i, user_id in enumerate(user_ids)}
+    unknown = [excluded_id for pref in preferences for excluded_id in pref.exclusions if excluded_id not in index]
+
+    giving = np.array([
+        (pref.preference_practicality_giving, pref.preference_novelty_giving, pref.preference_thoughtfulness_giving)
+        for pref in preferences
+    ], dtype=np.int8).reshape(-1, 3)
+    receiving = np.array([
+        (pref.preference_practicality_receiving, pref.preference_novelty_receiving, pref.preference_thoughtfulness_receiving)
+        for pref in preferences
+    ], dtype=np.int8).reshape(-1, 3)
+
+    interest_offsets = np.zeros(len(preferences) + 1, dtype=np.int64)
+    interest_offsets[1:] = np.cumsum([len(pref.preferred_interests) for pref in preferences])
+
+    sources = [i for i, pref in enumerate(preferences) for _ in pref.exclusions]
+    targets = [index.get(excluded_id, -1) for pref in preferences for excluded_id in pref.exclusions]
+
+    arrays = PreferenceArrays(
+        user_ids=user_ids,
+        giving=giving,
+        receiving=receiving,
+        hate_being_stolen_from=np.array([pref.we_hate_being_stolen_from for pref in preferences], dtype=np.int8),
+        enjoy_stealing=np.array([pref.we_enjoy_stealing for pref in preferences], dtype=np.int8),
+        interest_offsets=interest_offsets,
+        interest_values=[interest for pref in preferences for interest in pref.preferred_interests],
+        exclusion_sources=np.array(sources, dtype=np.int64),
+        exclusion_targets=np.array(targets, dtype=np.int64),
+        unknown_exclusions=unknown,
+        partitions=_partition_labels([pref.partition for pref in preferences])
+    )
+    arrays.__dict__["index"] = index
+    return arrays
+
+
+def from_columnar(columnar: ColumnarPreferences) -> PreferenceArrays:
+    """Convert an (already validated) columnar payload into PreferenceArrays without per-user objects."""
+    giving = np.column_stack([
+        columnar.preference_practicality_giving,
+        columnar.preference_novelty_giving,
+        columnar.preference_thoughtfulness_giving
+    ]).astype(np.int8)
+    receiving = np.column_stack([
+        columnar.preference_practicality_receiving,
+        columnar.preference_novelty_receiving,
+        columnar.preference_thoughtfulness_receiving
+    ]).astype(np.int8)
+
+    return PreferenceArrays(
+        user_ids=list(columnar.user_ids),
+        giving=giving,
+        receiving=receiving,
+        hate_being_stolen_from=np.array(columnar.we_hate_being_stolen_from, dtype=np.int8),
+        enjoy_stealing=np.array(columnar.we_enjoy_stealing, dtype=np.int8),
+        interest_offsets=np.array(columnar.interest_offsets, dtype=np.int64),
+        interest_values=list(columnar.interest_values),
+        exclusion_sources=np.array(columnar.exclusion_sources, dtype=np.int64),
+        exclusion_targets=np.array(columnar.exclusion_targets, dtype=np.int64),
+        partitions=_partition_labels(columnar.partitions or [])
+    )
+
+
+def _partition_labels(labels: List[Optional[str]]) -> Optional[List[str]]:
+    """Per-user partition labels with "" for users without one, or None if nobody has one."""
+    if not any(labels):
+        return None
+    return [label or "" for label in labels]
+
+
+def update_members(
+    arrays: PreferenceArrays,
+    upsert: Iterable[UserPreference] = (),
+    remove: Iterable[str] = ()
+) -> PreferenceArrays:
+    """
+    Apply single-member changes to a group without rebuilding it from objects.
+
+    Upserted members replace the existing member with the same user_id in
+    place, or are appended; removed members are dropped. Exclusions are kept
+    by user ID, so an exclusion of someone who joins later resolves to them.
+
+    Args:
+        arrays: The group as submitted (not normalized by check_group)
+        upsert: New or changed members
+        remove: User IDs of members to drop
+
+    Returns:
+        Updated PreferenceArrays
+    """
+    upsert = list(upsert)
+    user_ids = list(arrays.user_ids)
+    index = dict(arrays.index)
+    for pref in upsert:
+        if pref.user_id not in index:
+            index[pref.user_id] = len(user_ids)
+            user_ids.append(pref.user_id)
+
+    grow = len(user_ids) - arrays.size
+    giving = np.concatenate([arrays.giving, np.zeros((grow, 3), dtype=np.int8)])
+    receiving = np.concatenate([arrays.receiving, np.zeros((grow, 3), dtype=np.int8)])
+    hate = np.concatenate([arrays.hate_being_stolen_from, np.zeros(grow, dtype=np.int8)])
+    enjoy = np.concatenate([arrays.enjoy_stealing, np.zeros(grow, dtype=np.int8)])
+
+    offsets = arrays.interest_offsets.tolist()
+    interests = [arrays.interest_values[offsets[i]:offsets[i + 1]] for i in range(arrays.size)] + [[] for _ in range(grow)]
+    partitions = list(arrays.partitions or [""] * arrays.size) + [""] * grow
+    exclusions: List[List[str]] = [[] for _ in user_ids]
+    for source, target_id in zip(arrays.exclusion_sources.tolist(), arrays.exclusion_target_ids()):
+        exclusions[source].append(target_id)
+
+    for pref in upsert:
+        i = index[pref.user_id]
+        updated = from_preferences([pref])
+        giving[i], receiving[i] = updated.giving[0], updated.receiving[0]
+        hate[i], enjoy[i] = pref.we_hate_being_stolen_from, pref.we_enjoy_stealing
+        interests[i] = list(pref.preferred_interests)
+        exclusions[i] = list(pref.exclusions)
+        partitions[i] = pref.partition or ""
+
+    removed = set(remove)
+    keep = [i for i, user_id in enumerate(user_ids) if user_id not in removed]
+    user_ids = [user_ids[i] for i in keep]
+    index = {user_id: i for i, user_id in enumerate(user_ids)}
+
+    interest_offsets = np.zeros(len(keep) + 1, dtype=np.int64)
+    interest_offsets[1:] = np.cumsum([len(interests[i]) for i in keep])
+    sources = [new for new, old in enumerate(keep) for _ in exclusions[old]]
+    target_ids = [target_id for old in keep for target_id in exclusions[old]]
+
+    updated = PreferenceArrays(
+        user_ids=user_ids,
+        giving=giving[keep],
+        receiving=receiving[keep],
+        hate_being_stolen_from=hate[keep],
+        enjoy_stealing=enjoy[keep],
+        interest_offsets=interest_offsets,
+        interest_values=[interest for i in keep for interest in interests[i]],
+        exclusion_sources=np.array(sources, dtype=np.int64),
+        exclusion_targets=np.array([index.get(target_id, -1) for target_id in target_ids], dtype=np.int64),
+        unknown_exclusions=[target_id for target_id in target_ids if target_id not in index],
+        partitions=_partition_labels([partitions[i] for i in keep])
+    )
+    updated.__dict__["index"] = index
+    return updated
+
+
+def as_preference_arrays(
+    preferences: Union[List[UserPreference], ColumnarPreferences, PreferenceArrays]
+) -> PreferenceArrays:
+    """Convert any supported preference payload into PreferenceArrays."""
+    if isinstance(preferences, PreferenceArrays):
+        return preferences
+    if isinstance(preferences, ColumnarPreferences):
+        return from_columnar(preferences)
+    return from_preferences(preferences)
@@ -0,0 +1,213 @@
+"""
+Approximate maximum-utility assignment on a pruned candidate graph.
+
+For very large groups the dense assignment (an n x n cost matrix and an
+O(n^3) solve) is too slow and too big. Most people's best match is among
+their few best options, so the graph is pruned to candidate pairs:
+each receiver's top K givers and each giver's top K receivers. These
+are found with np.argpartition over row blocks of the utility matrix,
+so memory stays O(K n) even when the matrix is memory-mapped. The pruned
+graph, at most 2 K n edges, is solved with SciPy's sparse assignment
+solver (LAPJVsp). If it has no perfect matching, K is doubled and the
+graph rebuilt.
+
+A second pass over the matrix gives an upper bound on the dense optimum
+(see utility_upper_bound), so callers can report how far the answer could
+be from the exact one.
+"""
+from dataclasses import dataclass
+from typing import Tuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+from utils.utility_storage import row_blocks
+
+# Givers' ties (e.g. a group whose utilities are all equal) are broken by a
+# cyclic offset: among equal utilities giver g prefers receivers g+1, g+2, ...
+# (mod n). Without it every tied row would pick the same k columns, leaving
+# no perfect matching however large k grows. Far below any real difference.
+TIE_BREAK = 1e-9
+
+
+@dataclass
+class TopKSolution:
+    """
+    Result of solve_top_k.
+
+    Attributes:
+        receivers: receivers[g] = receiver index for giver g
+        total: Total utility of the matching
+        upper_bound: Upper bound on the total of the best (dense) matching
+        k: Candidates per person that the final solve used
+        edges: Number of candidate pairs in the final solve
+    """
+    receivers: np.ndarray
+    total: float
+    upper_bound: float
+    k: int
+    edges: int
+
+
+def top_k_candidates(utility: np.ndarray, allowed: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Collect each receiver's top-k givers and each giver's top-k receivers.
+
+    Givers are rows, so their top k come straight from argpartition on each
+    row block (ties broken as described at TIE_BREAK). Receivers' top k are tracked with a running threshold per
+    receiver (its k-th best utility so far): only entries above it become
+    candidates, and the candidates are re-pruned to k per receiver when they
+    pile up. After the first blocks few entries pass the threshold.
+
+    Args:
+        utility: n x n utility matrix (may be memory-mapped), [giver, receiver]
+        allowed: n x n boolean mask of permitted pairs
+        k: Candidates kept per person (clamped to n - 1)
+
+    Returns:
+        Tuple of (givers, receivers, weights) of the distinct candidate
+        pairs, plus each giver's and each receiver's best allowed utility
+        (-inf for someone with no allowed pair)
+    """
+    n = allowed.shape[0]
+    k = max(1, min(k, n - 1))
+    row_max = np.empty(n)
+    giver_edges, receiver_edges, weight_edges = [], [], []
+    columns = _ColumnTopK(n, k)
+    # offsets[n - g][r] = (r - g) mod n, scaled: a view, gathered per block
+    offsets = sliding_window_view((TIE_BREAK / n) * (np.arange(2 * n) % n), n)
+
+    for rows in row_blocks(utility):
+        givers = np.arange(rows.start, rows.stop)
+        block = np.where(allowed[rows], np.asarray(utility[rows], dtype=np.float64), -np.inf)
+        row_max[rows] = block.max(axis=1)
+        # Selection keys: utilities with ties broken cyclically (see TIE_BREAK)
+        keys = block - offsets[n - givers]
+
+        top = np.argpartition(keys, -k, axis=1)[:, -k:]
+        giver_edges.append(np.repeat(givers, k))
+        receiver_edges.append(top.ravel())
+        weight_edges.append(np.take_along_axis(block, top, axis=1).ravel())
+
+        columns.add(block, rows.start)
+
+    column_givers, column_receivers, column_weights, column_max = columns.result()
+    givers, receivers, weights = (
+        np.concatenate(edges + [column_edges])
+        for edges, column_edges in (
+            (giver_edges, column_givers), (receiver_edges, column_receivers), (weight_edges, column_weights)
+        )
+    )
+    usable = np.isfinite(weights)
+    givers, receivers, weights = givers[usable], receivers[usable], weights[usable]
+    _, first = np.unique(givers * n + receivers, return_index=True)
+    return givers[first], receivers[first], weights[first], row_max, column_max
+
+
+class _ColumnTopK:
+    """Running top-k entries per column over a stream of row blocks."""
+
+    def __init__(self, n: int, k: int):
+        self.n, self.k = n, k
+        self.threshold = np.full(n, -np.inf)  # k-th best value per column once k are known
+        self.givers, self.receivers, self.weights = [], [], []
+        self.pending = 0
+
+    def add(self, block: np.ndarray, first_row: int) -> None:
+        # Ties go to the earliest rows: later equal values never pass the
+        # strict threshold, and the stable sort in _prune keeps row order
+        first = first_row == 0
+        if first and block.shape[0] > self.k:
+            # Start from each column's k-th best value in the first block
+            hits = block >= np.partition(block, block.shape[0] - self.k, axis=0)[block.shape[0] - self.k]
+        else:
+            hits = block > self.threshold
+        rows, cols = np.nonzero(hits)
+        self.givers.append(rows + first_row)
+        self.receivers.append(cols)
+        self.weights.append(block[rows, cols])
+        self.pending += len(rows)
+        if first or self.pending > 4 * self.k * self.n:
+            self._prune()
+
+    def _prune(self) -> None:
+        givers, receivers, weights = (np.concatenate(parts) for parts in (self.givers, self.receivers, self.weights))
+        order = np.lexsort((-weights, receivers))
+        givers, receivers, weights = givers[order], receivers[order], weights[order]
+        starts = np.searchsorted(receivers, np.arange(self.n))
+        counts = np.diff(np.append(starts, len(receivers)))
+        keep = np.arange(len(receivers)) - starts[receivers] < self.k
+        full = counts >= self.k
+        self.threshold = np.full(self.n, -np.inf)
+        self.threshold[full] = weights[starts[full] + self.k - 1]
+        self.givers, self.receivers, self.weights = [givers[keep]], [receivers[keep]], [weights[keep]]
+        self.pending = int(keep.sum())
+
+    def result(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Final (givers, receivers, weights) of the top k per column, and each column's maximum."""
+        self._prune()
+        givers, receivers, weights = self.givers[0], self.receivers[0], self.weights[0]
+        column_max = np.full(self.n, -np.inf)
+        np.maximum.at(column_max, receivers, weights)
+        return givers, receivers, weights, column_max
+
+
+def utility_upper_bound(utility: np.ndarray, allowed: np.ndarray, column_max: np.ndarray) -> float:
+    """
+    Upper bound on any matching's total utility, from a feasible LP dual.
+
+    With receiver prices b_r = column_max[r] (each receiver's best allowed
+    utility) and giver prices a_g = max_r(utility[g, r] - b_r), every
+    allowed pair satisfies a_g + b_r >= utility[g, r], so by LP duality no
+    matching beats sum(a) + sum(b). This is never looser than the sum of
+    each receiver's best option. Takes one more pass over row blocks.
+    """
+    giver_prices = np.empty(allowed.shape[0])
+    for rows in row_blocks(utility):
+        block = np.where(allowed[rows], np.asarray(utility[rows], dtype=np.float64) - column_max, -np.inf)
+        giver_prices[rows] = block.max(axis=1)
+    return float(giver_prices.sum() + column_max.sum())
+
+
+def solve_top_k(utility: np.ndarray, allowed: np.ndarray, k: int) -> TopKSolution:
+    """
+    Maximize total utility over the top-k candidate graph, doubling k until a perfect matching exists.
+
+    Args:
+        utility: n x n utility matrix (may be memory-mapped), [giver, receiver]
+        allowed: n x n boolean mask of permitted pairs
+        k: Initial candidates per person
+
+    Returns:
+        TopKSolution with the matching, its total and the optimality bound
+
+    Raises:
+        ValueError: If no perfect matching exists within the allowed pairs
+    """
+    n = allowed.shape[0]
+    while True:
+        givers, receivers, weights, row_max, column_max = top_k_candidates(utility, allowed, k)
+        if np.isinf(row_max).any() or np.isinf(column_max).any():
+            raise ValueError("No valid matching exists that satisfies all exclusions")
+        # LAPJVsp needs non-zero weights; every perfect matching has n edges,
+        # so shifting all weights by the same amount keeps the optimum
+        shifted = weights - weights.min() + 1.0
+        graph = csr_matrix((shifted, (givers, receivers)), shape=(n, n))
+        try:
+            rows, columns = min_weight_full_bipartite_matching(graph, maximize=True)
+            break
+        except ValueError:
+            if k >= n - 1:
+                raise ValueError("No valid matching exists that satisfies all exclusions")
+            k = min(2 * k, n - 1)
+
+    matching = np.empty(n, dtype=np.intp)
+    matching[rows] = columns
+    total = float(np.asarray(utility[np.arange(n), matching], dtype=np.float64).sum())
+    return TopKSolution(
+        receivers=matching,
+        total=total,
+        upper_bound=utility_upper_bound(utility, allowed, column_max),
+        k=k,
+        edges=len(weights)
+    )
@@ -5,8 +5,16 @@ Calculate compatibility scores between givers and receivers.
 
 NOTE: One team member will volunteer to implement this.
 """
+from typing import TYPE_CHECKING, Optional
+import numpy as np
 from models.preferences import UserPreference
 
+if TYPE_CHECKING:
+    from utils.preference_arrays import PreferenceArrays
+
+# Upper bound on the float64 scratch block computed at a time by calculate_utility_matrix
+UTILITY_BLOCK_BYTES = 64 * 1024 * 1024
+
 
 def calculate_utility(giver: UserPreference, receiver: UserPreference) -> float:
     """
@@ -39,6 +47,58 @@ def calculate_utility(giver: UserPreference, receiver: UserPreference) -> float:
     return 5.0
 
 
+def calculate_utility_matrix(
+    arrays: "PreferenceArrays",
+    dtype: "np.typing.DTypeLike" = np.float64,
+    out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Calculate the utility of every (giver, receiver) pair at once.
+
+    Vectorized counterpart of calculate_utility used to build the group
+    context: entry [g, r] must equal calculate_utility(giver g, receiver r).
+    The matrix is filled in blocks of giver rows (see calculate_utility_rows),
+    so writing into a memory-mapped `out` never holds more than one block
+    in memory.
+
+    Args:
+        arrays: The group's preferences as parallel arrays
+        dtype: Element type of the returned matrix (ignored if `out` is given)
+        out: Optional preallocated n x n array (e.g. an np.memmap) to fill
+
+    Returns:
+        np.ndarray: n x n matrix indexed [giver, receiver] (`out` if given)
+    """
+    n = arrays.size
+    if out is None:
+        out = np.empty((n, n), dtype=dtype)
+    rows = max(1, UTILITY_BLOCK_BYTES // max(1, n * np.dtype(np.float64).itemsize))
+    for start in range(0, n, rows):
+        stop = min(n, start + rows)
+        out[start:stop] = calculate_utility_rows(arrays, start, stop)
+    return out
+
+
+def calculate_utility_rows(arrays: "PreferenceArrays", start: int, stop: int) -> np.ndarray:
+    """
+    Calculate the utilities of givers start..stop-1 towards every receiver.
+
+    Keep in sync with calculate_utility when the weighting is implemented;
+    giving/receiving scores are available as (n, 3) matrices and interests
+    in CSR form on `arrays`, so a block can be computed with broadcasting.
+
+    Args:
+        arrays: The group's preferences as parallel arrays
+        start: First giver row
+        stop: One past the last giver row
+
+    Returns:
+        np.ndarray: (stop - start) x n float64 block indexed [giver - start, receiver]
+    """
+    # PLACEHOLDER: Mirrors calculate_utility's default score until implemented
+    return np.full((stop - start, arrays.size), 5.0, dtype=np.float64)
+
+
 def calculate_shared_interests(giver: UserPreference, receiver: UserPreference) -> int:
     """
     Helper function to calculate number of shared interests.
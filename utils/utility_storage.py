@@ -0,0 +1,122 @@
+"""
+Storage for group utility matrices.
+
+A dense float64 n x n matrix costs 8 n^2 bytes (3.2 GB for 20k users), so
+large groups do not keep theirs in memory. From PRESENTS_MEMMAP_MIN_USERS
+users up, the matrix is computed in row blocks straight into an .npy file
+in PRESENTS_SCRATCH_DIR, in a narrower dtype, and algorithms read it
+through a read-only np.memmap. Pages are loaded on demand and can be
+evicted by the OS, so memory use stays bounded by the block size.
+
+Files are named after the group's preference fingerprint: other requests
+and worker processes computing the same group map the existing file
+instead of rebuilding it, and share its pages through the page cache
+(zero-copy). Files unused for PRESENTS_SCRATCH_TTL seconds are pruned.
+
+Controlled by environment variables:
+- PRESENTS_MEMMAP_MIN_USERS (default 4096): group size at which the
+  matrix moves to disk; set to 0 to always memory-map
+- PRESENTS_MEMMAP_DTYPE (default "float32"): one of MEMMAP_DTYPES
+- PRESENTS_SCRATCH_DIR (default "<tmp>/presents-utility"): where files go;
+  use local disk, not tmpfs (tmpfs counts against the VM's memory)
+- PRESENTS_SCRATCH_TTL (default 3600): seconds before an unused file is pruned
+"""
+from typing import Iterator
+import os
+import tempfile
+import time
+import numpy as np
+from utils.preference_arrays import PreferenceArrays
+from utils.utility_calculator import calculate_utility_matrix
+
+MEMMAP_DTYPES = ("float64", "float32", "float16")
+
+MEMMAP_MIN_USERS = int(os.environ.get("PRESENTS_MEMMAP_MIN_USERS", "4096"))
+MEMMAP_DTYPE = os.environ.get("PRESENTS_MEMMAP_DTYPE", "float32")
+SCRATCH_DIR = os.environ.get("PRESENTS_SCRATCH_DIR", os.path.join(tempfile.gettempdir(), "presents-utility"))
+SCRATCH_TTL = int(os.environ.get("PRESENTS_SCRATCH_TTL", "3600"))
+
+# Target size of the blocks algorithms process a large matrix in
+BLOCK_BYTES = 64 * 1024 * 1024
+
+if MEMMAP_DTYPE not in MEMMAP_DTYPES:
+    raise ValueError(f"Unknown PRESENTS_MEMMAP_DTYPE: {MEMMAP_DTYPE}. Must be one of: {', '.join(MEMMAP_DTYPES)}")
+
+
+def utility_matrix(arrays: PreferenceArrays) -> np.ndarray:
+    """
+    Return the group's utility matrix, memory-mapped from disk for large groups.
+
+    Args:
+        arrays: The group's preferences
+
+    Returns:
+        np.ndarray: n x n matrix indexed [giver, receiver]; an in-memory
+        float64 array below MEMMAP_MIN_USERS, otherwise a read-only
+        np.memmap of dtype MEMMAP_DTYPE
+    """
+    if arrays.size < MEMMAP_MIN_USERS:
+        return calculate_utility_matrix(arrays)
+    return mapped_utility_matrix(arrays, MEMMAP_DTYPE)
+
+
+def mapped_utility_matrix(arrays: PreferenceArrays, dtype: str) -> np.memmap:
+    """
+    Memory-map the group's utility matrix, computing its file first if needed.
+
+    Args:
+        arrays: The group's preferences
+        dtype: Storage dtype, one of MEMMAP_DTYPES
+
+    Returns:
+        Read-only np.memmap of shape (n, n)
+    """
+    path = os.path.join(SCRATCH_DIR, f"utility-{arrays.fingerprint()}-{dtype}.npy")
+    try:
+        matrix = np.load(path, mmap_mode="r")
+        os.utime(path)
+        return matrix
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(SCRATCH_DIR, exist_ok=True)
+    _prune_scratch()
+    # Write under a temporary name and rename, so readers never map a half-written file
+    fd, partial = tempfile.mkstemp(dir=SCRATCH_DIR, prefix="utility-", suffix=".partial")
+    os.close(fd)
+    try:
+        out = np.lib.format.open_memmap(partial, mode="w+", dtype=dtype, shape=(arrays.size, arrays.size))
+        calculate_utility_matrix(arrays, out=out)
+        out.flush()
+        del out
+        os.replace(partial, path)
+    except BaseException:
+        os.unlink(partial)
+        raise
+    return np.load(path, mmap_mode="r")
+
+
+def row_blocks(matrix: np.ndarray) -> Iterator[slice]:
+    """
+    Split a matrix's rows into slices of roughly BLOCK_BYTES (as float64).
+
+    Algorithms that reduce over a whole matrix iterate over these blocks so
+    their float64 temporaries stay small even when the matrix is memory-mapped.
+    An in-memory matrix smaller than BLOCK_BYTES is a single block.
+    """
+    n_rows = matrix.shape[0]
+    row_bytes = max(1, matrix.shape[1] * np.dtype(np.float64).itemsize)
+    step = max(1, BLOCK_BYTES // row_bytes)
+    for start in range(0, n_rows, step):
+        yield slice(start, min(n_rows, start + step))
+
+
+def _prune_scratch() -> None:
+    """Delete scratch files not used for SCRATCH_TTL seconds (mapped files stay readable until unmapped)."""
+    cutoff = time.time() - SCRATCH_TTL
+    for entry in os.scandir(SCRATCH_DIR):
+        try:
+            if entry.name.startswith("utility-") and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+        except FileNotFoundError:
+            pass